@@ -0,0 +1,57 @@
+"""Crash-safe file writes for vault artifacts.
+
+Everything under the vault is synced by Nextcloud and re-read by resumable
+scripts that treat "file exists" (or "section present") as "done". A plain
+write_text that dies halfway — crash, Ctrl-C, full disk — leaves a truncated
+note that looks finished, and the sync client may ship the half-written
+version to every device. `atomic_write_text` writes to a hidden temp file in
+the same directory, fsyncs it, then renames it over the target, so readers
+only ever see the old contents or the complete new contents.
+
+No third-party or sibling imports: combine.py, backfill.py and transcribe.py
+use this without pulling in the API client.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+# Read once at import: os.umask can only be read by setting it, and briefly
+# setting the process-wide umask to 0 races file creation on other threads.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write_text(path: Path, text: str, encoding: str = "utf-8") -> None:
+    """Replace `path` with `text` atomically (temp file + fsync + rename)."""
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    tmp_path = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if path.exists():
+            # Keep the note's permissions rather than mkstemp's 0600.
+            os.chmod(tmp_path, path.stat().st_mode & 0o777)
+        else:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+
+
+def _fsync_dir(directory: Path) -> None:
+    """Persist the rename itself; not supported on every platform/filesystem."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
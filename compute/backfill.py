@@ -15,6 +15,8 @@ import re
 import sys
 from pathlib import Path
 
+from atomic_io import atomic_write_text
+
 MORNING_PAGES_PATH = Path(
     "/home/aharon/Documents/vault-alpha/2_Roots/Art/Morning Pages.md"
 )
@@ -254,7 +256,7 @@ def main() -> None:
             continue
         mp = mp_by_date.get(date)
         ex = ex_by_date.get(date)
-        out_path.write_text(build_note(date, mp, ex), encoding="utf-8")
+        atomic_write_text(out_path, build_note(date, mp, ex))
         created += 1
         print(f"  created  {date}")
 
@@ -0,0 +1,124 @@
+"""Combined review backfill.
+
+Runs the weekly, monthly and quarterly backfills in one process so they share
+one API rate limiter and one bounded worker pool. Weekly and monthly reviews
+don't depend on each other and run in any order; each quarter is queued only
+once the monthly reviews it reads have finished, so it is built from those
+reviews instead of falling back to daily extracts.
+
+Usage:
+    python compute/backfill_reviews.py --start 2025-07-01
+    python compute/backfill_reviews.py --start 2025-07-01 --workers 8
+"""
+
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date
+from pathlib import Path
+
+import monthly_review
+import quarterly_review
+import weekly_review
+from extract_index import load_extracts
+from llm_common import DAILY_INPUTS, get_client, load_recurring_tasks
+
+DEFAULT_WORKERS = 4
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Backfill weekly, monthly and quarterly reviews concurrently."
+    )
+    parser.add_argument("--dir", type=Path, default=DAILY_INPUTS)
+    parser.add_argument("--weekly-out", type=Path, default=weekly_review.WEEKLY_OUT)
+    parser.add_argument("--monthly-out", type=Path, default=monthly_review.MONTHLY_OUT)
+    parser.add_argument("--quarterly-out", type=Path, default=quarterly_review.QUARTERLY_OUT)
+    parser.add_argument("--start", default="2025-07-01",
+                        help="Earliest date to include (YYYY-MM-DD, default: 2025-07-01)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Reviews generated concurrently (default {DEFAULT_WORKERS})")
+    parser.add_argument("--min-week-days", type=int, default=weekly_review.MIN_DAYS)
+    parser.add_argument("--min-month-days", type=int, default=monthly_review.MIN_DAYS)
+    args = parser.parse_args()
+
+    client = get_client()
+    recurring_tasks = load_recurring_tasks()
+
+    extracts = load_extracts(args.dir, start=args.start)
+    if not extracts:
+        raise SystemExit("No extracted daily notes found.")
+    weeks = {
+        k: sorted(v) for k, v in weekly_review.group_by_iso_week(extracts).items()
+        if len(v) >= args.min_week_days
+    }
+    months = {
+        k: sorted(v) for k, v in monthly_review.group_by_month(extracts).items()
+        if len(v) >= args.min_month_days
+    }
+    start = date.fromisoformat(args.start)
+    quarters = quarterly_review.all_quarters(
+        start.year, (start.month - 1) // 3 + 1,
+        *quarterly_review.last_complete_quarter(date.today()),
+    )
+    print(f"Backfilling {len(weeks)} weeks, {len(months)} months, {len(quarters)} quarters "
+          f"with {args.workers} workers...")
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        labels: dict[Future, str] = {}
+
+        def submit(label: str, fn, *fn_args) -> Future:
+            future = pool.submit(fn, *fn_args)
+            labels[future] = label
+            return future
+
+        def submit_quarter(year: int, q: int) -> Future:
+            return submit(
+                quarterly_review.quarter_label(year, q), quarterly_review.generate_quarterly,
+                year, q, args.dir, args.monthly_out, args.quarterly_out, client, recurring_tasks,
+            )
+
+        for label, week in weeks.items():
+            submit(label, weekly_review.generate_weekly,
+                   label, week, args.weekly_out, client, recurring_tasks)
+        for label, month in months.items():
+            submit(label, monthly_review.generate_monthly,
+                   label, month, args.monthly_out, client, recurring_tasks)
+
+        # Quarter -> monthly reviews still being generated in this run.
+        waiting: dict[tuple[int, int], set[str]] = {}
+        for year, q in quarters:
+            deps = {f"{year}-{m:02d}" for m in quarterly_review._QUARTER_MONTHS[q]} & months.keys()
+            if deps:
+                waiting[(year, q)] = deps
+            else:
+                submit_quarter(year, q)
+
+        failed = 0
+        pending = set(labels)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                label = labels[future]
+                exc = future.exception()
+                if exc is not None:
+                    print(f"  FAIL  {label}: {exc}")
+                    failed += 1
+                for (year, q), deps in list(waiting.items()):
+                    if label not in deps:
+                        continue
+                    if exc is not None:
+                        # Don't build a quarter with one of its months missing.
+                        del waiting[(year, q)]
+                        print(f"  BLOCK {quarterly_review.quarter_label(year, q)}: {label} failed")
+                        failed += 1
+                        continue
+                    deps.discard(label)
+                    if not deps:
+                        del waiting[(year, q)]
+                        pending.add(submit_quarter(year, q))
+
+    print(f"Done. ({failed} failed)" if failed else "Done.")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,9 @@ import random
 from datetime import date
 from pathlib import Path
 
-from llm_common import DAILY_INPUTS, MODEL, extract_json_section, get_client
+from atomic_io import atomic_write_text
+from extract_index import load_extracts
+from llm_common import DAILY_INPUTS, MODEL, get_client
 
 BOOTSTRAP_OUT = Path(
     "/home/aharon/Documents/vault-alpha/bootstrap"
@@ -37,18 +39,7 @@ def collect_all_extracts(
     end: str | None = None,
 ) -> list[tuple[str, dict]]:
     """Return [(date_str, extract_dict), ...] for all files with an extract, sorted by date."""
-    results: list[tuple[str, dict]] = []
-    for path in sorted(daily_dir.glob("????-??-??.md")):
-        stem = path.stem
-        if start and stem < start:
-            continue
-        if end and stem > end:
-            continue
-        text = path.read_text(encoding="utf-8")
-        extract = extract_json_section(text)
-        if extract is not None:
-            results.append((stem, extract))
-    return results
+    return load_extracts(daily_dir, start=start, end=end)
 
 
 def spread_sample(all_extracts: list[tuple[str, dict]], n: int) -> list[tuple[str, dict]]:
@@ -153,7 +144,7 @@ def main() -> None:
     )
 
     args.out.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(header + analysis_text, encoding="utf-8")
+    atomic_write_text(out_path, header + analysis_text)
     print(f"Saved: {out_path}")
 
 
@@ -0,0 +1,232 @@
+"""Chunked transcription of long recordings, with per-chunk checkpoints.
+
+A multi-hour file sent through one `model.transcribe` call is a single serial
+job: nothing is usable until it finishes, and a crash loses all of it. For
+audio longer than LONG_AUDIO_SECONDS, `transcribe_long` instead:
+
+  1. runs faster-whisper's Silero VAD over the decoded audio and plans chunks
+     of at most CHUNK_SECONDS, cutting in the middle of a silence wherever one
+     is available (a hard cut only when speech runs unbroken for a whole
+     chunk). VAD only chooses the cut points; every sample of the file is
+     still transcribed;
+  2. transcribes the chunks `workers` at a time (the caller's WhisperModel
+     needs num_workers >= workers for them to actually overlap on the GPU);
+  3. shifts each chunk's segment timestamps by the chunk's start, so the
+     stitched transcript has file-global timestamps;
+  4. appends each finished chunk to a JSONL checkpoint. The first line holds
+     the chunk plan, so a rerun after a crash skips VAD and every chunk that
+     already finished. The caller deletes the checkpoint once the transcript
+     is safely written.
+
+`batch_layout` and `split_batch` go the other way for short recordings: lay
+several end to end so one BatchedInferencePipeline pass transcribes them all,
+then split the segments back out per recording (see transcribe_api).
+
+Shared by transcribe.py and transcribe_api.py, so it imports nothing from the
+repo; faster-whisper is imported lazily, only when VAD runs.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 600.0
+LONG_AUDIO_SECONDS = 1800.0
+BATCH_WINDOW_SECONDS = 30.0  # Whisper's input window, the batched pipeline's clip limit
+BATCH_GAP_SECONDS = 1.0
+
+# Same default as llm_common.CACHE_DIR.
+CHECKPOINT_DIR = Path(
+    os.environ.get("HARMONY_CACHE_DIR", Path.home() / ".cache" / "harmony")
+) / "transcribe_chunks"
+
+log = logging.getLogger(__name__)
+
+
+def fmt_ts(seconds: float) -> str:
+    """MM:SS.f under an hour, H:MM:SS.f from an hour on: 83.4 -> '01:23.4', 3723.0 -> '1:02:03.0'."""
+    tenths = round(seconds * 10)
+    hours, rem = divmod(tenths, 36000)
+    mins, rem = divmod(rem, 600)
+    secs = f"{rem // 10:02d}.{rem % 10}"
+    return f"{hours}:{mins:02d}:{secs}" if hours else f"{mins:02d}:{secs}"
+
+
+def format_segments(segments: Iterable) -> str:
+    """One `[start -> end] text` line per segment (anything with .start, .end, .text)."""
+    return "\n".join(
+        f"[{fmt_ts(seg.start)} -> {fmt_ts(seg.end)}] {seg.text.strip()}"
+        for seg in segments
+    )
+
+
+def plan_chunks(
+    speech: "list[tuple[float, float]]", duration: float, chunk_seconds: float = CHUNK_SECONDS
+) -> "list[tuple[float, float]]":
+    """Split [0, duration] into chunks of at most chunk_seconds, cutting mid-silence where possible.
+
+    `speech` is the VAD's (start, end) speech regions in seconds, sorted.
+    """
+    edges = [0.0] + [t for region in speech for t in region] + [duration]
+    # Midpoints of the silences between speech regions (and before/after them).
+    cuts = [
+        (edges[i] + edges[i + 1]) / 2
+        for i in range(0, len(edges) - 1, 2)
+        if edges[i + 1] > edges[i]
+    ]
+    chunks = []
+    start = 0.0
+    while duration - start > chunk_seconds:
+        limit = start + chunk_seconds
+        candidates = [c for c in cuts if start < c <= limit]
+        end = candidates[-1] if candidates else limit
+        chunks.append((start, end))
+        start = end
+    chunks.append((start, duration))
+    return chunks
+
+
+def speech_regions(audio) -> "list[tuple[float, float]]":
+    """Silero VAD speech regions, in seconds, for 16 kHz mono `audio`."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps  # noqa: PLC0415
+    return [
+        (t["start"] / SAMPLE_RATE, t["end"] / SAMPLE_RATE)
+        for t in get_speech_timestamps(audio, VadOptions())
+    ]
+
+
+def checkpoint_path(*key: str) -> Path:
+    """Checkpoint file for a recording identified by `key` (e.g. path, size, mtime)."""
+    digest = hashlib.sha256("\0".join(key).encode("utf-8")).hexdigest()[:32]
+    return CHECKPOINT_DIR / f"{digest}.jsonl"
+
+
+def _load_checkpoint(path: Path) -> "tuple[list[tuple[float, float]] | None, dict[int, list]]":
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None, {}
+    try:
+        plan = [tuple(c) for c in json.loads(lines[0])["chunks"]]
+    except (IndexError, KeyError, TypeError, json.JSONDecodeError):
+        return None, {}
+    done = {}
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+            done[entry["index"]] = entry["segments"]
+        except (KeyError, TypeError, json.JSONDecodeError):
+            break  # a torn final line from a crash mid-append
+    return plan, done
+
+
+def _append(path: Path, entry: dict, lock: threading.Lock) -> None:
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with lock, path.open("a", encoding="utf-8") as f:
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def transcribe_long(
+    audio,
+    transcribe: "Callable[[object], Iterable]",
+    checkpoint: "Path | None" = None,
+    chunk_seconds: float = CHUNK_SECONDS,
+    workers: int = 1,
+    progress: "Callable[[float], None] | None" = None,
+) -> "list[SimpleNamespace]":
+    """Transcribe 16 kHz `audio` chunk by chunk; returns segments with file-global timestamps.
+
+    `transcribe(clip)` returns the segments for one chunk's samples, e.g.
+    `lambda clip: model.transcribe(clip)[0]`. `progress(fraction)`, if given,
+    is called with the share of the audio done after each chunk.
+    """
+    duration = len(audio) / SAMPLE_RATE
+    plan, done = _load_checkpoint(checkpoint) if checkpoint else (None, {})
+    if plan is None:
+        plan = plan_chunks(speech_regions(audio), duration, chunk_seconds)
+        done = {}
+        if checkpoint:
+            checkpoint.parent.mkdir(parents=True, exist_ok=True)
+            checkpoint.write_text(json.dumps({"chunks": plan}) + "\n", encoding="utf-8")
+    else:
+        # Rewrite without any torn final line, so new appends start on a fresh line.
+        checkpoint.write_text(
+            "".join(
+                json.dumps(e, ensure_ascii=False) + "\n"
+                for e in [{"chunks": plan}] + [{"index": i, "segments": v} for i, v in done.items()]
+            ),
+            encoding="utf-8",
+        )
+        log.info("Resuming from checkpoint: %d/%d chunks already done", len(done), len(plan))
+
+    lock = threading.Lock()
+
+    def run(index: int) -> None:
+        start, end = plan[index]
+        clip = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+        segments = [
+            [start + seg.start, start + seg.end, seg.text] for seg in transcribe(clip)
+        ]
+        done[index] = segments
+        if checkpoint:
+            _append(checkpoint, {"index": index, "segments": segments}, lock)
+        log.info("Chunk %d/%d done (%s -> %s)", index + 1, len(plan), fmt_ts(start), fmt_ts(end))
+        if progress is not None:
+            progress(sum(plan[i][1] - plan[i][0] for i in list(done)) / duration)
+
+    todo = [i for i in range(len(plan)) if i not in done]
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        list(pool.map(run, todo))
+
+    return [
+        SimpleNamespace(start=s, end=e, text=text)
+        for i in range(len(plan))
+        for s, e, text in done[i]
+    ]
+
+
+def batch_layout(
+    speech_by_file: "list[list[tuple[float, float]]]",
+    durations: "list[float]",
+    gap: float = BATCH_GAP_SECONDS,
+) -> "tuple[list[float], list[dict]]":
+    """Place recordings end to end, `gap` seconds apart, for one batched pass.
+
+    Returns each recording's offset in the combined audio, and clip_timestamps
+    (seconds) for BatchedInferencePipeline: windows of at most 30 s cut
+    mid-silence, none spanning two recordings, so no segment can mix them.
+    """
+    offsets, clips = [], []
+    position = 0.0
+    for speech, duration in zip(speech_by_file, durations):
+        offsets.append(position)
+        for start, end in plan_chunks(speech, duration, BATCH_WINDOW_SECONDS):
+            if end > start:
+                clips.append({"start": position + start, "end": position + end})
+        position += duration + gap
+    return offsets, clips
+
+
+def split_batch(
+    segments: Iterable, offsets: "list[float]", durations: "list[float]"
+) -> "list[list[SimpleNamespace]]":
+    """Give each segment of a combined pass back to its recording, with local timestamps."""
+    per_file: list[list[SimpleNamespace]] = [[] for _ in offsets]
+    for seg in segments:
+        i = max(bisect.bisect_right(offsets, (seg.start + seg.end) / 2) - 1, 0)
+        per_file[i].append(SimpleNamespace(
+            start=max(seg.start - offsets[i], 0.0),
+            end=min(seg.end - offsets[i], durations[i]),
+            text=seg.text,
+        ))
+    return per_file
@@ -0,0 +1,168 @@
+"""Map-reduce clustering for the recurring trackers.
+
+recurring_tasks.py and recurring_desolations.py normally send every line of
+the requested range to the model in one tool call, which stops fitting the
+context window (and the output cap) as the journal grows. `cluster_by_month`
+splits the work:
+
+  map     each calendar month is clustered on its own, in parallel, keeping
+          one-off items too (a thread seen once in July and once in August is
+          still recurring across the lifetime);
+  reduce  the monthly cluster lists are merged into lifetime threads. If the
+          monthly lists together are too big for one merge call, consecutive
+          lists are merged in groups first and the group results merged
+          again, so no single call grows with the length of the journal.
+
+Every map and merge result is cached under CACHE_DIR/clusters, keyed by a
+hash of its prompt, tool schema and model. Past months' inputs don't change,
+so a run after a new month costs one map call plus the merges above it.
+"""
+
+import hashlib
+import json
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from atomic_io import atomic_write_text
+from llm_common import CACHE_DIR, MODEL, create_message, model_for
+from prompt_packer import estimate_tokens
+
+CLUSTER_CACHE_DIR = CACHE_DIR / "clusters"
+MAP_WORKERS = 4
+MAP_MAX_TOKENS = 8096
+MERGE_MAX_TOKENS = 16000
+# Cluster JSON handed to one merge call; larger inputs are merged in groups.
+MERGE_INPUT_TOKENS = 24000
+
+
+def group_by_month(
+    items_by_day: list[tuple[str, list[str]]],
+) -> dict[str, list[tuple[str, list[str]]]]:
+    months: dict[str, list[tuple[str, list[str]]]] = {}
+    for date_str, items in items_by_day:
+        months.setdefault(date_str[:7], []).append((date_str, items))
+    return dict(sorted(months.items()))
+
+
+def build_merge_prompt(
+    cluster_lists: list[list[dict]], noun: str, note_field: str, min_occurrences: int | None
+) -> str:
+    parts = [json.dumps(clusters, ensure_ascii=False) for clusters in cluster_lists]
+    drop = ""
+    if min_occurrences:
+        drop = (
+            "Omit merged threads with fewer than " + str(min_occurrences)
+            + " total occurrences.\n\n"
+        )
+    return (
+        "Below are clusters of recurring " + noun + " from one person's daily journal, "
+        "computed separately for " + str(len(parts)) + " consecutive periods (one JSON "
+        "list per period, oldest first). The same underlying thread often appears in "
+        "several periods under a different canonical name.\n\n"
+        "Merge clusters that describe the same underlying thread into one: add their "
+        "`occurrences`, take the earliest `first_seen` and latest `last_seen`, keep 2-4 "
+        "`sample_phrasings` spread across the whole span, give it the clearest canonical "
+        "name, and rewrite `" + note_field + "` so it describes the full span rather than "
+        "one period. Threads with no counterpart in another period are kept as they are.\n\n"
+        + drop
+        + "Order the results by `occurrences` descending — the most-repeated threads first.\n\n"
+        "CLUSTERS BY PERIOD:\n\n" + "\n\n".join(parts)
+    )
+
+
+def _cached_call(
+    client, tool: dict, list_key: str, prompt: str, max_tokens: int, label: str, cache_dir: Path
+) -> list[dict]:
+    """One forced-tool call, answered from the cache when the same prompt was clustered before."""
+    model = model_for("review")
+    key = hashlib.sha256(
+        json.dumps([prompt, tool, model], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    path = cache_dir / tool["name"] / f"{label}-{key[:16]}.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    print(f"  gen   {label}")
+    response = create_message(
+        client,
+        model=MODEL,
+        max_tokens=max_tokens,
+        tools=[tool],
+        tool_choice={"type": "tool", "name": tool["name"]},
+        messages=[{"role": "user", "content": prompt}],
+    )
+    for block in response.content:
+        if block.type == "tool_use":
+            clusters = block.input.get(list_key, [])
+            break
+    else:
+        raise RuntimeError(f"No tool_use block in response for {label}.")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(path, json.dumps(clusters, ensure_ascii=False))
+    return clusters
+
+
+def _merge_groups(level: list[list[dict]], limit: int) -> list[list[list[dict]]]:
+    """Split consecutive cluster lists into groups whose JSON fits in `limit` tokens (>= 2 per group)."""
+    groups: list[list[list[dict]]] = [[]]
+    used = 0
+    for clusters in level:
+        cost = estimate_tokens(json.dumps(clusters, ensure_ascii=False))
+        if len(groups[-1]) >= 2 and used + cost > limit:
+            groups.append([])
+            used = 0
+        groups[-1].append(clusters)
+        used += cost
+    return groups
+
+
+def cluster_by_month(
+    items_by_day: list[tuple[str, list[str]]],
+    client,
+    tool: dict,
+    list_key: str,
+    build_map_prompt: Callable[[list[tuple[str, list[str]]]], str],
+    noun: str,
+    note_field: str,
+    min_occurrences: int = 2,
+    workers: int = MAP_WORKERS,
+    cache_dir: Path = CLUSTER_CACHE_DIR,
+    merge_input_tokens: int = MERGE_INPUT_TOKENS,
+) -> list[dict]:
+    """Cluster `items_by_day` month by month, then merge into lifetime threads."""
+    months = group_by_month(items_by_day)
+    print(f"Clustering {len(months)} months with up to {workers} workers...")
+
+    def map_month(entry: tuple[str, list[tuple[str, list[str]]]]) -> list[dict]:
+        label, days = entry
+        return _cached_call(client, tool, list_key, build_map_prompt(days),
+                            MAP_MAX_TOKENS, label, cache_dir)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        level = list(pool.map(map_month, months.items()))
+        if len(level) == 1:
+            return level[0]
+
+        depth = 0
+        while True:
+            depth += 1
+            groups = _merge_groups(level, merge_input_tokens)
+            final = len(groups) == 1
+
+            def merge(indexed: tuple[int, list[list[dict]]]) -> list[dict]:
+                i, group = indexed
+                if len(group) == 1:
+                    return group[0]
+                prompt = build_merge_prompt(
+                    group, noun, note_field, min_occurrences if final else None
+                )
+                return _cached_call(client, tool, list_key, prompt, MERGE_MAX_TOKENS,
+                                    f"merge{depth}-{i}", cache_dir)
+
+            level = list(pool.map(merge, enumerate(groups)))
+            if final:
+                return level[0]
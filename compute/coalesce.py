@@ -0,0 +1,83 @@
+"""Micro-batching of concurrent requests into one call.
+
+`Coalescer.submit(item)` parks the item; the first submission starts a short
+timer (`window` seconds), and when it fires — or as soon as `max_items` are
+waiting — everything parked so far goes to `run_batch(items)` in one call,
+and each submitter gets its own entry of the returned list. A lone request
+therefore waits at most `window` longer than it would have; a burst shares a
+single pass.
+
+If a batch of several items fails, each item is retried on its own, so one
+bad file only fails its own request.
+
+Used by transcribe_api to send short voice memos that arrive together through
+one batched Whisper pass. Single event loop only.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+
+class Coalescer:
+    def __init__(
+        self,
+        run_batch: "Callable[[list], Awaitable[list]]",
+        window: float = 0.1,
+        max_items: int = 8,
+    ):
+        self.run_batch = run_batch
+        self.window = window
+        self.max_items = max_items
+        self._pending: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: "list[tuple[object, asyncio.Future]]") -> None:
+        live = [(item, future) for item, future in batch if not future.done()]
+        if not live:
+            return
+        self.batches += 1
+        self.items += len(live)
+        try:
+            results = await self.run_batch([item for item, _ in live])
+        except Exception as exc:
+            if len(live) == 1:
+                if not live[0][1].done():
+                    live[0][1].set_exception(exc)
+                return
+            for entry in live:
+                await self._run([entry])
+            return
+        for (_, future), result in zip(live, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "waiting": len(self._pending),
+        }
@@ -12,6 +12,8 @@ import re
 import sys
 from pathlib import Path
 
+from atomic_io import atomic_write_text
+
 
 # ---------------------------------------------------------------------------
 # Skip-marker detection
@@ -347,7 +349,7 @@ def _write_raw_day(
         f"\n"
         f"{body}\n"
     )
-    path.write_text(content, encoding="utf-8")
+    atomic_write_text(path, content)
 
 
 # ---------------------------------------------------------------------------
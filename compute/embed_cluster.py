@@ -0,0 +1,291 @@
+"""Local embedding-based clustering for the recurring trackers.
+
+The default trackers ask the LLM to both group near-duplicate phrasings and
+count them, which is expensive and gives different counts run to run. This
+engine does the grouping locally and deterministically:
+
+  1. every distinct phrase is embedded with a small CPU sentence-embedding
+     model (EMBED_MODEL); vectors are cached in SQLite under CACHE_DIR keyed
+     by a hash of the phrase, so only new phrasings are ever embedded;
+  2. phrases are clustered with average-linkage agglomerative clustering on
+     cosine similarity, vectorised with NumPy — merging stops when the closest
+     pair of clusters falls below --similarity;
+  3. occurrences (distinct days), first_seen and last_seen are computed
+     exactly from the dates, and sample phrasings are picked across the span.
+
+The LLM is then asked only to name the clusters that clear min_occurrences
+(one short call), or not at all with client=None, in which case a cluster is
+named after its most frequent phrasing. The result is a list of cluster dicts
+in the same shape the tracker tools return, so render_markdown is unchanged.
+
+sentence-transformers is imported lazily, only when a phrase actually needs
+embedding.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from llm_common import CACHE_DIR, MODEL, create_message
+
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+SIMILARITY_THRESHOLD = 0.6
+MAX_SAMPLES = 4
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def embedding_db_path(model_name: str = EMBED_MODEL) -> Path:
+    slug = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / f"embeddings_{slug}.sqlite3"
+
+
+def _default_embedder(phrases: list[str]) -> np.ndarray:
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer  # noqa: PLC0415
+            _model = SentenceTransformer(EMBED_MODEL, device="cpu")
+    return _model.encode(phrases, batch_size=64, convert_to_numpy=True)
+
+
+def _phrase_key(phrase: str) -> str:
+    return hashlib.sha256(phrase.encode("utf-8")).hexdigest()
+
+
+def embed_phrases(
+    phrases: list[str],
+    embedder: Callable[[list[str]], np.ndarray] | None = None,
+    db_path: Path | None = None,
+) -> np.ndarray:
+    """Return unit-length float32 vectors for `phrases`, embedding only uncached ones."""
+    db_path = db_path or embedding_db_path()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB)")
+        keys = [_phrase_key(p) for p in phrases]
+        found: dict[str, np.ndarray] = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, vector FROM vectors WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v in rows)
+
+        missing = sorted({p for p, k in zip(phrases, keys) if k not in found})
+        if missing:
+            print(f"  embed {len(missing)} new phrasings")
+            vectors = np.asarray((embedder or _default_embedder)(missing), dtype=np.float32)
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vectors VALUES (?, ?)",
+                    [(_phrase_key(p), v.tobytes()) for p, v in zip(missing, vectors)],
+                )
+            found.update((_phrase_key(p), v) for p, v in zip(missing, vectors))
+    finally:
+        conn.close()
+    if not phrases:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack([found[k] for k in keys])
+
+
+def agglomerate(vectors: np.ndarray, threshold: float = SIMILARITY_THRESHOLD) -> list[list[int]]:
+    """Average-linkage clustering of unit vectors; returns lists of row indices.
+
+    For unit vectors the mean pairwise cosine similarity between clusters A
+    and B is sum(A)·sum(B) / (|A||B|), so each cluster is tracked by its vector
+    sum and a merge only recomputes one row of the similarity matrix.
+    """
+    n = len(vectors)
+    if n == 0:
+        return []
+    sums = vectors.astype(np.float64)
+    sizes = np.ones(n)
+    sim = sums @ sums.T
+    np.fill_diagonal(sim, -np.inf)
+    members = [[i] for i in range(n)]
+    active = np.ones(n, dtype=bool)
+
+    best = sim.argmax(axis=1)
+    best_val = sim[np.arange(n), best]
+    while True:
+        a = int(best_val.argmax())
+        if best_val[a] < threshold:
+            break
+        b = int(best[a])
+        # Merge b into a.
+        sums[a] += sums[b]
+        sizes[a] += sizes[b]
+        members[a].extend(members[b])
+        members[b] = []
+        active[b] = False
+        sim[b, :] = -np.inf
+        sim[:, b] = -np.inf
+        best_val[b] = -np.inf
+
+        row = (sums @ sums[a]) / (sizes * sizes[a])
+        row[~active] = -np.inf
+        row[a] = -np.inf
+        sim[a, :] = row
+        sim[:, a] = row
+
+        # Rows whose best partner was a or b, plus a itself, need a fresh argmax;
+        # everyone else only needs to check the new row a.
+        stale = np.flatnonzero(active & ((best == a) | (best == b)))
+        stale = np.union1d(stale, [a])
+        best[stale] = sim[stale].argmax(axis=1)
+        best_val[stale] = sim[stale, best[stale]]
+        better = active & (row > best_val)
+        best[better] = a
+        best_val[better] = row[better]
+
+    return [sorted(m) for m in members if m]
+
+
+def _samples(mentions: list[tuple[str, str]]) -> list[str]:
+    """Up to MAX_SAMPLES distinct phrasings spread from first to last mention."""
+    distinct: list[str] = []
+    for _, phrase in sorted(mentions):
+        if phrase not in distinct:
+            distinct.append(phrase)
+    if len(distinct) <= MAX_SAMPLES:
+        return distinct
+    step = (len(distinct) - 1) / (MAX_SAMPLES - 1)
+    return [distinct[round(i * step)] for i in range(MAX_SAMPLES)]
+
+
+def build_clusters(
+    items_by_day: list[tuple[str, list[str]]],
+    threshold: float = SIMILARITY_THRESHOLD,
+    embedder: Callable[[list[str]], np.ndarray] | None = None,
+    db_path: Path | None = None,
+) -> list[dict]:
+    """Group phrasings locally; returns clusters with exact counts, unnamed."""
+    mentions: dict[str, list[tuple[str, str]]] = {}
+    for date_str, items in items_by_day:
+        for item in items:
+            phrase = " ".join(str(item).split())
+            if phrase:
+                mentions.setdefault(phrase.lower(), []).append((date_str, phrase))
+    keys = sorted(mentions)
+    vectors = embed_phrases(keys, embedder, db_path)
+
+    clusters = []
+    for group in agglomerate(vectors, threshold):
+        cluster_mentions = [m for i in group for m in mentions[keys[i]]]
+        dates = sorted({d for d, _ in cluster_mentions})
+        counts = Counter(p for _, p in cluster_mentions)
+        clusters.append({
+            "canonical_name": counts.most_common(1)[0][0],
+            "occurrences": len(dates),
+            "first_seen": dates[0],
+            "last_seen": dates[-1],
+            "sample_phrasings": _samples(cluster_mentions),
+        })
+    clusters.sort(key=lambda c: (-c["occurrences"], c["first_seen"]))
+    return clusters
+
+
+def _naming_tool(note_field: str, note_description: str) -> dict:
+    return {
+        "name": "name_clusters",
+        "description": "Give each pre-computed cluster a canonical name and a one-sentence note.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "clusters": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "integer"},
+                            "canonical_name": {"type": "string"},
+                            note_field: {"type": "string", "description": note_description},
+                        },
+                        "required": ["id", "canonical_name", note_field],
+                    },
+                },
+            },
+            "required": ["clusters"],
+        },
+    }
+
+
+def name_clusters(
+    clusters: list[dict], client, noun: str, note_field: str, note_description: str
+) -> list[dict]:
+    """Ask the model for canonical names and notes only; counts and dates are kept as computed."""
+    if not clusters:
+        return clusters
+    listing = [
+        {"id": i, "occurrences": c["occurrences"], "first_seen": c["first_seen"],
+         "last_seen": c["last_seen"], "sample_phrasings": c["sample_phrasings"]}
+        for i, c in enumerate(clusters)
+    ]
+    prompt = (
+        "Below are clusters of recurring " + noun + " from one person's daily journal. "
+        "Each cluster has already been grouped and counted; do not merge, split, or "
+        "recount them. For each cluster id, give a short canonical name for the "
+        "underlying thread and a one-sentence `" + note_field + "`: " + note_description
+        + "\n\nCLUSTERS:\n\n" + json.dumps(listing, indent=2, ensure_ascii=False)
+    )
+    tool = _naming_tool(note_field, note_description)
+    response = create_message(
+        client,
+        model=MODEL,
+        max_tokens=8096,
+        tools=[tool],
+        tool_choice={"type": "tool", "name": tool["name"]},
+        messages=[{"role": "user", "content": prompt}],
+    )
+    for block in response.content:
+        if block.type == "tool_use":
+            named = {c["id"]: c for c in block.input.get("clusters", [])}
+            break
+    else:
+        raise RuntimeError("No tool_use block in response.")
+
+    result = []
+    for i, c in enumerate(clusters):
+        n = named.get(i, {})
+        result.append({
+            **c,
+            "canonical_name": n.get("canonical_name") or c["canonical_name"],
+            note_field: n.get(note_field, ""),
+        })
+    return result
+
+
+def cluster_locally(
+    items_by_day: list[tuple[str, list[str]]],
+    client,
+    tool: dict,
+    list_key: str,
+    noun: str,
+    note_field: str,
+    min_occurrences: int = 2,
+    threshold: float = SIMILARITY_THRESHOLD,
+    embedder: Callable[[list[str]], np.ndarray] | None = None,
+    db_path: Path | None = None,
+) -> list[dict]:
+    """Embedding clusters in the shape of `tool`'s output, named by the LLM unless client is None."""
+    clusters = [
+        c for c in build_clusters(items_by_day, threshold, embedder, db_path)
+        if c["occurrences"] >= min_occurrences
+    ]
+    print(f"Clustered locally into {len(clusters)} threads with >= {min_occurrences} days")
+    if client is None:
+        return [{**c, note_field: ""} for c in clusters]
+    item_schema = tool["input_schema"]["properties"][list_key]["items"]["properties"]
+    return name_clusters(clusters, client, noun, note_field,
+                         item_schema[note_field].get("description", ""))
@@ -3,7 +3,21 @@
 For any daily note file, send its contents to Claude API and append a
 structured JSON extract as a ## 🤖 Daily Extract section.
 
-Skips files that already have that section. Resumable.
+Each extract records a content key — a hash of the note body above the
+section, the model, and the extraction schema — and every extract is also kept
+in a content-addressed cache next to the vault (.extract_cache/<key>.json).
+A note is re-extracted only when its body, the model, or the schema changed
+since its extract was written; unchanged notes are skipped, and a body whose
+key is already cached (e.g. an edit that was reverted) is filled in from the
+cache without calling the API. Resumable: each file is written as soon as its
+extract arrives, so an interrupted run picks up where it left off.
+
+Files are extracted concurrently (--workers) behind a shared rate limiter that
+follows the API's rate-limit headers and backs off on 429/529.
+
+With HARMONY_LLM_BACKEND=ollama the same extraction runs on the local Ollama
+model (qwen3:14b by default) at no per-call cost. The content key records the
+model, so switching backends re-extracts notes under the new model.
 
 Usage:
     # Extract a single file:
@@ -14,18 +28,46 @@ Usage:
 
     # Run on the default vault directory:
     python compute/extract_daily.py
+
+    # Backlog run with 8 concurrent requests:
+    python compute/extract_daily.py --workers 8
+
+    # Unattended backlog run via the Message Batches API (half price; rerun
+    # the same command after a restart to resume polling the same batch):
+    python compute/extract_daily.py --batch
+
+    # Ignore recorded keys and the cache; re-extract everything:
+    python compute/extract_daily.py --force
 """
 
 import argparse
+import hashlib
 import json
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import anthropic
 
-from llm_common import DAILY_INPUTS, EXTRACT_MARKER, MODEL, get_client
+from atomic_io import atomic_write_text
+from llm_common import (
+    CACHE_DIR,
+    DAILY_INPUTS,
+    EXTRACT_CACHE_DIR,
+    EXTRACT_MARKER,
+    MODEL,
+    OllamaClient,
+    RateLimiter,
+    TokenUsage,
+    create_message,
+    extract_json_section,
+    get_client,
+    model_for,
+)
 
-DELAY_SECONDS = 0.5
+DEFAULT_WORKERS = 4
+BATCH_POLL_SECONDS = 60
 
 SYSTEM_PROMPT = (
     "You are a personal data extraction assistant processing one person's daily note. "
@@ -160,19 +202,117 @@ _EXTRACT_TOOL: dict = {
 }
 
 
+# Changes whenever the prompt or tool schema is edited, so every note's key
+# changes with it and the whole vault is re-extracted under the new schema.
+SCHEMA_VERSION = hashlib.sha256(
+    json.dumps([SYSTEM_PROMPT, _EXTRACT_TOOL], sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
+_KEY_RE = re.compile(r"<!-- extract-key: ([0-9a-f]{64}) -->")
+
+
+# ---------------------------------------------------------------------------
+# Content keys and the extract cache
+# ---------------------------------------------------------------------------
+
+def split_note(text: str) -> tuple[str, str | None]:
+    """Return (body above the extract section, extract section or None)."""
+    idx = text.find(EXTRACT_MARKER)
+    if idx == -1:
+        return text.rstrip(), None
+    return text[:idx].rstrip(), text[idx:]
+
+
+def extract_key(body: str) -> str:
+    payload = "\0".join([body, model_for("extract"), SCHEMA_VERSION])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _recorded_key(section: str) -> str | None:
+    m = _KEY_RE.search(section)
+    return m.group(1) if m else None
+
+
+def load_cached(cache_dir: Path, key: str) -> dict | None:
+    try:
+        return json.loads((cache_dir / f"{key}.json").read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
 def already_extracted(path: Path) -> bool:
+    """True if `path` has an extract whose recorded key matches its current body."""
     try:
-        return EXTRACT_MARKER in path.read_text(encoding="utf-8")
+        body, section = split_note(path.read_text(encoding="utf-8"))
     except OSError:
         return False
+    return section is not None and _recorded_key(section) == extract_key(body)
 
 
-def extract_one(path: Path, client: anthropic.Anthropic) -> None:
-    if already_extracted(path):
-        print(f"  skip  {path.name}")
-        return
+def write_extract(path: Path, extract_data: dict, key: str, cache_dir: Path) -> None:
+    """Cache `extract_data` under `key` and (re)write the note's extract section."""
+    json_text = json.dumps(extract_data, indent=2, ensure_ascii=False)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(cache_dir / f"{key}.json", json_text)
+
+    body, _ = split_note(path.read_text(encoding="utf-8"))
+    section = (
+        "\n\n" + EXTRACT_MARKER + "\n\n"
+        + "<!-- extract-key: " + key + " -->\n\n"
+        + "```json\n" + json_text + "\n```\n"
+    )
+    atomic_write_text(path, body + section)
+
+
+def resolve_locally(path: Path, cache_dir: Path, force: bool = False) -> str | None:
+    """Bring `path` up to date without the API if possible.
 
-    content = path.read_text(encoding="utf-8")
+    Returns None when nothing more is needed (extract current, adopted, or
+    filled from the cache), otherwise the key an API extraction should be
+    recorded under.
+    """
+    text = path.read_text(encoding="utf-8")
+    body, section = split_note(text)
+    key = extract_key(body)
+    if force:
+        return key
+
+    if section is not None:
+        recorded = _recorded_key(section)
+        if recorded == key:
+            print(f"  skip  {path.name}")
+            return None
+        if recorded is None:
+            # Extract written before content keys existed: nothing says it is
+            # stale, so adopt it under the current key rather than paying to
+            # redo it. Later edits to the note are then detected normally.
+            extract_data = extract_json_section(text)
+            if extract_data is not None:
+                write_extract(path, extract_data, key, cache_dir)
+                print(f"  keyed {path.name}")
+                return None
+
+    cached = load_cached(cache_dir, key)
+    if cached is not None:
+        write_extract(path, cached, key, cache_dir)
+        print(f"  cache {path.name}")
+        return None
+    return key
+
+
+# The system prompt and tool schema are identical on every call, so both are
+# marked as prompt-cache breakpoints: after the first request of a run, every
+# later one reads that prefix from cache instead of paying for it again.
+_CACHED_SYSTEM = [
+    {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}},
+]
+_CACHED_TOOL = {**_EXTRACT_TOOL, "cache_control": {"type": "ephemeral"}}
+
+
+def build_request(path: Path) -> dict:
+    """Return the messages.create parameters for extracting one note."""
+    # Only the body is sent: a stale extract section must not leak into the prompt.
+    content, _ = split_note(path.read_text(encoding="utf-8"))
 
     # Build prompt without .format() to avoid issues with curly braces in journal text
     user_message = (
@@ -181,32 +321,216 @@ def extract_one(path: Path, client: anthropic.Anthropic) -> None:
         + content
     )
 
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=4096,
-        system=SYSTEM_PROMPT,
-        tools=[_EXTRACT_TOOL],
-        tool_choice={"type": "tool", "name": "extract_daily_data"},
-        messages=[{"role": "user", "content": user_message}],
-    )
+    return {
+        "model": MODEL,
+        "max_tokens": 4096,
+        "system": _CACHED_SYSTEM,
+        "tools": [_CACHED_TOOL],
+        "tool_choice": {"type": "tool", "name": "extract_daily_data"},
+        "messages": [{"role": "user", "content": user_message}],
+    }
+
 
-    extract_data: dict | None = None
-    for block in response.content:
+def tool_input(message) -> dict | None:
+    for block in message.content:
         if block.type == "tool_use":
-            extract_data = block.input
-            break
+            return block.input
+    return None
+
+
+def _cache_note(usage: TokenUsage | None, response_usage) -> str:
+    if usage is None:
+        return ""
+    read, write = usage.add(response_usage)
+    return f"  (cache read {read}, write {write})"
+
 
+def _extract_via_api(
+    path: Path,
+    key: str,
+    client: anthropic.Anthropic,
+    cache_dir: Path,
+    limiter: RateLimiter | None = None,
+    usage: TokenUsage | None = None,
+) -> None:
+    response = create_message(client, limiter, **build_request(path))
+    cache_note = _cache_note(usage, response.usage)
+
+    extract_data = tool_input(response)
     if extract_data is None:
         print(f"  FAIL  {path.name}: no tool_use block in response")
         return
 
-    json_block = "```json\n" + json.dumps(extract_data, indent=2, ensure_ascii=False) + "\n```"
-    section = "\n\n" + EXTRACT_MARKER + "\n\n" + json_block + "\n"
+    write_extract(path, extract_data, key, cache_dir)
+    print(f"  ok    {path.name}{cache_note}")
+
+
+def extract_one(
+    path: Path,
+    client: anthropic.Anthropic,
+    limiter: RateLimiter | None = None,
+    usage: TokenUsage | None = None,
+    cache_dir: Path = EXTRACT_CACHE_DIR,
+    force: bool = False,
+) -> None:
+    key = resolve_locally(path, cache_dir, force)
+    if key is not None:
+        _extract_via_api(path, key, client, cache_dir, limiter, usage)
+
 
-    with path.open("a", encoding="utf-8") as f:
-        f.write(section)
+def pending_api_work(files: list[Path], cache_dir: Path, force: bool = False) -> list[tuple[Path, str]]:
+    """Resolve what can be done locally; return [(path, key), ...] that still need the API."""
+    pending = []
+    for path in files:
+        key = resolve_locally(path, cache_dir, force)
+        if key is not None:
+            pending.append((path, key))
+    return pending
 
-    print(f"  ok    {path.name}")
+
+# ---------------------------------------------------------------------------
+# Batch mode
+# ---------------------------------------------------------------------------
+
+def batch_state_path(target: Path) -> Path:
+    """State file for the batch of one --dir/--file selection; selections don't share one."""
+    digest = hashlib.sha256(str(target.resolve()).encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / f"extract_batch-{digest}.json"
+
+
+def _load_batch_state(state_path: Path) -> dict | None:
+    try:
+        return json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def submit_batch(
+    pending: list[tuple[Path, str]],
+    client: anthropic.Anthropic,
+    state_path: Path,
+) -> dict | None:
+    """Submit every pending note as one Message Batch and persist its id."""
+    print(f"  {len(pending)} to submit")
+    if not pending:
+        return None
+
+    # custom_id must match ^[a-zA-Z0-9_-]{1,64}$, so key by position and keep
+    # the id -> (path, content key) mapping in the state file.
+    notes = {f"note-{i:05d}": [str(p.resolve()), key] for i, (p, key) in enumerate(pending)}
+    batch = client.messages.batches.create(
+        requests=[
+            {"custom_id": cid, "params": build_request(Path(p))}
+            for cid, (p, _key) in notes.items()
+        ]
+    )
+    state = {"batch_id": batch.id, "notes": notes}
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(state_path, json.dumps(state, indent=2))
+    print(f"  submitted batch {batch.id} ({len(notes)} requests)")
+    return state
+
+
+def collect_batch(
+    state: dict,
+    client: anthropic.Anthropic,
+    state_path: Path,
+    cache_dir: Path,
+    usage: TokenUsage | None = None,
+) -> int:
+    """Poll a submitted batch until it ends, then write each result back. Returns failures."""
+    batch_id = state["batch_id"]
+    while True:
+        batch = client.messages.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        print(f"  batch {batch_id}: {batch.processing_status} "
+              f"(processing={counts.processing} succeeded={counts.succeeded} "
+              f"errored={counts.errored} expired={counts.expired})")
+        if batch.processing_status == "ended":
+            break
+        time.sleep(BATCH_POLL_SECONDS)
+
+    failed = 0
+    for entry in client.messages.batches.results(batch_id):
+        path_str, key = state["notes"][entry.custom_id]
+        path = Path(path_str)
+        if entry.result.type != "succeeded":
+            print(f"  FAIL  {path.name}: batch result {entry.result.type}")
+            failed += 1
+            continue
+        if already_extracted(path):
+            print(f"  skip  {path.name}")
+            continue
+        cache_note = _cache_note(usage, entry.result.message.usage)
+        extract_data = tool_input(entry.result.message)
+        if extract_data is None:
+            print(f"  FAIL  {path.name}: no tool_use block in response")
+            failed += 1
+            continue
+        write_extract(path, extract_data, key, cache_dir)
+        print(f"  ok    {path.name}{cache_note}")
+
+    state_path.unlink(missing_ok=True)
+    return failed
+
+
+def run_batch(
+    files: list[Path],
+    client: anthropic.Anthropic,
+    state_path: Path,
+    cache_dir: Path,
+    usage: TokenUsage | None = None,
+    force: bool = False,
+) -> int:
+    """Finish any batch recorded in `state_path`, then batch this run's pending notes.
+
+    Returns failures.
+    """
+    failed = 0
+    state = _load_batch_state(state_path)
+    if state is not None:
+        print(f"Resuming batch {state['batch_id']} from {state_path}")
+        failed += collect_batch(state, client, state_path, cache_dir, usage)
+        # With --force, don't send the notes the resumed batch just wrote again.
+        resumed = {Path(p) for p, _key in state["notes"].values()}
+        files = [f for f in files if f.resolve() not in resumed]
+    state = submit_batch(pending_api_work(files, cache_dir, force), client, state_path)
+    if state is not None:
+        failed += collect_batch(state, client, state_path, cache_dir, usage)
+    return failed
+
+
+def run_concurrent(
+    files: list[Path],
+    client: anthropic.Anthropic,
+    workers: int,
+    cache_dir: Path,
+    limiter: RateLimiter | None = None,
+    usage: TokenUsage | None = None,
+    force: bool = False,
+) -> int:
+    """Extract `files` on a thread pool. Returns the number of failures."""
+    pending = pending_api_work(files, cache_dir, force)
+
+    def run(item: tuple[Path, str]) -> bool:
+        path, key = item
+        try:
+            _extract_via_api(path, key, client, cache_dir, limiter, usage)
+            return True
+        except Exception as exc:
+            print(f"  FAIL  {path.name}: {exc}")
+            return False
+
+    # Extract the first pending note on its own so its response writes the
+    # prompt cache before the pool fans out; otherwise every worker's first
+    # request pays the cache-write price for the same prefix.
+    failed = 0
+    if pending:
+        failed += not run(pending.pop(0))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        failed += sum(not ok for ok in pool.map(run, pending))
+    return failed
 
 
 def main() -> None:
@@ -217,9 +541,22 @@ def main() -> None:
     group.add_argument("--file", type=Path, help="Extract a single file")
     group.add_argument("--dir", type=Path, default=DAILY_INPUTS,
                        help="Extract all .md files in a directory")
+    parser.add_argument("--cache-dir", type=Path, default=EXTRACT_CACHE_DIR,
+                        help="Content-addressed extract cache (default: .extract_cache in the vault)")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-extract every note, ignoring recorded keys and the cache")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Concurrent extraction requests (default {DEFAULT_WORKERS})")
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="Initial requests-per-minute budget, before rate-limit headers arrive")
+    parser.add_argument("--batch", action="store_true",
+                        help="Submit all unextracted notes as one Message Batch and wait for it "
+                             "(resumes a previously submitted batch after a restart)")
     args = parser.parse_args()
 
-    client = get_client()
+    client = get_client("extract")
+    if args.batch and isinstance(client, OllamaClient):
+        raise SystemExit("--batch needs the Claude API; unset HARMONY_LLM_BACKEND=ollama")
 
     if args.file:
         files = [args.file]
@@ -230,12 +567,19 @@ def main() -> None:
             raise SystemExit(f"No YYYY-MM-DD.md files found in {target_dir}")
         print(f"Found {len(files)} daily note files in {target_dir}")
 
-    for i, path in enumerate(files):
-        extract_one(path, client)
-        if i < len(files) - 1:
-            time.sleep(DELAY_SECONDS)
+    usage = TokenUsage()
+    if args.batch:
+        state_path = batch_state_path(args.file or args.dir)
+        failed = run_batch(files, client, state_path, args.cache_dir, usage, args.force)
+    else:
+        limiter = RateLimiter(args.rpm) if args.rpm else None
+        failed = run_concurrent(
+            files, client, args.workers, args.cache_dir, limiter, usage, args.force
+        )
 
-    print("Done.")
+    if usage.calls:
+        print(f"Usage: {usage.summary()}")
+    print(f"Done. ({failed} failed)" if failed else "Done.")
 
 
 if __name__ == "__main__":
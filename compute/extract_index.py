@@ -0,0 +1,164 @@
+"""Persistent index of daily extracts.
+
+Every review and tracker script needs the parsed `## 🤖 Daily Extract` JSON of
+some date range. Re-reading and re-parsing every note in daily_inputs/ on each
+run is a full-vault scan, so this module keeps a small SQLite index keyed by
+date: one row per note with its mtime/size and the parsed extract. A refresh
+only stats the directory and re-parses notes whose mtime or size changed.
+
+The index is derived data — delete it at any time and it rebuilds on the next
+query. It lives under CACHE_DIR (local disk), not in the Nextcloud-synced
+vault, so the database file is never synced mid-write.
+
+Usage from a script:
+    from extract_index import load_extracts
+    extracts = load_extracts(DAILY_INPUTS, start="2025-07-01", end="2025-07-31")
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+
+from llm_common import CACHE_DIR, extract_json_section
+
+INDEX_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    date        TEXT PRIMARY KEY,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    extract     TEXT,
+    extract_sha TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def index_path(daily_dir: Path) -> Path:
+    """Return the index database for `daily_dir` (one index per source directory)."""
+    key = hashlib.sha256(str(daily_dir.resolve()).encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / f"extract_index_{key}.sqlite3"
+
+
+def _connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.executescript(_SCHEMA)
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if row is None or int(row[0]) != INDEX_VERSION:
+        # Layout changed since this index was built: start over.
+        with conn:
+            conn.execute("DELETE FROM notes")
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)",
+                (str(INDEX_VERSION),),
+            )
+    return conn
+
+
+def _parse_note(path: Path) -> tuple[str | None, str | None]:
+    """Return (extract_json, extract_sha) for one note, or (None, None) if not extracted."""
+    extract = extract_json_section(path.read_text(encoding="utf-8"))
+    if extract is None:
+        return None, None
+    canonical = json.dumps(extract, sort_keys=True, ensure_ascii=False)
+    return canonical, hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def refresh(conn: sqlite3.Connection, daily_dir: Path) -> int:
+    """Bring the index in line with `daily_dir`. Returns the number of notes re-parsed."""
+    on_disk: dict[str, tuple[Path, int, int]] = {}
+    for path in daily_dir.glob("????-??-??.md"):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        on_disk[path.stem] = (path, st.st_mtime_ns, st.st_size)
+
+    indexed = {
+        date: (mtime_ns, size)
+        for date, mtime_ns, size in conn.execute("SELECT date, mtime_ns, size FROM notes")
+    }
+
+    changed = 0
+    with conn:
+        for date in indexed.keys() - on_disk.keys():
+            conn.execute("DELETE FROM notes WHERE date = ?", (date,))
+        for date, (path, mtime_ns, size) in on_disk.items():
+            if indexed.get(date) == (mtime_ns, size):
+                continue
+            try:
+                extract, extract_sha = _parse_note(path)
+            except OSError:
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO notes (date, mtime_ns, size, extract, extract_sha) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (date, mtime_ns, size, extract, extract_sha),
+            )
+            changed += 1
+    return changed
+
+
+def _range_clause(start: str | None, end: str | None) -> tuple[str, list[str]]:
+    # Dates are ISO strings, so a prefix bound like "2025-07" compares correctly:
+    # "2025-07-01" >= "2025-07", and "2025-07-31" <= "2025-07" + "\uffff".
+    clauses, params = ["extract IS NOT NULL"], []
+    if start:
+        clauses.append("date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("date <= ?")
+        params.append(end if len(end) == 10 else end + "\uffff")
+    return " AND ".join(clauses), params
+
+
+def load_extracts(
+    daily_dir: Path,
+    start: str | None = None,
+    end: str | None = None,
+    db_path: Path | None = None,
+) -> list[tuple[str, dict]]:
+    """Return [(date_str, extract_dict), ...] for extracted notes in [start, end], sorted by date.
+
+    `start` and `end` are inclusive and may be a full date (YYYY-MM-DD) or a
+    prefix (YYYY-MM, YYYY). Refreshes the index for changed files first.
+    """
+    conn = _connect(db_path or index_path(daily_dir))
+    try:
+        refresh(conn, daily_dir)
+        where, params = _range_clause(start, end)
+        rows = conn.execute(
+            f"SELECT date, extract FROM notes WHERE {where} ORDER BY date", params
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(date, json.loads(extract)) for date, extract in rows]
+
+
+def load_fingerprints(
+    daily_dir: Path,
+    start: str | None = None,
+    end: str | None = None,
+    db_path: Path | None = None,
+) -> dict[str, str]:
+    """Return {date_str: sha256 of the canonical extract JSON} for extracted notes in range.
+
+    Cheap change detection for downstream builds: the hash only changes when
+    the parsed extract does, not when unrelated parts of the note are edited.
+    """
+    conn = _connect(db_path or index_path(daily_dir))
+    try:
+        refresh(conn, daily_dir)
+        where, params = _range_clause(start, end)
+        rows = conn.execute(
+            f"SELECT date, extract_sha FROM notes WHERE {where} ORDER BY date", params
+        ).fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
@@ -0,0 +1,117 @@
+"""VRAM-budgeted admission control for GPU work in the transcription API.
+
+Forge's 3090 is shared: Ollama keeps a model resident, and Whisper and
+DeepFilterNet jobs arrive from the Slack bot and from backlog batches. Each
+piece of GPU work declares an estimated VRAM cost and a priority class, and
+`GpuScheduler.slot` admits it only while the running total stays within the
+budget (WHISPER_GPU_BUDGET_MB — whatever Ollama leaves free). Everything else
+waits in one queue ordered by priority, then arrival: an interactive Slack
+request goes ahead of queued backlog work but never preempts running work.
+Admission is strictly in queue order, so a large job at the head is not
+starved by a stream of smaller ones behind it.
+
+A cost larger than the whole budget is clamped to it (the job then runs
+alone) rather than never being admitted.
+
+Memory that stays allocated between jobs — Whisper's weights while the model
+is loaded but idle — is held with `reserve` and handed back with `release`,
+so the budget counts it even when nothing is running.
+
+Single event loop only: slot() is awaited from request handlers and job
+workers on the server's loop; the GPU work itself runs in executor threads
+inside the slot.
+"""
+
+import asyncio
+import heapq
+import itertools
+from contextlib import asynccontextmanager
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITIES = {"interactive": INTERACTIVE, "batch": BATCH}
+
+
+class GpuScheduler:
+    def __init__(self, budget_mb: int):
+        self.budget_mb = budget_mb
+        self.in_use_mb = 0
+        self.reserved_mb = 0
+        self.running = 0
+        self._waiters: list[tuple[int, int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _wake(self) -> None:
+        while self._waiters:
+            _priority, _seq, cost, future = self._waiters[0]
+            if future.done():  # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            if self.in_use_mb + cost > self.budget_mb:
+                return
+            heapq.heappop(self._waiters)
+            self.in_use_mb += cost
+            future.set_result(None)
+
+    def _release(self, cost: int) -> None:
+        self.in_use_mb -= cost
+        self._wake()
+
+    async def _admit(self, cost: int, priority: int) -> None:
+        """Wait until `cost` fits and it is this request's turn, then take it."""
+        if not self._waiters and self.in_use_mb + cost <= self.budget_mb:
+            self.in_use_mb += cost
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), cost, future))
+        # It may have gone to the head of the queue and fit what is free now.
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: give the budget back.
+                self._release(cost)
+            else:
+                future.cancel()
+                self._wake()
+            raise
+
+    @asynccontextmanager
+    async def slot(self, cost_mb: int, priority: int = BATCH):
+        """Hold `cost_mb` of the VRAM budget for the duration of the block."""
+        cost = min(cost_mb, self.budget_mb)
+        await self._admit(cost, priority)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self._release(cost)
+
+    async def reserve(self, cost_mb: int, priority: int = BATCH) -> int:
+        """Hold `cost_mb` until `release`, for memory that outlives any one run
+        (e.g. model weights left loaded between requests). Returns the amount
+        held, which is what to pass to `release`."""
+        cost = min(cost_mb, self.budget_mb)
+        await self._admit(cost, priority)
+        self.reserved_mb += cost
+        return cost
+
+    def release(self, cost: int) -> None:
+        self.reserved_mb -= cost
+        self._release(cost)
+
+    def stats(self) -> dict:
+        queued = {name: 0 for name in PRIORITIES}
+        names = {v: k for k, v in PRIORITIES.items()}
+        for priority, _seq, _cost, future in self._waiters:
+            if not future.done():
+                queued[names.get(priority, str(priority))] += 1
+        return {
+            "budget_mb": self.budget_mb,
+            "in_use_mb": self.in_use_mb,
+            "reserved_mb": self.reserved_mb,
+            "running": self.running,
+            "queued": queued,
+        }
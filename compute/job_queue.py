@@ -0,0 +1,185 @@
+"""Persistent job queue for the transcription API.
+
+A job is one uploaded recording plus what to do with it (transcribe or clean).
+Its input and result live in JOB_DIR/<id>/ and its state in
+JOB_DIR/jobs.sqlite3, so a job outlives the HTTP request that submitted it: the
+client can disconnect, and poll or fetch the result later, and a job that was
+running when the server stopped is queued again at startup.
+
+    queued -> running -> done | failed
+
+Queued jobs are claimed by priority (0 = interactive first), then age.
+Finished jobs (and their files) are pruned after JOB_RETENTION_DAYS.
+
+Stdlib only, like chunking.py, so transcribe_api can import it on Forge.
+"""
+
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+JOB_DIR = Path(
+    os.environ.get("WHISPER_JOB_DIR")
+    or Path(os.environ.get("HARMONY_CACHE_DIR", Path.home() / ".cache" / "harmony")) / "transcribe_jobs"
+)
+JOB_RETENTION_DAYS = int(os.environ.get("WHISPER_JOB_RETENTION_DAYS", "7"))
+
+KINDS = ("transcribe", "clean")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    priority    INTEGER NOT NULL DEFAULT 1,
+    filename    TEXT NOT NULL,
+    options     TEXT NOT NULL,
+    state       TEXT NOT NULL DEFAULT 'queued',
+    progress    REAL NOT NULL DEFAULT 0,
+    result      TEXT,
+    error       TEXT,
+    created_at  TEXT NOT NULL,
+    started_at  TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at);
+"""
+
+_COLUMNS = ("id", "kind", "priority", "filename", "options", "state", "progress", "result", "error",
+            "created_at", "started_at", "finished_at")
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class JobStore:
+    """Thread-safe: jobs run in executor threads and report progress from there."""
+
+    def __init__(self, root: Path = JOB_DIR):
+        root.mkdir(parents=True, exist_ok=True)
+        self.root = root
+        self.conn = sqlite3.connect(root / "jobs.sqlite3", check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+        if "priority" not in columns:  # stores created before priorities existed
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 1")
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.root / job_id
+
+    def new_id(self) -> str:
+        """An id whose directory exists, for staging the input before `add`."""
+        job_id = uuid.uuid4().hex
+        self.job_dir(job_id).mkdir(parents=True)
+        return job_id
+
+    def add(
+        self, job_id: str, kind: str, filename: str, options: dict | None = None, priority: int = 1
+    ) -> None:
+        if kind not in KINDS:
+            raise ValueError(f"unknown job kind: {kind}")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, kind, priority, filename, options, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, priority, filename, json.dumps(options or {}), _now()),
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["options"] = json.loads(job["options"])
+        return job
+
+    def position(self, job_id: str) -> int | None:
+        """Jobs queued ahead of `job_id` (0 = next), or None if it isn't queued."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT priority, created_at, rowid FROM jobs WHERE id = ? AND state = 'queued'",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'queued' "
+                "AND (priority, created_at, rowid) < (?, ?, ?)",
+                row,
+            ).fetchone()[0]
+
+    def claim_next(self) -> dict | None:
+        """Mark the next queued job (by priority, then age) running and return it, or None."""
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT id FROM jobs WHERE state = 'queued' "
+                "ORDER BY priority, created_at, rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET state = 'running', progress = 0, started_at = ? WHERE id = ?",
+                (_now(), row[0]),
+            )
+        return self.get(row[0])
+
+    def set_progress(self, job_id: str, progress: float) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ?",
+                (round(min(max(progress, 0.0), 1.0), 3), job_id),
+            )
+
+    def finish(self, job_id: str, result: str) -> None:
+        """Mark done; `result` is the result file's name inside the job directory."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'done', progress = 1, result = ?, finished_at = ? WHERE id = ?",
+                (result, _now(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, _now(), job_id),
+            )
+
+    def requeue_running(self) -> int:
+        """Queue again any job left running by a stopped server; returns how many."""
+        with self._lock, self.conn:
+            return self.conn.execute(
+                "UPDATE jobs SET state = 'queued', progress = 0, started_at = NULL "
+                "WHERE state = 'running'"
+            ).rowcount
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+
+    def prune(self, days: int = JOB_RETENTION_DAYS) -> int:
+        """Delete finished jobs older than `days`, with their files; returns how many."""
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=days)).isoformat(timespec="seconds")
+        with self._lock, self.conn:
+            old = [
+                job_id for (job_id,) in self.conn.execute(
+                    "SELECT id FROM jobs WHERE state IN ('done', 'failed') AND finished_at < ?",
+                    (cutoff,),
+                )
+            ]
+            self.conn.executemany("DELETE FROM jobs WHERE id = ?", [(j,) for j in old])
+        for job_id in old:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+        return len(old)
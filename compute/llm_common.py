@@ -1,14 +1,33 @@
 """Shared helpers for the compute/ review and extraction scripts.
 
-Common pieces: the Claude API client, the daily-extract JSON-fence parser,
-and the shared vault paths used across extraction, reviews, and recurring
-trackers.
+Common pieces: the LLM client (Claude API, or a local Ollama server) and a
+rate-limited call wrapper for running many requests concurrently, the
+daily-extract JSON-fence parser, and the shared vault paths used across
+extraction, reviews, and recurring trackers. CACHE_DIR holds rebuildable
+derived data (indexes, caches) on local disk, outside the synced vault;
+override it with HARMONY_CACHE_DIR.
+
+Backend selection: HARMONY_LLM_BACKEND=ollama sends every call to the Ollama
+server at OLLAMA_URL (Forge, over Tailscale) instead of the Claude API, with
+the model chosen per task — qwen3:14b for daily extraction, qwen3:32b for
+reviews and clustering (override with OLLAMA_EXTRACT_MODEL /
+OLLAMA_REVIEW_MODEL). OllamaClient mimics the small part of the anthropic
+client the scripts use, so call sites don't change.
 """
 
+import datetime
 import json
 import os
+import random
 import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import SimpleNamespace
 
 import anthropic
 
@@ -18,18 +37,330 @@ EXTRACT_MARKER = "## 🤖 Daily Extract"
 VAULT_ROOT = Path("/home/aharon/Documents/vault-alpha/3_Nutrients")
 DAILY_INPUTS = VAULT_ROOT / "daily_inputs"
 RECURRING_TASKS_PATH = VAULT_ROOT / "recurring_tasks.md"
+EXTRACT_CACHE_DIR = VAULT_ROOT / ".extract_cache"
+CACHE_DIR = Path(
+    os.environ.get("HARMONY_CACHE_DIR", Path.home() / ".cache" / "harmony")
+)
 
 _JSON_FENCE_RE = re.compile(r"```json\s*(.*?)\s*```", re.DOTALL)
 
+# Starting point for the request bucket until the API's headers say otherwise.
+DEFAULT_REQUESTS_PER_MINUTE = 50
+MAX_ATTEMPTS = 6
+_RETRY_STATUS = {429, 500, 502, 503, 529}
+_RATELIMIT_KINDS = ("requests", "tokens", "input-tokens", "output-tokens")
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+OLLAMA_MODELS = {"extract": "qwen3:14b", "review": "qwen3:32b"}
+# Ollama's default context window (2–4k tokens) silently truncates a month of
+# extracts; ask for enough room for the largest review prompt.
+OLLAMA_NUM_CTX = 32768
+OLLAMA_TIMEOUT_SECONDS = 900
+_THINK_RE = re.compile(r"<think>.*?</think>\s*", re.DOTALL)
+
+
+def llm_backend() -> str:
+    """"anthropic" (default) or "ollama", from HARMONY_LLM_BACKEND."""
+    backend = os.environ.get("HARMONY_LLM_BACKEND", "anthropic").strip().lower()
+    if backend not in ("anthropic", "ollama"):
+        raise SystemExit(f"Unknown HARMONY_LLM_BACKEND {backend!r} (expected anthropic or ollama)")
+    return backend
+
+
+def model_for(task: str = "review") -> str:
+    """The model that will actually answer calls for `task` ("extract" or "review")."""
+    if llm_backend() == "ollama":
+        return os.environ.get(f"OLLAMA_{task.upper()}_MODEL", OLLAMA_MODELS[task])
+    return MODEL
+
 
-def get_client() -> anthropic.Anthropic:
-    """Build an Anthropic client from ANTHROPIC_API_KEY, or exit with an error."""
+def get_client(task: str = "review") -> "anthropic.Anthropic | OllamaClient":
+    """Build the client for `task` on the configured backend, or exit with an error."""
+    if llm_backend() == "ollama":
+        url = os.environ.get("OLLAMA_URL", DEFAULT_OLLAMA_URL)
+        return OllamaClient(url, model_for(task))
     api_key = os.environ.get("ANTHROPIC_API_KEY")
     if not api_key:
         raise SystemExit("ANTHROPIC_API_KEY environment variable not set")
     return anthropic.Anthropic(api_key=api_key)
 
 
+class OllamaError(RuntimeError):
+    pass
+
+
+class OllamaClient:
+    """Minimal stand-in for anthropic.Anthropic backed by Ollama's /api/chat.
+
+    Supports `client.messages.create(...)` with the parameters the compute
+    scripts pass: system (string or cached text blocks), user/assistant
+    messages, max_tokens, temperature, and a forced tool via tool_choice.
+    A forced tool becomes Ollama's structured-output mode (`format` = the
+    tool's input_schema) and the reply comes back as a tool_use block, so
+    extraction and clustering code reads it exactly as it reads Claude's.
+    The `model` argument from call sites names a Claude model and is
+    ignored; the client answers with the Ollama model it was built for.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_OLLAMA_URL, model: str = OLLAMA_MODELS["review"],
+                 timeout: float = OLLAMA_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.timeout = timeout
+        self.messages = _OllamaMessages(self)
+
+    def chat(self, payload: dict) -> dict:
+        request = urllib.request.Request(
+            f"{self.base_url}/api/chat",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except urllib.error.HTTPError as exc:
+            detail = exc.read().decode("utf-8", "replace")[:500]
+            raise OllamaError(f"Ollama HTTP {exc.code}: {detail}") from exc
+        except (urllib.error.URLError, OSError) as exc:
+            raise OllamaError(f"Ollama unreachable at {self.base_url}: {exc}") from exc
+
+
+def _text_of(content) -> str:
+    """Flatten an Anthropic content value (string or list of blocks) to plain text."""
+    if isinstance(content, str):
+        return content
+    return "\n\n".join(block["text"] for block in content if block.get("type") == "text")
+
+
+class _OllamaMessages:
+    def __init__(self, client: OllamaClient):
+        self._client = client
+
+    def create(self, *, max_tokens: int, messages: list[dict], system=None, tools=None,
+               tool_choice=None, temperature: float | None = None, **_ignored):
+        tool = None
+        if tool_choice and tool_choice.get("type") == "tool":
+            tool = next(t for t in tools if t["name"] == tool_choice["name"])
+
+        chat = []
+        if system:
+            chat.append({"role": "system", "content": _text_of(system)})
+        if tool is not None:
+            chat.append({
+                "role": "system",
+                "content": "Respond only with a JSON object for `" + tool["name"] + "`: "
+                           + tool.get("description", ""),
+            })
+        chat.extend({"role": m["role"], "content": _text_of(m["content"])} for m in messages)
+
+        options = {"num_predict": max_tokens, "num_ctx": OLLAMA_NUM_CTX}
+        if temperature is not None:
+            options["temperature"] = temperature
+        payload = {
+            "model": self._client.model,
+            "messages": chat,
+            "stream": False,
+            "think": False,
+            "options": options,
+        }
+        if tool is not None:
+            payload["format"] = tool["input_schema"]
+
+        data = self._client.chat(payload)
+        text = _THINK_RE.sub("", data.get("message", {}).get("content", "")).strip()
+        if tool is not None:
+            try:
+                block = SimpleNamespace(type="tool_use", id="ollama-tool", name=tool["name"],
+                                        input=json.loads(text))
+            except json.JSONDecodeError as exc:
+                raise OllamaError(f"{self._client.model} returned invalid JSON: {exc}") from exc
+        else:
+            block = SimpleNamespace(type="text", text=text)
+        return SimpleNamespace(
+            model=self._client.model,
+            content=[block],
+            stop_reason="max_tokens" if data.get("done_reason") == "length" else "end_turn",
+            usage=SimpleNamespace(
+                input_tokens=data.get("prompt_eval_count", 0),
+                output_tokens=data.get("eval_count", 0),
+                cache_read_input_tokens=0,
+                cache_creation_input_tokens=0,
+            ),
+        )
+
+
+class RateLimiter:
+    """Thread-safe token bucket for API requests.
+
+    Starts at DEFAULT_REQUESTS_PER_MINUTE and re-tunes itself from the
+    anthropic-ratelimit-* response headers: the bucket size and refill rate
+    follow the reported request limit, and any exhausted limit (requests or
+    tokens) pauses all workers until its reset time.
+    """
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE):
+        self._lock = threading.Lock()
+        self._capacity = float(requests_per_minute)
+        self._rate = requests_per_minute / 60.0
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller of acquire() for at least `seconds`."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers) -> None:
+        limit = _header_float(headers, "anthropic-ratelimit-requests-limit")
+        remaining = _header_float(headers, "anthropic-ratelimit-requests-remaining")
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                self._capacity = limit
+                self._rate = limit / 60.0
+            if remaining is not None:
+                self._tokens = min(self._tokens, remaining)
+        for kind in _RATELIMIT_KINDS:
+            if _header_float(headers, f"anthropic-ratelimit-{kind}-remaining") == 0:
+                wait = _seconds_until(headers.get(f"anthropic-ratelimit-{kind}-reset"))
+                if wait:
+                    self.pause(wait)
+
+
+def _header_float(headers, name: str) -> float | None:
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _seconds_until(reset: str | None) -> float | None:
+    """Seconds from now until an RFC 3339 reset timestamp, or None if unparseable."""
+    if not reset:
+        return None
+    try:
+        at = datetime.datetime.fromisoformat(reset.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, (at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+
+
+_shared_limiter = RateLimiter()
+
+
+def shared_limiter() -> RateLimiter:
+    """The process-wide limiter; every concurrent caller should draw from this one bucket."""
+    return _shared_limiter
+
+
+def create_message(client: anthropic.Anthropic, limiter: RateLimiter | None = None, **kwargs):
+    """`client.messages.create(**kwargs)` behind the rate limiter, with backoff.
+
+    Retries 429/529 (and transient 5xx / connection errors) up to MAX_ATTEMPTS,
+    honouring retry-after when the API sends one and otherwise backing off
+    exponentially with jitter. The pause applies to the whole limiter, so
+    other workers back off too instead of piling onto an overloaded API.
+    An OllamaClient is called directly: a local server has no rate limits
+    and queues concurrent requests itself.
+    """
+    if isinstance(client, OllamaClient):
+        return client.messages.create(**kwargs)
+    limiter = limiter or _shared_limiter
+    raw_client = client.with_options(max_retries=0)
+    for attempt in range(MAX_ATTEMPTS):
+        limiter.acquire()
+        try:
+            raw = raw_client.messages.with_raw_response.create(**kwargs)
+        except (anthropic.APIStatusError, anthropic.APIConnectionError) as exc:
+            status = getattr(exc, "status_code", None)
+            if (status is not None and status not in _RETRY_STATUS) or attempt == MAX_ATTEMPTS - 1:
+                raise
+            headers = exc.response.headers if status is not None else {}
+            limiter.update_from_headers(headers)
+            delay = _header_float(headers, "retry-after")
+            if delay is None:
+                delay = min(60.0, 2.0 ** attempt) * (0.5 + random.random())
+            print(f"  retry  API {status or 'connection error'}, backing off {delay:.1f}s")
+            limiter.pause(delay)
+            continue
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
+    raise AssertionError("unreachable")
+
+
+class TokenUsage:
+    """Thread-safe running total of input-token usage, including prompt-cache reads/writes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_write_tokens = 0
+        self.cache_read_tokens = 0
+        self.output_tokens = 0
+
+    def add(self, usage) -> tuple[int, int]:
+        """Record one response's usage; returns (cache_read, cache_write) for that call."""
+        read = getattr(usage, "cache_read_input_tokens", None) or 0
+        write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += usage.input_tokens
+            self.output_tokens += usage.output_tokens
+            self.cache_read_tokens += read
+            self.cache_write_tokens += write
+        return read, write
+
+    def summary(self) -> str:
+        # Cache reads bill at 0.1x the input rate and cache writes at 1.25x,
+        # so the saving is expressed in full-price input-token equivalents.
+        saved = 0.9 * self.cache_read_tokens - 0.25 * self.cache_write_tokens
+        return (
+            f"{self.calls} calls: {self.input_tokens} uncached input, "
+            f"{self.cache_write_tokens} cache-write, {self.cache_read_tokens} cache-read, "
+            f"{self.output_tokens} output tokens; ~{saved:.0f} input tokens saved by caching"
+        )
+
+
+def run_jobs(jobs: list[tuple[str, Callable[[], None]]], workers: int) -> int:
+    """Run labelled jobs on a bounded thread pool; returns how many raised.
+
+    A failure is printed and counted rather than aborting the other jobs, so
+    one bad period doesn't stop a long backfill.
+    """
+    def run(job: tuple[str, Callable[[], None]]) -> bool:
+        label, fn = job
+        try:
+            fn()
+            return True
+        except Exception as exc:
+            print(f"  FAIL  {label}: {exc}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return sum(not ok for ok in pool.map(run, jobs))
+
+
 def extract_json_section(text: str) -> dict | None:
     """Parse the ```json fenced block under the Daily Extract marker, if present."""
     idx = text.find(EXTRACT_MARKER)
@@ -0,0 +1,208 @@
+"""Manifest of every media file in a transcription backlog, for resumable runs.
+
+One SQLite row per media file found under the input tree (recursively):
+
+    path          absolute path, the key
+    size/mtime_ns what the row was last scanned at
+    content_hash  sha256 over the size and three 1 MiB samples (start, middle,
+                  end); cheap enough to scan terabytes, distinctive enough to
+                  spot the same recording copied into two folders
+    duration/date from transcribe.probe_media, filled in before a run
+    output_path   where the transcript goes; <stem>.md unless another file
+                  already claimed that name, then <stem>-<hash8>.md
+    state         pending -> running -> done | failed; duplicate for a file
+                  whose content_hash matches an earlier row
+    attempts/error
+
+Transcripts are written atomically, so an output exists only once it is
+finished; a row left `running` by a killed run is simply pending again on the
+next one (reset_running). The first time a file is scanned, an existing
+transcript at its default output path is adopted as done, so directories
+transcribed before the manifest existed are not redone.
+"""
+
+import datetime
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+STATES = ("pending", "running", "done", "failed", "duplicate")
+_SAMPLE_BYTES = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path         TEXT PRIMARY KEY,
+    size         INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    duration     REAL,
+    date         TEXT,
+    output_path  TEXT NOT NULL,
+    state        TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    error        TEXT,
+    updated_at   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_state ON files (state, date);
+CREATE INDEX IF NOT EXISTS files_hash ON files (content_hash);
+"""
+
+
+def content_hash(path: Path, size: int) -> str:
+    """sha256 of the size plus 1 MiB samples from the start, middle and end of the file."""
+    h = hashlib.sha256(str(size).encode("ascii"))
+    with path.open("rb") as f:
+        for offset in sorted({0, max(size // 2 - _SAMPLE_BYTES // 2, 0), max(size - _SAMPLE_BYTES, 0)}):
+            f.seek(offset)
+            h.update(f.read(_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+class Manifest:
+    """Thread-safe: the pipelined transcriber updates it from its writer thread."""
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "Manifest":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def scan(self, root: Path, out_dir: Path, extensions: "set[str]") -> "dict[str, int]":
+        """Register new and changed media files under `root`; drop rows for files that are gone.
+
+        Returns counts of "new", "changed" and "removed" rows.
+        """
+        root = root.resolve()
+        on_disk = {}
+        for p in root.rglob("*"):
+            if p.suffix.lower() in extensions and p.is_file():
+                st = p.stat()
+                on_disk[str(p)] = (p, st.st_size, st.st_mtime_ns)
+
+        counts = {"new": 0, "changed": 0, "removed": 0}
+        with self._lock, self.conn:
+            known = {
+                row[0]: row[1:]
+                for row in self.conn.execute(
+                    "SELECT path, size, mtime_ns, content_hash, state FROM files "
+                    "WHERE path >= ? AND path < ?",
+                    (str(root) + "/", str(root) + "0"),  # "0" sorts right after "/"
+                )
+            }
+            for key in sorted(set(known) - set(on_disk)):
+                self.conn.execute("DELETE FROM files WHERE path = ?", (key,))
+                counts["removed"] += 1
+
+            for key in sorted(on_disk):
+                path, size, mtime_ns = on_disk[key]
+                old = known.get(key)
+                if old and old[:2] == (size, mtime_ns):
+                    continue
+                digest = content_hash(path, size)
+                if old:
+                    counts["changed"] += 1
+                    if digest == old[2]:
+                        # Touched, not modified: keep its state.
+                        self.conn.execute(
+                            "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                            (size, mtime_ns, key),
+                        )
+                    else:
+                        self.conn.execute(
+                            "UPDATE files SET size = ?, mtime_ns = ?, content_hash = ?, "
+                            "duration = NULL, date = NULL, state = 'pending', attempts = 0, "
+                            "error = NULL, updated_at = ? WHERE path = ?",
+                            (size, mtime_ns, digest, _now(), key),
+                        )
+                    continue
+
+                counts["new"] += 1
+                original = self.conn.execute(
+                    "SELECT output_path FROM files WHERE content_hash = ? AND state != 'duplicate' "
+                    "ORDER BY path LIMIT 1",
+                    (digest,),
+                ).fetchone()
+                if original:
+                    state, output = "duplicate", original[0]
+                else:
+                    output = str(out_dir.resolve() / f"{path.stem}.md")
+                    claimed = self.conn.execute(
+                        "SELECT 1 FROM files WHERE output_path = ?", (output,)
+                    ).fetchone()
+                    if claimed:
+                        output = str(out_dir.resolve() / f"{path.stem}-{digest[:8]}.md")
+                        state = "pending"
+                    else:
+                        state = "done" if Path(output).exists() else "pending"
+                self.conn.execute(
+                    "INSERT INTO files (path, size, mtime_ns, content_hash, output_path, state, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, size, mtime_ns, digest, output, state, _now()),
+                )
+        return counts
+
+    def reset_running(self) -> int:
+        """Return rows left `running` by an interrupted run to pending; returns how many."""
+        with self._lock, self.conn:
+            return self.conn.execute(
+                "UPDATE files SET state = 'pending', updated_at = ? WHERE state = 'running'",
+                (_now(),),
+            ).rowcount
+
+    def paths(self, states: "tuple[str, ...]") -> "list[Path]":
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT path FROM files WHERE state IN ({','.join('?' * len(states))}) ORDER BY path",
+                states,
+            ).fetchall()
+        return [Path(p) for (p,) in rows]
+
+    def set_metadata(self, path: Path, date: datetime.date, duration: "float | None") -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE files SET date = ?, duration = ? WHERE path = ?",
+                (date.isoformat(), duration, str(path)),
+            )
+
+    def select(
+        self, states: "tuple[str, ...]", newest_first: bool = False, limit: "int | None" = None
+    ) -> "list[tuple[Path, Path]]":
+        """(media path, output path) rows in `states`, ordered by date."""
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT path, output_path FROM files WHERE state IN ({','.join('?' * len(states))}) "
+                f"ORDER BY date IS NULL, date {order}, path LIMIT ?",
+                (*states, -1 if limit is None else limit),
+            ).fetchall()
+        return [(Path(p), Path(o)) for p, o in rows]
+
+    def mark(self, path: Path, state: str, error: "str | None" = None) -> None:
+        """Move `path` to `state`; entering `running` counts an attempt."""
+        if state not in STATES:
+            raise ValueError(f"unknown state: {state}")
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE files SET state = ?, error = ?, updated_at = ?, "
+                "attempts = attempts + (? = 'running') WHERE path = ?",
+                (state, error, _now(), state, str(path)),
+            )
+
+    def counts(self) -> "dict[str, int]":
+        with self._lock:
+            found = dict(self.conn.execute("SELECT state, COUNT(*) FROM files GROUP BY state"))
+        return {s: found.get(s, 0) for s in STATES}
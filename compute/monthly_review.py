@@ -1,7 +1,10 @@
 """Monthly review.
 
 Generates a monthly review from all extracted daily notes in a given month.
-Backfill mode processes every month since --start.
+Extracts are packed into a token budget (--token-budget) by prompt_packer,
+most informative fields first; each review logs what the packing kept.
+Backfill mode processes every month since --start, up to --workers months at
+a time behind the shared API rate limiter.
 
 Usage:
     python compute/monthly_review.py --backfill --start 2025-07
@@ -9,28 +12,45 @@ Usage:
 """
 
 import argparse
-import json
-import time
 from collections import defaultdict
 from datetime import date
 from pathlib import Path
 
 import anthropic
 
+from atomic_io import atomic_write_text
+from extract_index import load_extracts
 from llm_common import (
     DAILY_INPUTS,
     MODEL,
     RECURRING_TASKS_PATH,
-    extract_json_section,
+    create_message,
     get_client,
     load_recurring_tasks,
+    run_jobs,
 )
+from prompt_packer import PackResult, pack_extracts
+from review_stats import stats_block
 
 MONTHLY_OUT = Path(
     "/home/aharon/Documents/vault-alpha/3_Nutrients/monthly_reviews"
 )
 MIN_DAYS = 10
-DELAY_SECONDS = 0.5
+BACKFILL_WORKERS = 4
+# Leaves room for instructions, recurring-task context and a 4k-token reply
+# inside a 32k context window.
+TOKEN_BUDGET = 16000
+# Packed in this order: what fits first survives a tight budget.
+PROMPT_FIELDS = [
+    "summary",
+    "spiritual_movement",
+    "energy_level",
+    "struggles_and_fears",
+    "creative_spark_moment",
+    "spiritual_consolation_source",
+    "tasks_and_intentions",
+    "verse_and_lyrical_lines",
+]
 
 _MONTH_NAMES = {
     1: "January", 2: "February", 3: "March", 4: "April",
@@ -40,15 +60,7 @@ _MONTH_NAMES = {
 
 
 def load_all_extracts(daily_dir: Path, start: str | None = None) -> list[tuple[str, dict]]:
-    results = []
-    for path in sorted(daily_dir.glob("????-??-??.md")):
-        if start and path.stem[:7] < start:
-            continue
-        text = path.read_text(encoding="utf-8")
-        extract = extract_json_section(text)
-        if extract is not None:
-            results.append((path.stem, extract))
-    return results
+    return load_extracts(daily_dir, start=start[:7] if start else None)
 
 
 def group_by_month(extracts: list[tuple[str, dict]]) -> dict[str, list[tuple[str, dict]]]:
@@ -83,30 +95,18 @@ def build_recurring_context(global_text: str | None, windowed_text: str | None)
 
 
 def build_monthly_prompt(
-    month_label: str, extracts: list[tuple[str, dict]], recurring_context: str = ""
-) -> str:
+    month_label: str,
+    extracts: list[tuple[str, dict]],
+    recurring_context: str = "",
+    token_budget: int = TOKEN_BUDGET,
+) -> tuple[str, PackResult]:
     year, month = int(month_label[:4]), int(month_label[5:])
     month_name = _MONTH_NAMES[month]
     n = len(extracts)
 
-    parts = []
-    for date_str, data in extracts:
-        condensed = {
-            "date": date_str,
-            "summary": data.get("summary", ""),
-            "energy_level": data.get("energy_level", ""),
-            "spiritual_movement": data.get("spiritual_movement", ""),
-            "creative_spark_moment": data.get("creative_spark_moment", []),
-            "struggles_and_fears": data.get("struggles_and_fears", []),
-            "spiritual_consolation_source": data.get("spiritual_consolation_source", ""),
-            "verse_and_lyrical_lines": data.get("verse_and_lyrical_lines", []),
-            "tasks_and_intentions": data.get("tasks_and_intentions", []),
-        }
-        parts.append("--- " + date_str + " ---\n" + json.dumps(condensed, indent=2, ensure_ascii=False))
-
-    extracts_block = "\n\n".join(parts)
-
-    return (
+    packed = pack_extracts(extracts, PROMPT_FIELDS, token_budget)
+
+    prompt = (
         "You are writing a monthly review for a personal journaling pipeline. "
         "Below are condensed daily extracts for " + str(n) + " days in " + month_name + " " + str(year) + ". "
         "This person is a creative-prophetic artist in NYC doing Ignatian spiritual practice.\n\n"
@@ -131,10 +131,12 @@ def build_monthly_prompt(
         "## Into Next Month\n"
         "1-2 sentences: what does this month leave behind, and what does it hand forward?\n\n"
         "Be honest. Pull specific phrases. Do not smooth over hard stretches or inflate good ones.\n\n"
+        + stats_block(extracts)
         + recurring_context
         + "DAILY EXTRACTS (" + str(n) + " days):\n\n"
-        + extracts_block
+        + packed.text
     )
+    return prompt, packed
 
 
 def generate_monthly(
@@ -143,9 +145,11 @@ def generate_monthly(
     out_dir: Path,
     client: anthropic.Anthropic,
     recurring_tasks: str | None = None,
+    force: bool = False,
+    token_budget: int = TOKEN_BUDGET,
 ) -> None:
     out_path = out_dir / f"{label}.md"
-    if out_path.exists():
+    if out_path.exists() and not force:
         print(f"  skip  {label} (already exists)")
         return
 
@@ -154,8 +158,10 @@ def generate_monthly(
 
     windowed = load_recurring_tasks(windowed_recurring_tasks_path(label))
     recurring_context = build_recurring_context(recurring_tasks, windowed)
-    prompt = build_monthly_prompt(label, extracts, recurring_context)
-    response = client.messages.create(
+    prompt, packed = build_monthly_prompt(label, extracts, recurring_context, token_budget)
+    print(f"  pack  {label}  {packed.report()}")
+    response = create_message(
+        client,
         model=MODEL,
         max_tokens=4096,
         messages=[{"role": "user", "content": prompt}],
@@ -169,7 +175,7 @@ def generate_monthly(
         f"Generated: {date.today().isoformat()}\n\n"
     )
     out_dir.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(header + review_text, encoding="utf-8")
+    atomic_write_text(out_path, header + review_text)
 
 
 def main() -> None:
@@ -185,6 +191,10 @@ def main() -> None:
     parser.add_argument("--month", default=None,
                         help="Generate a single month (YYYY-MM)")
     parser.add_argument("--min-days", type=int, default=MIN_DAYS)
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS,
+                        help=f"Months generated concurrently (default {BACKFILL_WORKERS})")
+    parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET,
+                        help=f"Approximate tokens of daily extracts per prompt (default {TOKEN_BUDGET})")
     args = parser.parse_args()
 
     client = get_client()
@@ -215,10 +225,15 @@ def main() -> None:
               f"{', '.join(sorted(skipped_thin))}")
 
     print(f"Generating {len(eligible)} monthly reviews...")
-    for i, (label, extracts) in enumerate(eligible.items()):
-        generate_monthly(label, extracts, args.out, client, recurring_tasks)
-        if i < len(eligible) - 1:
-            time.sleep(DELAY_SECONDS)
+    jobs = [
+        (label, lambda label=label, extracts=extracts: generate_monthly(
+            label, extracts, args.out, client, recurring_tasks,
+            token_budget=args.token_budget))
+        for label, extracts in eligible.items()
+    ]
+    failed = run_jobs(jobs, args.workers)
+    if failed:
+        print(f"{failed} monthly reviews failed")
 
     print("Done.")
 
@@ -0,0 +1,363 @@
+"""Incremental review build: daily extracts -> weekly -> monthly -> quarterly.
+
+One entry point for the whole review pipeline, meant to replace separate cron
+entries for extract_daily.py and the three review scripts:
+
+    0 5 * * *  cd ~/Documents/harmony && .venv/bin/python compute/pipeline.py --extract
+
+Everything is modelled as a DAG of nodes, each with an output file:
+
+    extract:<date>          source nodes; fingerprint = hash of the parsed extract
+    recurring:<YYYY-MM>     windowed recurring-tasks file for a month
+    recurring:<YYYY-QN>     windowed recurring-tasks file for a quarter
+    weekly:<YYYY-Www>       <- the week's extracts
+    monthly:<YYYY-MM>       <- the month's extracts + recurring:<YYYY-MM>
+    quarterly:<YYYY-QN>     <- its monthly reviews + recurring:<YYYY-QN>; when a
+                               month is too thin to have a review, the quarter
+                               depends on that month's extracts directly (the
+                               same fallback generate_quarterly takes)
+
+A node's input fingerprint hashes its dependencies' output fingerprints
+(extract hashes, or the content hash of upstream files). The fingerprint each
+output was last built from is kept in CACHE_DIR; a node is rebuilt only when
+its output is missing or its inputs changed, and its dependents then see the
+new output hash. So re-extracting one day rebuilds that day's week, month and
+quarter and nothing else. Independent nodes build in parallel (--workers).
+
+Outputs that already exist but were never built by this runner (e.g. from the
+old cron jobs) are adopted as up to date rather than regenerated.
+
+The lifetime recurring_tasks.md is ambient context for every review, not a
+dependency: it changes with every new day, and tracking it would rebuild the
+whole history daily. Regenerate it ad hoc with recurring_tasks.py.
+
+Usage:
+    python compute/pipeline.py                 # rebuild stale reviews
+    python compute/pipeline.py --extract       # extract changed notes first
+    python compute/pipeline.py --dry-run       # list what would be rebuilt
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+
+import extract_daily
+import monthly_review
+import quarterly_review
+import recurring_tasks
+import weekly_review
+from atomic_io import atomic_write_text
+from extract_index import load_extracts, load_fingerprints
+from llm_common import (
+    CACHE_DIR,
+    DAILY_INPUTS,
+    EXTRACT_CACHE_DIR,
+    get_client,
+    load_recurring_tasks,
+)
+
+STATE_PATH = CACHE_DIR / "pipeline_state.json"
+DEFAULT_WORKERS = 4
+DEFAULT_START = "2025-07-01"
+
+
+@dataclass
+class Node:
+    id: str
+    output: Path
+    deps: list[str]
+    build: Callable[[], None]
+
+
+@dataclass
+class BuildResult:
+    built: list[str] = field(default_factory=list)
+    fresh: list[str] = field(default_factory=list)
+    failed: list[str] = field(default_factory=list)
+    blocked: list[str] = field(default_factory=list)
+
+
+def _hash(parts: list[str]) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _file_fingerprint(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Graph construction
+# ---------------------------------------------------------------------------
+
+def _week_end(label: str) -> date:
+    year, week = int(label[:4]), int(label[6:])
+    return date.fromisocalendar(year, week, 7)
+
+
+def build_graph(
+    extracts: list[tuple[str, dict]],
+    daily_dir: Path,
+    weekly_out: Path,
+    monthly_out: Path,
+    quarterly_out: Path,
+    client,
+    today: date,
+    incremental_threads: bool = False,
+) -> dict[str, Node]:
+    """Return every buildable node for complete weeks, months and quarters in `extracts`.
+
+    With `incremental_threads`, windowed recurring-task files are queries
+    against the persistent thread store instead of fresh LLM clusterings.
+    """
+    global_recurring = load_recurring_tasks()
+    nodes: dict[str, Node] = {}
+
+    for label, week in weekly_review.group_by_iso_week(extracts).items():
+        if len(week) < weekly_review.MIN_DAYS or _week_end(label) > today:
+            continue
+        week = sorted(week)
+        nodes[f"weekly:{label}"] = Node(
+            f"weekly:{label}",
+            weekly_out / f"{label}.md",
+            [f"extract:{d}" for d, _ in week],
+            lambda label=label, week=week: weekly_review.generate_weekly(
+                label, week, weekly_out, client, global_recurring, force=True),
+        )
+
+    current_month = f"{today.year}-{today.month:02d}"
+    months = {
+        k: sorted(v) for k, v in monthly_review.group_by_month(extracts).items()
+        if k < current_month
+    }
+    for label, month in months.items():
+        if len(month) < monthly_review.MIN_DAYS:
+            continue
+        day_ids = [f"extract:{d}" for d, _ in month]
+        # Only the monthly review reads the month's windowed recurring tasks.
+        recurring_path = monthly_review.windowed_recurring_tasks_path(label)
+        nodes[f"recurring:{label}"] = Node(
+            f"recurring:{label}",
+            recurring_path,
+            day_ids,
+            lambda label=label, path=recurring_path: recurring_tasks.generate_recurring_tasks(
+                daily_dir, path, client, start=label, end=label,
+                incremental=incremental_threads),
+        )
+        nodes[f"monthly:{label}"] = Node(
+            f"monthly:{label}",
+            monthly_out / f"{label}.md",
+            day_ids + [f"recurring:{label}"],
+            lambda label=label, month=month: monthly_review.generate_monthly(
+                label, month, monthly_out, client, global_recurring, force=True),
+        )
+
+    if extracts:
+        first = date.fromisoformat(extracts[0][0])
+        quarters = quarterly_review.all_quarters(
+            first.year, (first.month - 1) // 3 + 1,
+            *quarterly_review.last_complete_quarter(today),
+        )
+    else:
+        quarters = []
+    for year, q in quarters:
+        label = quarterly_review.quarter_label(year, q)
+        month_labels = [f"{year}-{m:02d}" for m in quarterly_review._QUARTER_MONTHS[q]]
+        day_ids = [f"extract:{d}" for m in month_labels for d, _ in months.get(m, [])]
+        if not day_ids:
+            continue
+        deps: list[str] = []
+        for m in month_labels:
+            if f"monthly:{m}" in nodes:
+                deps.append(f"monthly:{m}")
+            else:
+                deps.extend(f"extract:{d}" for d, _ in months.get(m, []))
+        recurring_path = quarterly_review.windowed_recurring_tasks_path(label)
+        nodes[f"recurring:{label}"] = Node(
+            f"recurring:{label}",
+            recurring_path,
+            day_ids,
+            lambda path=recurring_path, start=month_labels[0], end=month_labels[-1]:
+                recurring_tasks.generate_recurring_tasks(
+                    daily_dir, path, client, start=start, end=end,
+                    incremental=incremental_threads),
+        )
+        nodes[f"quarterly:{label}"] = Node(
+            f"quarterly:{label}",
+            quarterly_out / f"{label}.md",
+            deps + [f"recurring:{label}"],
+            lambda year=year, q=q: quarterly_review.generate_quarterly(
+                year, q, daily_dir, monthly_out, quarterly_out, client, global_recurring,
+                force=True),
+        )
+
+    return nodes
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+def _load_state(path: Path) -> dict[str, str]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def run_graph(
+    nodes: dict[str, Node],
+    source_fingerprints: dict[str, str],
+    state_path: Path,
+    workers: int,
+    dry_run: bool = False,
+) -> BuildResult:
+    """Build stale nodes in dependency order, independent ones in parallel."""
+    state = _load_state(state_path)
+    fingerprints = dict(source_fingerprints)  # node id -> output fingerprint
+    lock = threading.Lock()
+    result = BuildResult()
+
+    def save_state() -> None:
+        if not dry_run:
+            state_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(state_path, json.dumps(state, indent=2, sort_keys=True))
+
+    def run_node(node: Node) -> None:
+        with lock:
+            inputs = _hash([f"{d}={fingerprints.get(d, '')}" for d in sorted(node.deps)])
+        recorded = state.get(node.id)
+        exists = node.output.exists()
+
+        if exists and recorded in (None, inputs):
+            with lock:
+                if recorded is None:
+                    state[node.id] = inputs  # adopt pre-existing output
+                    save_state()
+                fingerprints[node.id] = _file_fingerprint(node.output) or ""
+                result.fresh.append(node.id)
+            return
+
+        if dry_run:
+            print(f"  stale {node.id}")
+            with lock:
+                # Downstream nodes should show as stale too.
+                fingerprints[node.id] = "pending:" + inputs
+                result.built.append(node.id)
+            return
+
+        print(f"  build {node.id}")
+        node.build()
+        with lock:
+            fingerprints[node.id] = _file_fingerprint(node.output) or ""
+            if node.output.exists():
+                state[node.id] = inputs
+                save_state()
+            result.built.append(node.id)
+
+    dependents: dict[str, list[str]] = {nid: [] for nid in nodes}
+    waiting: dict[str, set[str]] = {}
+    for nid, node in nodes.items():
+        internal = {d for d in node.deps if d in nodes}
+        waiting[nid] = internal
+        for d in internal:
+            dependents[d].append(nid)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        running: dict[Future, str] = {}
+
+        def submit(nid: str) -> None:
+            running[pool.submit(run_node, nodes[nid])] = nid
+
+        def block(nid: str) -> None:
+            result.blocked.append(nid)
+            for child in dependents[nid]:
+                if child in waiting:
+                    del waiting[child]
+                    block(child)
+
+        for nid in [n for n, deps in waiting.items() if not deps]:
+            del waiting[nid]
+            submit(nid)
+
+        pending = set(running)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                nid = running.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    print(f"  FAIL  {nid}: {exc}")
+                    result.failed.append(nid)
+                    for child in dependents[nid]:
+                        if child in waiting:
+                            del waiting[child]
+                            block(child)
+                    continue
+                for child in dependents[nid]:
+                    if child in waiting:
+                        waiting[child].discard(nid)
+                        if not waiting[child]:
+                            del waiting[child]
+                            submit(child)
+            pending = set(running)
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Incrementally rebuild stale weekly/monthly/quarterly reviews."
+    )
+    parser.add_argument("--dir", type=Path, default=DAILY_INPUTS)
+    parser.add_argument("--weekly-out", type=Path, default=weekly_review.WEEKLY_OUT)
+    parser.add_argument("--monthly-out", type=Path, default=monthly_review.MONTHLY_OUT)
+    parser.add_argument("--quarterly-out", type=Path, default=quarterly_review.QUARTERLY_OUT)
+    parser.add_argument("--start", default=DEFAULT_START,
+                        help=f"Earliest date to build from (YYYY-MM-DD, default {DEFAULT_START})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Nodes built concurrently (default {DEFAULT_WORKERS})")
+    parser.add_argument("--extract", action="store_true",
+                        help="Run daily extraction for new/changed notes before building reviews")
+    parser.add_argument("--incremental-threads", action="store_true",
+                        help="Write windowed recurring-task files from the thread store "
+                             "(see thread_store.py) instead of re-clustering each window")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="List stale nodes without calling the API")
+    args = parser.parse_args()
+
+    client = None if args.dry_run else get_client()
+
+    if args.extract and not args.dry_run:
+        files = sorted(args.dir.glob("????-??-??.md"))
+        print(f"Extracting changed notes among {len(files)} in {args.dir}...")
+        extract_daily.run_concurrent(files, get_client("extract"), args.workers, EXTRACT_CACHE_DIR)
+
+    extracts = load_extracts(args.dir, start=args.start)
+    if not extracts:
+        raise SystemExit("No extracted daily notes found.")
+    sources = {
+        f"extract:{d}": fp for d, fp in load_fingerprints(args.dir, start=args.start).items()
+    }
+    nodes = build_graph(
+        extracts, args.dir, args.weekly_out, args.monthly_out, args.quarterly_out,
+        client, date.today(), args.incremental_threads,
+    )
+    print(f"{len(nodes)} review nodes over {len(sources)} extracted days")
+
+    result = run_graph(nodes, sources, STATE_PATH, args.workers, args.dry_run)
+    verb = "stale" if args.dry_run else "built"
+    print(f"Done. {verb}={len(result.built)} fresh={len(result.fresh)} "
+          f"failed={len(result.failed)} blocked={len(result.blocked)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Token-budgeted packing of daily extracts into review prompts.
+
+A month or quarter of full extracts can overflow the model's context (Ollama
+runs with a fixed num_ctx) or spend tokens on low-value detail, while fixed
+truncation (first two items of each list) throws away signal on quiet months.
+`pack_extracts` instead fills a token budget in priority order:
+
+  - fields are taken in the order given, most informative first;
+  - within a list field, items are added breadth-first across days (every
+    day's first item, then every day's second item, ...) so no stretch of the
+    period is starved by a few verbose days;
+  - list items that repeat an earlier phrasing of the same field (after
+    normalising case, punctuation and whitespace) are dropped — the same task
+    restated every day adds tokens, not information;
+  - anything that doesn't fit is counted in the report rather than silently lost.
+
+Token counts are estimates (characters / CHARS_PER_TOKEN, deliberately on the
+high side for JSON-heavy text) so packing needs no tokenizer or API call.
+
+No third-party or sibling imports.
+"""
+
+import json
+import math
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+CHARS_PER_TOKEN = 3.5
+
+_NORMALISE_RE = re.compile(r"[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _normalise(item) -> str:
+    text = item if isinstance(item, str) else json.dumps(item, sort_keys=True)
+    return " ".join(_NORMALISE_RE.sub(" ", text.lower()).split())
+
+
+def _render_day(date_str: str, condensed: dict) -> str:
+    return "--- " + date_str + " ---\n" + json.dumps(condensed, ensure_ascii=False)
+
+
+@dataclass
+class PackResult:
+    text: str
+    budget: int
+    tokens: int
+    section_tokens: dict[str, int] = field(default_factory=dict)
+    dropped: dict[str, int] = field(default_factory=dict)
+    duplicates: int = 0
+
+    def report(self) -> str:
+        """One line: total vs budget, tokens per field, and what was left out."""
+        sections = ", ".join(f"{k} {v}" for k, v in self.section_tokens.items() if v)
+        line = f"~{self.tokens}/{self.budget} tokens ({sections})"
+        dropped = sum(self.dropped.values())
+        if dropped:
+            worst = ", ".join(f"{k} {v}" for k, v in self.dropped.items() if v)
+            line += f"; {dropped} items over budget ({worst})"
+        if self.duplicates:
+            line += f"; {self.duplicates} repeated items skipped"
+        return line
+
+
+def pack_extracts(
+    extracts: list[tuple[str, dict]],
+    fields: list[str],
+    budget: int,
+    count_tokens: Callable[[str], int] = estimate_tokens,
+) -> PackResult:
+    """Render `extracts` as one block per day, keeping as much of `fields` as fits in `budget`."""
+    days = [{"date": date_str} for date_str, _ in extracts]
+    headers = "\n\n".join(_render_day(d, c) for (d, _), c in zip(extracts, days))
+    used = count_tokens(headers)
+    result = PackResult(text="", budget=budget, tokens=0, section_tokens={"date": used})
+
+    for name in fields:
+        result.section_tokens[name] = 0
+        result.dropped[name] = 0
+        key_cost = count_tokens(', "' + name + '": ')
+
+        def add(day: dict, value, cost: int) -> bool:
+            nonlocal used
+            if used + cost > budget:
+                result.dropped[name] += 1
+                return False
+            used += cost
+            result.section_tokens[name] += cost
+            if isinstance(value, list):
+                day.setdefault(name, []).extend(value)
+            else:
+                day[name] = value
+            return True
+
+        # Scalars (strings, booleans, numbers): one value per day.
+        lists: list[tuple[dict, list]] = []
+        for day, (_, data) in zip(days, extracts):
+            value = data.get(name)
+            if value in (None, "", []):
+                continue
+            if isinstance(value, list):
+                lists.append((day, value))
+            else:
+                add(day, value, key_cost + count_tokens(json.dumps(value, ensure_ascii=False)))
+
+        # Lists: breadth-first across days, skipping repeated phrasings.
+        seen: set[str] = set()
+        depth = max((len(items) for _, items in lists), default=0)
+        for i in range(depth):
+            for day, items in lists:
+                if i >= len(items):
+                    continue
+                norm = _normalise(items[i])
+                if norm in seen:
+                    result.duplicates += 1
+                    continue
+                cost = count_tokens(json.dumps(items[i], ensure_ascii=False) + ", ")
+                if name not in day:
+                    cost += key_cost
+                if add(day, [items[i]], cost):
+                    seen.add(norm)
+
+    result.text = "\n\n".join(_render_day(d, c) for (d, _), c in zip(extracts, days))
+    result.tokens = count_tokens(result.text)
+    return result
@@ -1,7 +1,10 @@
 """Quarterly review.
 
 Uses monthly reviews as input when available (preferred), falls back to
-sampled daily extracts if monthly reviews are missing.
+daily extracts packed into a token budget (--token-budget, see
+prompt_packer) if monthly reviews are missing. Backfill generates up
+to --workers quarters at a time; to backfill months and quarters together
+with quarters waiting on their months, use compute/backfill_reviews.py.
 
 Usage:
     python compute/quarterly_review.py --backfill
@@ -9,21 +12,25 @@ Usage:
 """
 
 import argparse
-import json
-import time
 from datetime import date
 from pathlib import Path
 
 import anthropic
 
+from atomic_io import atomic_write_text
+from extract_index import load_extracts
 from llm_common import (
     DAILY_INPUTS,
     MODEL,
     RECURRING_TASKS_PATH,
-    extract_json_section,
+    create_message,
     get_client,
     load_recurring_tasks,
+    run_jobs,
 )
+from monthly_review import PROMPT_FIELDS
+from prompt_packer import PackResult, pack_extracts
+from review_stats import stats_block
 
 MONTHLY_REVIEWS = Path(
     "/home/aharon/Documents/vault-alpha/3_Nutrients/monthly_reviews"
@@ -31,7 +38,10 @@ MONTHLY_REVIEWS = Path(
 QUARTERLY_OUT = Path(
     "/home/aharon/Documents/vault-alpha/3_Nutrients/quarterly_reviews"
 )
-DELAY_SECONDS = 0.5
+BACKFILL_WORKERS = 4
+# Daily-extract fallback only: a quarter of days in a 32k context, leaving
+# room for instructions, recurring-task context and an 8k-token reply.
+TOKEN_BUDGET = 20000
 
 _QUARTER_MONTHS = {1: (1, 2, 3), 2: (4, 5, 6), 3: (7, 8, 9), 4: (10, 11, 12)}
 _MONTH_NAMES = {
@@ -57,6 +67,13 @@ def all_quarters(start_year: int, start_q: int, end_year: int, end_q: int) -> li
     return result
 
 
+def last_complete_quarter(today: date) -> tuple[int, int]:
+    end_q = (today.month - 1) // 3
+    if end_q < 1:
+        return today.year - 1, 4
+    return today.year, end_q
+
+
 def load_monthly_review(monthly_dir: Path, year: int, month: int) -> str | None:
     path = monthly_dir / f"{year}-{month:02d}.md"
     if path.exists():
@@ -67,15 +84,7 @@ def load_monthly_review(monthly_dir: Path, year: int, month: int) -> str | None:
 def load_daily_extracts_for_months(
     daily_dir: Path, year: int, months: tuple[int, ...]
 ) -> list[tuple[str, dict]]:
-    month_prefixes = {f"{year}-{m:02d}" for m in months}
-    results = []
-    for path in sorted(daily_dir.glob("????-??-??.md")):
-        if path.stem[:7] in month_prefixes:
-            text = path.read_text(encoding="utf-8")
-            extract = extract_json_section(text)
-            if extract is not None:
-                results.append((path.stem, extract))
-    return results
+    return load_extracts(daily_dir, start=f"{year}-{months[0]:02d}", end=f"{year}-{months[-1]:02d}")
 
 
 def windowed_recurring_tasks_path(quarter_label: str) -> Path:
@@ -102,7 +111,10 @@ def build_recurring_context(global_text: str | None, windowed_text: str | None)
 
 
 def build_quarterly_from_monthlies(
-    label: str, monthly_texts: list[tuple[str, str]], recurring_context: str = ""
+    label: str,
+    monthly_texts: list[tuple[str, str]],
+    recurring_context: str = "",
+    extracts: list[tuple[str, dict]] | None = None,
 ) -> str:
     year, q = int(label[:4]), int(label[6])
     months = _QUARTER_MONTHS[q]
@@ -139,6 +151,7 @@ def build_quarterly_from_monthlies(
         "The single most important sentence about this quarter.\n\n"
         "Connect dots across months. Be willing to name what's actually happening beneath the surface. "
         "This is a high-altitude view — synthesis, not summary.\n\n"
+        + stats_block(extracts or [])
         + recurring_context
         + "MONTHLY REVIEWS:\n\n"
         + content_block
@@ -146,27 +159,19 @@ def build_quarterly_from_monthlies(
 
 
 def build_quarterly_from_dailies(
-    label: str, extracts: list[tuple[str, dict]], recurring_context: str = ""
-) -> str:
+    label: str,
+    extracts: list[tuple[str, dict]],
+    recurring_context: str = "",
+    token_budget: int = TOKEN_BUDGET,
+) -> tuple[str, PackResult]:
     year, q = int(label[:4]), int(label[6])
     months = _QUARTER_MONTHS[q]
     month_range = f"{_MONTH_NAMES[months[0]]}–{_MONTH_NAMES[months[2]]} {year}"
     n = len(extracts)
 
-    parts = []
-    for date_str, data in extracts:
-        condensed = {
-            "date": date_str,
-            "summary": data.get("summary", ""),
-            "energy_level": data.get("energy_level", ""),
-            "spiritual_movement": data.get("spiritual_movement", ""),
-            "creative_spark_moment": data.get("creative_spark_moment", [])[:2],
-            "struggles_and_fears": data.get("struggles_and_fears", [])[:2],
-        }
-        parts.append("--- " + date_str + " ---\n" + json.dumps(condensed, ensure_ascii=False))
-    content_block = "\n\n".join(parts)
+    packed = pack_extracts(extracts, PROMPT_FIELDS, token_budget)
 
-    return (
+    prompt = (
         "You are writing a quarterly review for a personal journaling pipeline. "
         "Below are condensed daily extracts for " + str(n) + " days covering " + month_range + ". "
         "This person is a creative-prophetic artist in NYC doing Ignatian spiritual practice.\n\n"
@@ -189,10 +194,12 @@ def build_quarterly_from_dailies(
         "Unresolved threads handed to next quarter.\n\n"
         "## One True Thing\n"
         "The single most important sentence about this quarter.\n\n"
+        + stats_block(extracts)
         + recurring_context
         + "DAILY EXTRACTS (" + str(n) + " days):\n\n"
-        + content_block
+        + packed.text
     )
+    return prompt, packed
 
 
 def generate_quarterly(
@@ -203,10 +210,12 @@ def generate_quarterly(
     out_dir: Path,
     client: anthropic.Anthropic,
     recurring_tasks: str | None = None,
+    force: bool = False,
+    token_budget: int = TOKEN_BUDGET,
 ) -> None:
     label = quarter_label(year, q)
     out_path = out_dir / f"{label}.md"
-    if out_path.exists():
+    if out_path.exists() and not force:
         print(f"  skip  {label} (already exists)")
         return
 
@@ -224,7 +233,9 @@ def generate_quarterly(
 
     if len(monthly_texts) == len(months):
         print(f"  gen   {label}  (from {len(monthly_texts)} monthly reviews)")
-        prompt = build_quarterly_from_monthlies(label, monthly_texts, recurring_context)
+        # Daily extracts still feed the exact quarter-wide statistics.
+        extracts = load_daily_extracts_for_months(daily_dir, year, months)
+        prompt = build_quarterly_from_monthlies(label, monthly_texts, recurring_context, extracts)
     else:
         # Fall back to daily extracts
         extracts = load_daily_extracts_for_months(daily_dir, year, months)
@@ -233,9 +244,11 @@ def generate_quarterly(
             return
         missing = len(months) - len(monthly_texts)
         print(f"  gen   {label}  (from {len(extracts)} daily extracts; {missing} monthly reviews missing)")
-        prompt = build_quarterly_from_dailies(label, extracts, recurring_context)
+        prompt, packed = build_quarterly_from_dailies(label, extracts, recurring_context, token_budget)
+        print(f"  pack  {label}  {packed.report()}")
 
-    response = client.messages.create(
+    response = create_message(
+        client,
         model=MODEL,
         max_tokens=8096,
         messages=[{"role": "user", "content": prompt}],
@@ -249,7 +262,7 @@ def generate_quarterly(
         f"Generated: {date.today().isoformat()}\n\n"
     )
     out_dir.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(header + review_text, encoding="utf-8")
+    atomic_write_text(out_path, header + review_text)
 
 
 def main() -> None:
@@ -265,40 +278,37 @@ def main() -> None:
                         help="Earliest quarter (YYYY-QN, default: 2025-Q3)")
     parser.add_argument("--quarter", default=None,
                         help="Generate a single quarter (YYYY-QN)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS,
+                        help=f"Quarters generated concurrently (default {BACKFILL_WORKERS})")
+    parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET,
+                        help="Approximate tokens of daily extracts per prompt when falling back "
+                             f"to dailies (default {TOKEN_BUDGET})")
     args = parser.parse_args()
 
     client = get_client()
     recurring_tasks = load_recurring_tasks()
 
-    today = date.today()
-    current_q = (today.month - 1) // 3 + 1
-
     if args.quarter:
         year, q = int(args.quarter[:4]), int(args.quarter[6])
         quarters = [(year, q)]
     elif args.backfill:
         start_year, start_q = int(args.start[:4]), int(args.start[6])
         # End at last complete quarter
-        end_q = current_q - 1
-        end_year = today.year
-        if end_q < 1:
-            end_q = 4
-            end_year -= 1
-        quarters = all_quarters(start_year, start_q, end_year, end_q)
+        quarters = all_quarters(start_year, start_q, *last_complete_quarter(date.today()))
     else:
         # Default: most recent complete quarter
-        end_q = current_q - 1
-        end_year = today.year
-        if end_q < 1:
-            end_q = 4
-            end_year -= 1
-        quarters = [(end_year, end_q)]
+        quarters = [last_complete_quarter(date.today())]
 
     print(f"Generating {len(quarters)} quarterly review(s)...")
-    for i, (year, q) in enumerate(quarters):
-        generate_quarterly(year, q, args.dir, args.monthly_dir, args.out, client, recurring_tasks)
-        if i < len(quarters) - 1:
-            time.sleep(DELAY_SECONDS)
+    jobs = [
+        (quarter_label(year, q), lambda year=year, q=q: generate_quarterly(
+            year, q, args.dir, args.monthly_dir, args.out, client, recurring_tasks,
+            token_budget=args.token_budget))
+        for year, q in quarters
+    ]
+    failed = run_jobs(jobs, args.workers)
+    if failed:
+        print(f"{failed} quarterly reviews failed")
 
     print("Done.")
 
@@ -6,10 +6,15 @@ desolation threads — the negative thoughts, fears, and triggers that keep comi
 back, with how often and over what span each one appears.
 
 Standalone / ad hoc, mirrors compute/recurring_tasks.py. Not wired into the
-weekly/monthly/quarterly pipeline by default.
+weekly/monthly/quarterly pipeline by default. --map-reduce clusters month by
+month (cached) and merges the results, for ranges too long for one call.
+--embed groups phrasings locally with sentence embeddings and exact counts,
+and only asks the model to name the clusters (see embed_cluster.py).
 
 Usage:
     python compute/recurring_desolations.py
+    python compute/recurring_desolations.py --map-reduce
+    python compute/recurring_desolations.py --embed
     python compute/recurring_desolations.py --start 2026-05-01 --end 2026-05-31 \\
         --out /path/to/recurring_desolations_2026-05.md
 """
@@ -17,7 +22,10 @@ Usage:
 import argparse
 from pathlib import Path
 
-from llm_common import DAILY_INPUTS, MODEL, extract_json_section, get_client
+from atomic_io import atomic_write_text
+from cluster_mapreduce import MAP_WORKERS, cluster_by_month
+from extract_index import load_extracts
+from llm_common import DAILY_INPUTS, MODEL, create_message, get_client
 
 OUT_PATH = Path(
     "/home/aharon/Documents/vault-alpha/3_Nutrients/recurring_desolations.md"
@@ -72,16 +80,7 @@ _CLUSTER_TOOL: dict = {
 
 def load_desolations_by_day(daily_dir: Path, start: str | None, end: str | None) -> list[tuple[str, list[str]]]:
     results = []
-    for path in sorted(daily_dir.glob("????-??-??.md")):
-        if start and path.stem < start:
-            continue
-        if end and path.stem > end:
-            continue
-        text = path.read_text(encoding="utf-8")
-        extract = extract_json_section(text)
-        if extract is None:
-            continue
-
+    for date_str, extract in load_extracts(daily_dir, start=start, end=end):
         items: list[str] = []
         items.extend(extract.get("struggles_and_fears", []))
         items.extend(extract.get("comparison_trigger", []))
@@ -90,17 +89,31 @@ def load_desolations_by_day(daily_dir: Path, start: str | None, end: str | None)
             items.append(desolation_source)
 
         if items:
-            results.append((path.stem, items))
+            results.append((date_str, items))
     return results
 
 
-def build_prompt(items_by_day: list[tuple[str, list[str]]]) -> str:
+def build_prompt(items_by_day: list[tuple[str, list[str]]], keep_single: bool = False) -> str:
     parts = []
     for date_str, items in items_by_day:
         for t in items:
             parts.append(f"{date_str}: {t}")
     items_block = "\n".join(parts)
 
+    if keep_single:
+        # Map step of --map-reduce: a one-off this month may recur in another.
+        scope = (
+            "Cluster these into desolation threads — negative thoughts, fears, or "
+            "triggers grouped by underlying theme. Include mentions that appear on only "
+            "one day as their own thread."
+        )
+    else:
+        scope = (
+            "Cluster these into recurring desolation threads — negative thoughts, fears, "
+            "or triggers that appear, in some form, on MULTIPLE distinct days. Do NOT "
+            "include one-off mentions that only appear once."
+        )
+
     return (
         "Below is a list of struggles, fears, comparison triggers, and desolation "
         "notes from one person's daily journal, one per line, prefixed with the date "
@@ -108,9 +121,7 @@ def build_prompt(items_by_day: list[tuple[str, list[str]]]) -> str:
         "restated differently on different days (e.g. 'jealous of Ana's album', "
         "'rage at Ana's Instagram post', 'comparison spiral about Ana' might all be "
         "the same thread).\n\n"
-        "Cluster these into recurring desolation threads — negative thoughts, fears, "
-        "or triggers that appear, in some form, on MULTIPLE distinct days. Do NOT "
-        "include one-off mentions that only appear once. For each recurring thread, "
+        + scope + " For each recurring thread, "
         "give a canonical name, how many distinct days it appears, the first and last "
         "date seen, a few sample phrasings showing how the wording changed over time, "
         "and a one-sentence pattern note (intensifying, fading, steady, or tied to a "
@@ -166,6 +177,15 @@ def main() -> None:
                         help="Latest date to include (YYYY-MM-DD)")
     parser.add_argument("--min-occurrences", type=int, default=2,
                         help="Only show threads appearing on at least this many days (default 2)")
+    method = parser.add_mutually_exclusive_group()
+    method.add_argument("--map-reduce", action="store_true",
+                        help="Cluster each month separately (cached), then merge into lifetime threads")
+    method.add_argument("--embed", action="store_true",
+                        help="Cluster locally with sentence embeddings; the model only names clusters")
+    parser.add_argument("--workers", type=int, default=MAP_WORKERS,
+                        help=f"Months clustered concurrently with --map-reduce (default {MAP_WORKERS})")
+    parser.add_argument("--similarity", type=float, default=None,
+                        help="Cosine similarity at which --embed stops merging clusters (default 0.6)")
     args = parser.parse_args()
 
     client = get_client()
@@ -178,29 +198,52 @@ def main() -> None:
     label_range = f"{items_by_day[0][0]} to {items_by_day[-1][0]}"
     print(f"Loaded {total_items} desolation mentions across {len(items_by_day)} days ({label_range})")
 
-    prompt = build_prompt(items_by_day)
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=16000,
-        tools=[_CLUSTER_TOOL],
-        tool_choice={"type": "tool", "name": "cluster_recurring_desolations"},
-        messages=[{"role": "user", "content": prompt}],
-    )
-
-    clusters = None
-    for block in response.content:
-        if block.type == "tool_use":
-            clusters = block.input.get("recurring_desolations", [])
-            break
-
-    if clusters is None:
-        raise SystemExit("No tool_use block in response.")
+    if args.embed:
+        from embed_cluster import SIMILARITY_THRESHOLD, cluster_locally  # noqa: PLC0415
+        try:
+            clusters = cluster_locally(
+                items_by_day, client, _CLUSTER_TOOL, "recurring_desolations",
+                noun="negative thoughts/desolations", note_field="pattern_note",
+                min_occurrences=args.min_occurrences,
+                threshold=args.similarity or SIMILARITY_THRESHOLD,
+            )
+        except RuntimeError as exc:
+            raise SystemExit(str(exc)) from exc
+    elif args.map_reduce:
+        try:
+            clusters = cluster_by_month(
+                items_by_day, client, _CLUSTER_TOOL, "recurring_desolations",
+                lambda days: build_prompt(days, keep_single=True),
+                noun="negative thoughts/desolations", note_field="pattern_note",
+                min_occurrences=args.min_occurrences, workers=args.workers,
+            )
+        except RuntimeError as exc:
+            raise SystemExit(str(exc)) from exc
+    else:
+        prompt = build_prompt(items_by_day)
+        response = create_message(
+            client,
+            model=MODEL,
+            max_tokens=16000,
+            tools=[_CLUSTER_TOOL],
+            tool_choice={"type": "tool", "name": "cluster_recurring_desolations"},
+            messages=[{"role": "user", "content": prompt}],
+        )
+
+        clusters = None
+        for block in response.content:
+            if block.type == "tool_use":
+                clusters = block.input.get("recurring_desolations", [])
+                break
+
+        if clusters is None:
+            raise SystemExit("No tool_use block in response.")
 
     print(f"Found {len(clusters)} recurring threads (>= {args.min_occurrences} occurrences shown)")
 
     md = render_markdown(label_range, clusters, args.min_occurrences)
     args.out.parent.mkdir(parents=True, exist_ok=True)
-    args.out.write_text(md, encoding="utf-8")
+    atomic_write_text(args.out, md)
     print(f"Wrote {args.out}")
 
 
@@ -7,18 +7,33 @@ appears. Tasks that show up many times across many days are the ones quietly
 carrying the most weight — this surfaces them.
 
 Standalone / ad hoc: not wired into the weekly/monthly/quarterly pipeline.
-Run it whenever you want a cross-time-series view.
+Run it whenever you want a cross-time-series view. For long ranges use
+--map-reduce: months are clustered separately (and cached) and then merged,
+so the prompt never has to hold the whole history (see cluster_mapreduce.py).
+--embed groups phrasings locally with sentence embeddings and exact counts,
+and only asks the model to name the clusters (see embed_cluster.py).
+--incremental keeps those clusters in a persistent thread store and only
+assigns new or changed days' tasks to it; --recluster rebuilds the store from
+scratch (see thread_store.py).
 
 Usage:
     python compute/recurring_tasks.py
     python compute/recurring_tasks.py --start 2026-01-01
     python compute/recurring_tasks.py --min-occurrences 3
+    python compute/recurring_tasks.py --map-reduce
+    python compute/recurring_tasks.py --embed
+    python compute/recurring_tasks.py --incremental
+    python compute/recurring_tasks.py --incremental --recluster
 """
 
 import argparse
+import threading
 from pathlib import Path
 
-from llm_common import DAILY_INPUTS, MODEL, RECURRING_TASKS_PATH, extract_json_section, get_client
+from atomic_io import atomic_write_text
+from cluster_mapreduce import MAP_WORKERS, cluster_by_month
+from extract_index import load_extracts
+from llm_common import DAILY_INPUTS, MODEL, RECURRING_TASKS_PATH, create_message, get_client
 
 OUT_PATH = RECURRING_TASKS_PATH
 
@@ -69,41 +84,54 @@ _CLUSTER_TOOL: dict = {
 }
 
 
+# The pipeline writes several windowed files concurrently; the first update
+# does the work and the rest find the store current.
+_THREAD_STORE_LOCK = threading.Lock()
+
+_NOTE_DESCRIPTION = (
+    _CLUSTER_TOOL["input_schema"]["properties"]["recurring_tasks"]["items"]
+    ["properties"]["status_note"]["description"]
+)
+
+
 def load_tasks_by_day(
     daily_dir: Path, start: str | None, end: str | None = None
 ) -> list[tuple[str, list[str]]]:
     results = []
-    for path in sorted(daily_dir.glob("????-??-??.md")):
-        if start and path.stem < start:
-            continue
-        if end and path.stem > end:
-            continue
-        text = path.read_text(encoding="utf-8")
-        extract = extract_json_section(text)
-        if extract is None:
-            continue
+    for date_str, extract in load_extracts(daily_dir, start=start, end=end):
         tasks = extract.get("tasks_and_intentions", [])
         if tasks:
-            results.append((path.stem, tasks))
+            results.append((date_str, tasks))
     return results
 
 
-def build_prompt(tasks_by_day: list[tuple[str, list[str]]]) -> str:
+def build_prompt(tasks_by_day: list[tuple[str, list[str]]], keep_single: bool = False) -> str:
     parts = []
     for date_str, tasks in tasks_by_day:
         for t in tasks:
             parts.append(f"{date_str}: {t}")
     tasks_block = "\n".join(parts)
 
+    if keep_single:
+        # Map step of --map-reduce: a one-off this month may recur in another.
+        scope = (
+            "Cluster these into threads — tasks/intentions grouped by underlying task. "
+            "Include tasks that appear on only one day as their own thread."
+        )
+    else:
+        scope = (
+            "Cluster these into recurring threads — tasks/intentions that appear, in some "
+            "form, on MULTIPLE distinct days. Do NOT include one-off tasks that only appear "
+            "once."
+        )
+
     return (
         "Below is a list of tasks/intentions mentioned in one person's daily journal, "
         "one per line, prefixed with the date they were mentioned. The same underlying "
         "task is often restated differently on different days (e.g. 'get adderall', "
         "'follow up on ADHD meds with psychiatrist', 'call about Medicaid for meds' "
         "might all be the same thread).\n\n"
-        "Cluster these into recurring threads — tasks/intentions that appear, in some "
-        "form, on MULTIPLE distinct days. Do NOT include one-off tasks that only appear "
-        "once. For each recurring thread, give a canonical name, how many distinct days "
+        + scope + " For each recurring thread, give a canonical name, how many distinct days "
         "it appears, the first and last date seen, a few sample phrasings showing how "
         "the wording changed over time, and a one-sentence status note (resolved, still "
         "open, or recurring without resolution).\n\n"
@@ -146,6 +174,87 @@ def render_markdown(label_range: str, clusters: list[dict], min_occurrences: int
     return "\n".join(lines)
 
 
+def generate_recurring_tasks(
+    daily_dir: Path,
+    out: Path,
+    client,
+    start: str | None = None,
+    end: str | None = None,
+    min_occurrences: int = 2,
+    map_reduce: bool = False,
+    workers: int = MAP_WORKERS,
+    embed: bool = False,
+    similarity: float | None = None,
+    incremental: bool = False,
+    recluster: bool = False,
+) -> bool:
+    """Cluster tasks in [start, end] and write the markdown to `out`. False if there were no tasks."""
+    tasks_by_day = load_tasks_by_day(daily_dir, start, end)
+    if not tasks_by_day:
+        return False
+
+    total_tasks = sum(len(t) for _, t in tasks_by_day)
+    label_range = f"{tasks_by_day[0][0]} to {tasks_by_day[-1][0]}"
+    print(f"Loaded {total_tasks} task mentions across {len(tasks_by_day)} days ({label_range})")
+
+    if incremental:
+        from embed_cluster import SIMILARITY_THRESHOLD  # noqa: PLC0415
+        from thread_store import ThreadStore, thread_store_path  # noqa: PLC0415
+        with _THREAD_STORE_LOCK, ThreadStore(
+            thread_store_path("tasks"), threshold=similarity or SIMILARITY_THRESHOLD
+        ) as store:
+            if recluster:
+                print(f"Re-clustered into {store.recluster(daily_dir)} threads")
+            else:
+                added, removed = store.update(daily_dir)
+                print(f"Thread store: {added} days added/changed, {removed} removed")
+            if client is not None:
+                store.name_threads(client, "tasks/intentions", "status_note",
+                                   _NOTE_DESCRIPTION, min_occurrences)
+            clusters = store.query(start, end, min_occurrences)
+    elif embed:
+        from embed_cluster import SIMILARITY_THRESHOLD, cluster_locally  # noqa: PLC0415
+        clusters = cluster_locally(
+            tasks_by_day, client, _CLUSTER_TOOL, "recurring_tasks",
+            noun="tasks/intentions", note_field="status_note",
+            min_occurrences=min_occurrences, threshold=similarity or SIMILARITY_THRESHOLD,
+        )
+    elif map_reduce:
+        clusters = cluster_by_month(
+            tasks_by_day, client, _CLUSTER_TOOL, "recurring_tasks",
+            lambda days: build_prompt(days, keep_single=True),
+            noun="tasks/intentions", note_field="status_note",
+            min_occurrences=min_occurrences, workers=workers,
+        )
+    else:
+        prompt = build_prompt(tasks_by_day)
+        response = create_message(
+            client,
+            model=MODEL,
+            max_tokens=8096,
+            tools=[_CLUSTER_TOOL],
+            tool_choice={"type": "tool", "name": "cluster_recurring_tasks"},
+            messages=[{"role": "user", "content": prompt}],
+        )
+
+        clusters = None
+        for block in response.content:
+            if block.type == "tool_use":
+                clusters = block.input.get("recurring_tasks", [])
+                break
+
+        if clusters is None:
+            raise RuntimeError("No tool_use block in response.")
+
+    print(f"Found {len(clusters)} recurring threads (>= {min_occurrences} occurrences shown)")
+
+    md = render_markdown(label_range, clusters, min_occurrences)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(out, md)
+    print(f"Wrote {out}")
+    return True
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Cluster recurring tasks/intentions across daily extracts."
@@ -158,43 +267,34 @@ def main() -> None:
                         help="Latest date to include (YYYY-MM-DD)")
     parser.add_argument("--min-occurrences", type=int, default=2,
                         help="Only show threads appearing on at least this many days (default 2)")
+    method = parser.add_mutually_exclusive_group()
+    method.add_argument("--map-reduce", action="store_true",
+                        help="Cluster each month separately (cached), then merge into lifetime threads")
+    method.add_argument("--embed", action="store_true",
+                        help="Cluster locally with sentence embeddings; the model only names clusters")
+    method.add_argument("--incremental", action="store_true",
+                        help="Update the persistent thread store with new days, then query it")
+    parser.add_argument("--recluster", action="store_true",
+                        help="With --incremental: rebuild every thread from scratch first")
+    parser.add_argument("--workers", type=int, default=MAP_WORKERS,
+                        help=f"Months clustered concurrently with --map-reduce (default {MAP_WORKERS})")
+    parser.add_argument("--similarity", type=float, default=None,
+                        help="Cosine similarity at which --embed stops merging clusters (default 0.6)")
     args = parser.parse_args()
 
     client = get_client()
 
-    tasks_by_day = load_tasks_by_day(args.dir, args.start, args.end)
-    if not tasks_by_day:
+    try:
+        wrote = generate_recurring_tasks(
+            args.dir, args.out, client, args.start, args.end, args.min_occurrences,
+            args.map_reduce, args.workers, args.embed, args.similarity,
+            args.incremental, args.recluster,
+        )
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
+    if not wrote:
         raise SystemExit("No daily extracts with tasks_and_intentions found.")
 
-    total_tasks = sum(len(t) for _, t in tasks_by_day)
-    label_range = f"{tasks_by_day[0][0]} to {tasks_by_day[-1][0]}"
-    print(f"Loaded {total_tasks} task mentions across {len(tasks_by_day)} days ({label_range})")
-
-    prompt = build_prompt(tasks_by_day)
-    response = client.messages.create(
-        model=MODEL,
-        max_tokens=8096,
-        tools=[_CLUSTER_TOOL],
-        tool_choice={"type": "tool", "name": "cluster_recurring_tasks"},
-        messages=[{"role": "user", "content": prompt}],
-    )
-
-    clusters = None
-    for block in response.content:
-        if block.type == "tool_use":
-            clusters = block.input.get("recurring_tasks", [])
-            break
-
-    if clusters is None:
-        raise SystemExit("No tool_use block in response.")
-
-    print(f"Found {len(clusters)} recurring threads (>= {args.min_occurrences} occurrences shown)")
-
-    md = render_markdown(label_range, clusters, args.min_occurrences)
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    args.out.write_text(md, encoding="utf-8")
-    print(f"Wrote {args.out}")
-
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,159 @@
+"""Exact statistics for a review period, computed locally.
+
+Counting things across 7–90 extracts — how many low-energy days, how often
+the morning routine happened, whether weed days skew low — is arithmetic the
+model does unreliably and pays tokens to do at all. `period_stats` computes
+those figures with NumPy from the same extracts the review prompt is built
+from, and `format_stats` renders a compact block that the weekly, monthly and
+quarterly prompts include with an instruction to use the figures as given.
+
+Also the shared parsers for the free-text yes/no and rating fields, used by
+export_extracts.py too.
+"""
+
+import re
+from datetime import date
+
+import numpy as np
+
+ENERGY_SCORES = {"low": 1.0, "medium": 2.0, "high": 3.0}
+ENERGY_LEVELS = ["high", "medium", "low", "mixed"]
+MOVEMENTS = ["consolation", "desolation", "mixed", "unclear"]
+
+_YES_NO_RE = re.compile(r"^\s*(yes|no)\b", re.IGNORECASE)
+_RATING_RE = re.compile(r"\b(10|[1-9])\s*(?:/\s*10)?\b")
+
+
+def yes_no(text: str | None) -> bool | None:
+    """Leading yes/no of fields like weed_use_context ("yes + what preceded ..."), or None."""
+    m = _YES_NO_RE.match(text or "")
+    return None if m is None else m.group(1).lower() == "yes"
+
+
+def rating(text: str | None) -> int | None:
+    """First 1–10 rating in fields like financial_anxiety ("7/10, rent is due"), or None."""
+    m = _RATING_RE.search(text or "")
+    return int(m.group(1)) if m else None
+
+
+def _longest_run(flags: np.ndarray) -> int:
+    """Length of the longest run of True values."""
+    if not flags.any():
+        return 0
+    padded = np.concatenate([[0], flags.astype(np.int8), [0]])
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def period_stats(extracts: list[tuple[str, dict]]) -> dict:
+    """Counts and rates over `extracts` (sorted by date); streaks count calendar days."""
+    n = len(extracts)
+    if not n:
+        return {"days": 0}
+    dates = [date.fromisoformat(d) for d, _ in extracts]
+    energy = np.array([(e.get("energy_level") or "").strip().lower() for _, e in extracts])
+    scores = np.array([ENERGY_SCORES.get(level, np.nan) for level in energy])
+    movement = np.array([
+        next((m for m in MOVEMENTS if (e.get("spiritual_movement") or "").lower().startswith(m)), "")
+        for _, e in extracts
+    ])
+    practices = [
+        [p.strip().lower() for p in (e.get("morning_routine_completed") or []) if str(p).strip()]
+        for _, e in extracts
+    ]
+    weed = np.array([yes_no(e.get("weed_use_context")) for _, e in extracts], dtype=object)
+    paralysis = np.array([yes_no(e.get("work_paralysis")) is True for _, e in extracts])
+    money = np.array([rating(e.get("financial_anxiety")) or np.nan for _, e in extracts], dtype=float)
+    completion = np.array(
+        [e.get("input_completion_score", np.nan) for _, e in extracts], dtype=float
+    )
+
+    # Streaks run over the calendar, so a day with no note breaks them.
+    offsets = np.array([(d - dates[0]).days for d in dates])
+    practised = np.zeros(offsets[-1] + 1, dtype=bool)
+    practised[offsets] = [bool(p) for p in practices]
+
+    practice_counts: dict[str, int] = {}
+    for day in practices:
+        for p in set(day):
+            practice_counts[p] = practice_counts.get(p, 0) + 1
+
+    low = energy == "low"
+    weed_yes = weed == True  # noqa: E712 — elementwise on an object array
+    stats = {
+        "days": n,
+        "first": extracts[0][0],
+        "last": extracts[-1][0],
+        "energy": {level: int((energy == level).sum()) for level in ENERGY_LEVELS},
+        "energy_mean": None if np.isnan(scores).all() else round(float(np.nanmean(scores)), 2),
+        "movement": {m: int((movement == m).sum()) for m in MOVEMENTS},
+        "routine_days": int(sum(bool(p) for p in practices)),
+        "routine_longest_streak": _longest_run(practised),
+        "practices": dict(sorted(practice_counts.items(), key=lambda kv: (-kv[1], kv[0]))),
+        "weed_days": int(weed_yes.sum()),
+        "weed_low_energy_days": int((weed_yes & low).sum()),
+        "low_energy_days": int(low.sum()),
+        "work_paralysis_days": int(paralysis.sum()),
+        "financial_anxiety_mean": (
+            None if np.isnan(money).all() else round(float(np.nanmean(money)), 1)
+        ),
+        "input_completion_mean": (
+            None if np.isnan(completion).all() else round(float(np.nanmean(completion)), 2)
+        ),
+    }
+    return stats
+
+
+def _pct(part: int, whole: int) -> str:
+    return f"{part}/{whole} ({100 * part / whole:.0f}%)" if whole else "0/0"
+
+
+def format_stats(stats: dict) -> str:
+    """Render `period_stats` output as a short plain-text block for a prompt."""
+    n = stats["days"]
+    if not n:
+        return ""
+    energy = ", ".join(f"{k} {v}" for k, v in stats["energy"].items() if v)
+    movement = ", ".join(f"{k} {v}" for k, v in stats["movement"].items() if v)
+    lines = [
+        f"- Days with extracts: {n} ({stats['first']} to {stats['last']})",
+        f"- Energy: {energy or 'not recorded'}"
+        + (f"; mean {stats['energy_mean']} (low=1, medium=2, high=3)"
+           if stats["energy_mean"] is not None else ""),
+    ]
+    if movement:
+        lines.append(f"- Spiritual movement: {movement}")
+    lines.append(
+        f"- Morning routine: any practice on {_pct(stats['routine_days'], n)} days; "
+        f"longest streak {stats['routine_longest_streak']} consecutive days"
+    )
+    if stats["practices"]:
+        top = ", ".join(f"{p} {c}" for p, c in list(stats["practices"].items())[:6])
+        lines.append(f"- Practices (days): {top}")
+    if stats["weed_days"]:
+        weed_low = stats["weed_low_energy_days"] / stats["weed_days"]
+        base_low = stats["low_energy_days"] / n
+        lines.append(
+            f"- Weed use: {stats['weed_days']} days; low energy on "
+            f"{_pct(stats['weed_low_energy_days'], stats['weed_days'])} of them "
+            f"vs {100 * base_low:.0f}% of all days"
+            + (" (higher)" if weed_low > base_low else "")
+        )
+    if stats["work_paralysis_days"]:
+        lines.append(f"- Work paralysis: {_pct(stats['work_paralysis_days'], n)} days")
+    if stats["financial_anxiety_mean"] is not None:
+        lines.append(f"- Financial anxiety: mean {stats['financial_anxiety_mean']}/10 where rated")
+    if stats["input_completion_mean"] is not None:
+        lines.append(f"- Journal template completion: mean {stats['input_completion_mean']}")
+    return "\n".join(lines)
+
+
+def stats_block(extracts: list[tuple[str, dict]]) -> str:
+    """Prompt section with exact figures for `extracts`, or "" if there are none."""
+    text = format_stats(period_stats(extracts))
+    if not text:
+        return ""
+    return (
+        "COMPUTED STATISTICS (exact, counted from the extracts — quote these figures "
+        "rather than estimating counts yourself):\n" + text + "\n\n"
+    )
@@ -0,0 +1,287 @@
+"""Persistent recurring-thread store, updated incrementally as days are added.
+
+Re-clustering the whole history every run repeats work for days that haven't
+changed. The store keeps the clustering instead:
+
+    threads   id, canonical name + note (once named), centroid sum, size
+    phrases   each distinct phrasing and the thread it belongs to
+    mentions  (date, phrasing) pairs, plus the extract hash each date was read at
+
+`update` compares each day's extract hash (extract_index.load_fingerprints)
+with the stored one and only touches days that are new, changed or deleted.
+A new phrasing joins the thread whose members it is most similar to on
+average (the same average-linkage measure embed_cluster uses) if that clears
+the threshold, otherwise it opens a new thread. Phrasings already in the
+store keep their thread. Incremental assignment can drift from what a fresh
+clustering would produce, so `recluster` rebuilds every thread from scratch;
+run it occasionally (recurring_tasks.py --incremental --recluster).
+
+Counts, dates and samples come from `query`, which works for any date window
+— the windowed recurring-task files are cheap queries, not new clusterings.
+The model is only asked to name threads that are new or have doubled in
+size since they were last named.
+"""
+
+import sqlite3
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from embed_cluster import SIMILARITY_THRESHOLD, _samples, agglomerate, embed_phrases, name_clusters
+from extract_index import load_extracts, load_fingerprints
+from llm_common import CACHE_DIR
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    note TEXT,
+    named_occurrences INTEGER NOT NULL DEFAULT 0,
+    centroid BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phrases (
+    key TEXT PRIMARY KEY,
+    thread_id INTEGER NOT NULL REFERENCES threads(id)
+);
+CREATE TABLE IF NOT EXISTS mentions (
+    date TEXT NOT NULL,
+    key TEXT NOT NULL,
+    phrase TEXT NOT NULL,
+    PRIMARY KEY (date, phrase)
+);
+CREATE INDEX IF NOT EXISTS mentions_key ON mentions (key);
+CREATE TABLE IF NOT EXISTS days (
+    date TEXT PRIMARY KEY,
+    extract_sha TEXT NOT NULL
+);
+"""
+
+
+def thread_store_path(kind: str) -> Path:
+    return CACHE_DIR / f"threads_{kind}.sqlite3"
+
+
+def _normalise(item) -> tuple[str, str]:
+    phrase = " ".join(str(item).split())
+    return phrase.lower(), phrase
+
+
+class ThreadStore:
+    def __init__(
+        self,
+        db_path: Path,
+        field: str = "tasks_and_intentions",
+        threshold: float = SIMILARITY_THRESHOLD,
+        embedder: Callable[[list[str]], np.ndarray] | None = None,
+        embed_db: Path | None = None,
+    ):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(_SCHEMA)
+        self.field = field
+        self.threshold = threshold
+        self._embed = lambda keys: embed_phrases(keys, embedder, embed_db)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ThreadStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- maintenance -------------------------------------------------------
+
+    def _items(self, daily_dir: Path, dates: list[str]) -> dict[str, list]:
+        wanted = set(dates)
+        if not wanted:
+            return {}
+        return {
+            d: e.get(self.field) or []
+            for d, e in load_extracts(daily_dir, start=min(wanted), end=max(wanted))
+            if d in wanted
+        }
+
+    def update(self, daily_dir: Path) -> tuple[int, int]:
+        """Bring the store up to date with `daily_dir`; returns (days added/changed, days removed)."""
+        current = load_fingerprints(daily_dir)
+        stored = dict(self.conn.execute("SELECT date, extract_sha FROM days"))
+        changed = sorted(d for d, sha in current.items() if stored.get(d) != sha)
+        removed = sorted(set(stored) - set(current))
+        if not changed and not removed:
+            return 0, 0
+
+        with self.conn:
+            for d in changed + removed:
+                self.conn.execute("DELETE FROM mentions WHERE date = ?", (d,))
+                self.conn.execute("DELETE FROM days WHERE date = ?", (d,))
+            self._drop_orphan_phrases()
+
+            items = self._items(daily_dir, changed)
+            new_mentions = []
+            for d in changed:
+                seen = set()
+                for item in items.get(d, []):
+                    key, phrase = _normalise(item)
+                    if key and phrase not in seen:
+                        seen.add(phrase)
+                        new_mentions.append((d, key, phrase))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO mentions VALUES (?, ?, ?)", new_mentions
+            )
+            self.conn.executemany(
+                "INSERT INTO days VALUES (?, ?)", [(d, current[d]) for d in changed]
+            )
+            if self.conn.execute("SELECT 1 FROM threads LIMIT 1").fetchone() is None:
+                # Empty store (first run): one batch clustering beats
+                # assigning thousands of phrasings one at a time.
+                self._cluster_all()
+            else:
+                known = {k for (k,) in self.conn.execute("SELECT key FROM phrases")}
+                self._assign(sorted({k for _, k, _ in new_mentions} - known))
+        return len(changed), len(removed)
+
+    def _drop_orphan_phrases(self) -> None:
+        orphans = self.conn.execute(
+            "SELECT p.key, p.thread_id FROM phrases p "
+            "WHERE NOT EXISTS (SELECT 1 FROM mentions m WHERE m.key = p.key)"
+        ).fetchall()
+        if not orphans:
+            return
+        vectors = self._embed([k for k, _ in orphans])
+        for (key, thread_id), v in zip(orphans, vectors):
+            blob, size = self.conn.execute(
+                "SELECT centroid, size FROM threads WHERE id = ?", (thread_id,)
+            ).fetchone()
+            if size <= 1:
+                self.conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
+            else:
+                centroid = np.frombuffer(blob, dtype=np.float64) - v
+                self.conn.execute(
+                    "UPDATE threads SET centroid = ?, size = ? WHERE id = ?",
+                    (centroid.tobytes(), size - 1, thread_id),
+                )
+            self.conn.execute("DELETE FROM phrases WHERE key = ?", (key,))
+
+    def _assign(self, keys: list[str]) -> None:
+        """Attach new phrasings to the most similar thread, or open new threads."""
+        if not keys:
+            return
+        vectors = self._embed(keys).astype(np.float64)
+        rows = self.conn.execute("SELECT id, centroid, size FROM threads").fetchall()
+        ids = [r[0] for r in rows]
+        sums = [np.frombuffer(r[1], dtype=np.float64).copy() for r in rows]
+        sizes = [r[2] for r in rows]
+        dirty: set[int] = set()
+
+        for key, v in zip(keys, vectors):
+            best = -1
+            if sums:
+                sims = (np.stack(sums) @ v) / np.asarray(sizes, dtype=np.float64)
+                best = int(sims.argmax())
+                if sims[best] < self.threshold:
+                    best = -1
+            if best == -1:
+                cur = self.conn.execute(
+                    "INSERT INTO threads (centroid, size) VALUES (?, 1)", (v.tobytes(),)
+                )
+                ids.append(cur.lastrowid)
+                sums.append(v.copy())
+                sizes.append(1)
+                best = len(ids) - 1
+            else:
+                sums[best] += v
+                sizes[best] += 1
+                dirty.add(best)
+            self.conn.execute("INSERT INTO phrases VALUES (?, ?)", (key, ids[best]))
+
+        self.conn.executemany(
+            "UPDATE threads SET centroid = ?, size = ? WHERE id = ?",
+            [(sums[i].tobytes(), sizes[i], ids[i]) for i in dirty],
+        )
+
+    def _cluster_all(self) -> None:
+        """Replace every thread with a fresh clustering of all mentioned phrasings."""
+        keys = [k for (k,) in self.conn.execute("SELECT DISTINCT key FROM mentions ORDER BY key")]
+        self.conn.execute("DELETE FROM phrases")
+        self.conn.execute("DELETE FROM threads")
+        if not keys:
+            return
+        vectors = self._embed(keys)
+        for group in agglomerate(vectors, self.threshold):
+            cur = self.conn.execute(
+                "INSERT INTO threads (centroid, size) VALUES (?, ?)",
+                (vectors[group].astype(np.float64).sum(axis=0).tobytes(), len(group)),
+            )
+            self.conn.executemany(
+                "INSERT INTO phrases VALUES (?, ?)", [(keys[i], cur.lastrowid) for i in group]
+            )
+
+    def recluster(self, daily_dir: Path) -> int:
+        """Drop every thread (and its name) and cluster all phrasings from scratch; returns the thread count."""
+        self.update(daily_dir)
+        with self.conn:
+            self._cluster_all()
+        return self.conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+
+    # -- queries -----------------------------------------------------------
+
+    def query(
+        self, start: str | None = None, end: str | None = None, min_occurrences: int = 2,
+        note_field: str = "status_note",
+    ) -> list[dict]:
+        """Threads with >= min_occurrences days in [start, end] (YYYY-MM-DD or prefixes), as cluster dicts."""
+        rows = self.conn.execute(
+            "SELECT p.thread_id, m.date, m.phrase FROM mentions m JOIN phrases p ON p.key = m.key "
+            "WHERE m.date >= ? AND m.date <= ? ORDER BY m.date",
+            (start or "", (end or "9999") + "\uffff"),
+        ).fetchall()
+        names = {
+            tid: (name, note)
+            for tid, name, note in self.conn.execute("SELECT id, name, note FROM threads")
+        }
+        by_thread: dict[int, list[tuple[str, str]]] = {}
+        for tid, d, phrase in rows:
+            by_thread.setdefault(tid, []).append((d, phrase))
+
+        clusters = []
+        for tid, mentions in by_thread.items():
+            dates = sorted({d for d, _ in mentions})
+            if len(dates) < min_occurrences:
+                continue
+            name, note = names.get(tid, (None, None))
+            clusters.append({
+                "id": tid,
+                "canonical_name": name or Counter(p for _, p in mentions).most_common(1)[0][0],
+                "occurrences": len(dates),
+                "first_seen": dates[0],
+                "last_seen": dates[-1],
+                "sample_phrasings": _samples(mentions),
+                note_field: note or "",
+            })
+        clusters.sort(key=lambda c: (-c["occurrences"], c["first_seen"]))
+        return clusters
+
+    def name_threads(
+        self, client, noun: str, note_field: str, note_description: str, min_occurrences: int = 2
+    ) -> int:
+        """Name threads that are new or have doubled in size since last named; returns how many."""
+        lifetime = self.query(min_occurrences=min_occurrences, note_field=note_field)
+        named_at = dict(self.conn.execute("SELECT id, named_occurrences FROM threads WHERE name IS NOT NULL"))
+        stale = [
+            c for c in lifetime
+            if c["id"] not in named_at or c["occurrences"] >= 2 * named_at[c["id"]]
+        ]
+        if not stale:
+            return 0
+        named = name_clusters(stale, client, noun, note_field, note_description)
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE threads SET name = ?, note = ?, named_occurrences = ? WHERE id = ?",
+                [(c["canonical_name"], c[note_field], c["occurrences"], c["id"]) for c in named],
+            )
+        return len(named)
@@ -2,16 +2,59 @@
 
 Usage:
     python compute/transcribe.py --inputs samples/media/ --out out/transcripts/
+    python compute/transcribe.py --inputs samples/media/ --out out/transcripts/ --pipeline
+    python compute/transcribe.py --inputs /mnt/backlog --out out/transcripts/ --status
+    python compute/transcribe.py --inputs /mnt/backlog --out out/transcripts/ --retry-failed
+
+Media files are found recursively under --inputs and tracked in a manifest
+(media_manifest.py, HARMONY_CACHE_DIR/transcribe_manifest.sqlite3) with a
+pending/running/done/failed state each, so a run can be stopped and resumed at
+any point, ordered by recording date (--newest-first), capped (--limit), or
+limited to earlier failures (--retry-failed).
+
+--pipeline is for large backlogs: date resolution (ffprobe) and audio decoding
+run in a process pool ahead of the GPU, faster-whisper's BatchedInferencePipeline
+transcribes the decoded audio in batches, and a writer thread saves the results,
+so the GPU is not left waiting on probing, decoding or disk. Each file reports
+its real-time factor (transcription time / audio duration).
+
+ffprobe results (creation time, duration, codec) and each file's resolved date
+are cached in HARMONY_CACHE_DIR/media_probe.sqlite3, keyed by path and
+invalidated by size/mtime, so reruns over a backlog spawn no ffprobe processes
+for files already probed.
+
+Recordings longer than chunking.LONG_AUDIO_SECONDS are split at silences into
+chunks transcribed --chunk-workers at a time and checkpointed, so an
+interrupted multi-hour file resumes at its last finished chunk.
 """
 
 import argparse
+import collections
 import datetime
 import json
+import multiprocessing
+import os
+import queue
 import re
+import sqlite3
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+from atomic_io import atomic_write_text
+from chunking import (
+    LONG_AUDIO_SECONDS,
+    SAMPLE_RATE,
+    checkpoint_path,
+    fmt_ts,
+    format_segments,
+    transcribe_long,
+)
+from media_manifest import Manifest
+
 # From shared/ingest-and-dating.md section 4
 _MEDIA_EXTENSIONS = {".mp4", ".mov", ".mp3", ".m4a", ".wav"}
 
@@ -21,32 +64,57 @@ _MEDIA_EXTENSIONS = {".mp4", ".mov", ".mp3", ".m4a", ".wav"}
 # ---------------------------------------------------------------------------
 
 def _fmt_ts(seconds: float) -> str:
-    """Return MM:SS.f from a float number of seconds, e.g. 83.4 -> '01:23.4'."""
-    mins, secs = divmod(seconds, 60)
-    return f"{int(mins):02d}:{secs:04.1f}"
+    """Return MM:SS.f (H:MM:SS.f from an hour on), e.g. 83.4 -> '01:23.4'."""
+    return fmt_ts(seconds)
 
 
 # ---------------------------------------------------------------------------
 # Date resolution
 # ---------------------------------------------------------------------------
 
-def _probe_creation_time(path: Path) -> "datetime.datetime | None":
-    """Return a timezone-aware UTC datetime from ffprobe creation_time, or None."""
+def _probe_metadata(path: Path) -> "dict | None":
+    """Return {creation_time, duration, codec} from ffprobe, or None if ffprobe failed.
+
+    creation_time is the raw tag string (or None); duration is in seconds and
+    codec is the first audio stream's codec name, either None if unavailable.
+    """
     try:
         result = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", str(path)],
+            ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams",
+             str(path)],
             capture_output=True, text=True, check=True,
         )
         data = json.loads(result.stdout)
-        raw = data.get("format", {}).get("tags", {}).get("creation_time")
-        if not raw:
-            return None
-        # Normalize trailing Z to +00:00 for fromisoformat compatibility
-        raw_norm = raw.replace("Z", "+00:00")
-        return datetime.datetime.fromisoformat(raw_norm)
     except Exception as exc:
         print(f"ffprobe error for {path.name}: {exc}", file=sys.stderr)
         return None
+    fmt = data.get("format", {})
+    audio = next((st for st in data.get("streams", []) if st.get("codec_type") == "audio"), {})
+    try:
+        duration = float(fmt.get("duration") or audio.get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    return {
+        "creation_time": fmt.get("tags", {}).get("creation_time") or None,
+        "duration": duration,
+        "codec": audio.get("codec_name"),
+    }
+
+
+def _parse_creation_time(raw: "str | None") -> "datetime.datetime | None":
+    if not raw:
+        return None
+    # Normalize trailing Z to +00:00 for fromisoformat compatibility
+    try:
+        return datetime.datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _probe_creation_time(path: Path) -> "datetime.datetime | None":
+    """Return a timezone-aware UTC datetime from ffprobe creation_time, or None."""
+    meta = _probe_metadata(path)
+    return _parse_creation_time(meta["creation_time"]) if meta else None
 
 
 # Patterns ordered by specificity: prefixed camera names first, then bare runs
@@ -70,22 +138,123 @@ def _date_from_filename(path: Path) -> "datetime.date | None":
     return None
 
 
+def _date_from_metadata(
+    path: Path, utc_dt: "datetime.datetime | None", quiet: bool = False
+) -> "tuple[datetime.date, str]":
+    """Return (date, source) using creation time -> filename -> mtime priority."""
+    if utc_dt is not None:
+        date, source = utc_dt.astimezone().date(), "ffprobe"
+    elif (date := _date_from_filename(path)) is not None:
+        source = "filename"
+    else:
+        date = datetime.datetime.fromtimestamp(path.stat().st_mtime).date()
+        source = "mtime"
+    if not quiet:
+        print(f"{path.name} -> {date} (via {source})", file=sys.stderr)
+    return date, source
+
+
 def _resolve_date(path: Path) -> "tuple[datetime.date, str]":
     """Return (date, source) using ffprobe -> filename -> mtime priority."""
-    utc_dt = _probe_creation_time(path)
-    if utc_dt is not None:
-        date = utc_dt.astimezone().date()
-        print(f"{path.name} -> {date} (via ffprobe)", file=sys.stderr)
-        return date, "ffprobe"
+    return _date_from_metadata(path, _probe_creation_time(path))
 
-    date = _date_from_filename(path)
-    if date is not None:
-        print(f"{path.name} -> {date} (via filename)", file=sys.stderr)
-        return date, "filename"
 
-    date = datetime.datetime.fromtimestamp(path.stat().st_mtime).date()
-    print(f"{path.name} -> {date} (via mtime)", file=sys.stderr)
-    return date, "mtime"
+# ---------------------------------------------------------------------------
+# Probe cache
+# ---------------------------------------------------------------------------
+
+# Same default as llm_common.CACHE_DIR; not imported from there so this script
+# keeps running on the GPU box without the anthropic client installed.
+PROBE_CACHE_PATH = Path(
+    os.environ.get("HARMONY_CACHE_DIR", Path.home() / ".cache" / "harmony")
+) / "media_probe.sqlite3"
+MANIFEST_PATH = PROBE_CACHE_PATH.with_name("transcribe_manifest.sqlite3")
+
+_PROBE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path          TEXT PRIMARY KEY,
+    size          INTEGER NOT NULL,
+    mtime_ns      INTEGER NOT NULL,
+    creation_time TEXT,
+    duration      REAL,
+    codec         TEXT,
+    date          TEXT NOT NULL,
+    date_source   TEXT NOT NULL
+)
+"""
+
+
+def probe_media(
+    paths: "list[Path]", db_path: Path = PROBE_CACHE_PATH, workers: int = 8
+) -> "dict[Path, dict]":
+    """ffprobe metadata and the resolved date for each of `paths`, via a persistent cache.
+
+    Entries are keyed by absolute path and reused while size and mtime are
+    unchanged, so a rerun over an already-probed directory spawns no
+    subprocesses. Misses are probed in parallel (ffprobe is a subprocess, so
+    threads suffice). A failed ffprobe is not cached: the file falls back to its
+    filename/mtime date this run and is probed again next time.
+
+    Each value has creation_time, duration, codec, date (datetime.date) and
+    date_source. Paths that can no longer be stat'ed are left out.
+    """
+    stats = {}
+    for path in paths:
+        try:
+            stats[path] = path.stat()
+        except OSError as exc:
+            print(f"ERROR: {path.name}: {exc}", file=sys.stderr)
+
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(_PROBE_SCHEMA)
+        cached = {
+            row[0]: row[1:]
+            for row in conn.execute(
+                "SELECT path, size, mtime_ns, creation_time, duration, codec, date, date_source "
+                "FROM media"
+            )
+        }
+        results: dict[Path, dict] = {}
+        misses = []
+        for path, st in stats.items():
+            row = cached.get(str(path.resolve()))
+            if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                results[path] = {
+                    "creation_time": row[2], "duration": row[3], "codec": row[4],
+                    "date": datetime.date.fromisoformat(row[5]), "date_source": row[6],
+                }
+            else:
+                misses.append(path)
+
+        if misses:
+            print(f"Probing {len(misses)} file(s) ({len(results)} cached)", file=sys.stderr)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                probed = list(pool.map(_probe_metadata, misses))
+            rows = []
+            for path, meta in zip(misses, probed):
+                creation = meta["creation_time"] if meta else None
+                date, source = _date_from_metadata(path, _parse_creation_time(creation), quiet=True)
+                results[path] = {
+                    "creation_time": creation,
+                    "duration": meta["duration"] if meta else None,
+                    "codec": meta["codec"] if meta else None,
+                    "date": date, "date_source": source,
+                }
+                if meta is not None:
+                    st = stats[path]
+                    rows.append((
+                        str(path.resolve()), st.st_size, st.st_mtime_ns, creation,
+                        meta["duration"], meta["codec"], date.isoformat(), source,
+                    ))
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+    finally:
+        conn.close()
+    return results
 
 
 # ---------------------------------------------------------------------------
@@ -111,36 +280,169 @@ def _write_transcript(
         f"\n"
         f"{transcript}\n"
     )
-    out_path.write_text(content, encoding="utf-8")
+    atomic_write_text(out_path, content)
 
 
 # ---------------------------------------------------------------------------
 # Transcription
 # ---------------------------------------------------------------------------
 
+def _format_segments(segments) -> str:
+    return format_segments(segments)
+
+
+def _checkpoint_for(path: Path) -> Path:
+    st = path.stat()
+    return checkpoint_path(str(path.resolve()), str(st.st_size), str(st.st_mtime_ns))
+
+
 def _transcribe_file(
     model: "object",
     path: Path,
-    out_dir: Path,
+    out_path: Path,
     generated_at: str,
+    resolved: "tuple[datetime.date, str] | None" = None,
+    duration: "float | None" = None,
+    chunk_workers: int = 1,
 ) -> bool:
-    """Transcribe one file. Returns True if transcribed, False if skipped."""
-    out_path = out_dir / f"{path.stem}.md"
+    """Transcribe one file to `out_path`. Returns True if transcribed, False if skipped.
 
+    `resolved` is a (date, date_source) and `duration` the length in seconds,
+    both already looked up, e.g. by probe_media. Recordings longer than
+    LONG_AUDIO_SECONDS go through transcribe_long, `chunk_workers` chunks at a time.
+    """
     if out_path.exists():
         print(f"skip (already done): {path.name}", file=sys.stderr)
         return False
 
-    date, date_source = _resolve_date(path)
-    segments, _info = model.transcribe(str(path))
-    transcript = "\n".join(
-        f"[{_fmt_ts(seg.start)} -> {_fmt_ts(seg.end)}] {seg.text.strip()}"
-        for seg in segments
-    )
+    date, date_source = resolved or _resolve_date(path)
+    checkpoint = None
+    if (duration or 0) > LONG_AUDIO_SECONDS:
+        from faster_whisper import decode_audio  # noqa: PLC0415
+        checkpoint = _checkpoint_for(path)
+        segments = transcribe_long(
+            decode_audio(str(path), sampling_rate=SAMPLE_RATE),
+            lambda clip: model.transcribe(clip)[0],
+            checkpoint, workers=chunk_workers,
+        )
+    else:
+        segments, _info = model.transcribe(str(path))
+    transcript = _format_segments(segments)
     _write_transcript(out_path, date, path.name, transcript, date_source, generated_at)
+    if checkpoint is not None:
+        checkpoint.unlink(missing_ok=True)
     return True
 
 
+# ---------------------------------------------------------------------------
+# Pipelined mode
+# ---------------------------------------------------------------------------
+
+def _decode(path: Path) -> "object":
+    """Decode to 16 kHz mono float32. Runs in a worker process."""
+    from faster_whisper import decode_audio  # noqa: PLC0415
+    return decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+
+
+def _writer(jobs: "queue.Queue", counts: "dict[str, int]", on_state) -> None:
+    """Write (path, out_path, date, transcript, date_source, generated_at, checkpoint) jobs until None."""
+    while (job := jobs.get()) is not None:
+        path, out_path, date, transcript, date_source, generated_at, checkpoint = job
+        try:
+            _write_transcript(out_path, date, path.name, transcript, date_source, generated_at)
+            if checkpoint is not None:
+                checkpoint.unlink(missing_ok=True)
+        except Exception as exc:
+            print(f"ERROR: writing {out_path.name}: {exc}", file=sys.stderr)
+            counts["write_failed"] += 1
+            on_state(path, "failed", f"write: {exc}")
+            continue
+        counts["transcribed"] += 1
+        on_state(path, "done", None)
+
+
+def _ignore_state(path: Path, state: str, error: "str | None") -> None:
+    pass
+
+
+def _run_pipeline(
+    batched: "object",
+    targets: "dict[Path, tuple[Path, datetime.date, str]]",
+    generated_at: str,
+    pool: Executor,
+    prefetch: int,
+    batch_size: int = 16,
+    decode=_decode,
+    on_state=_ignore_state,
+    chunk_workers: int = 1,
+) -> "tuple[int, int]":
+    """Transcribe each media path in `targets` with `batched`, keeping `prefetch` files decoded ahead.
+
+    `targets` maps media path -> (output path, date, date_source), in the order
+    to process. Long recordings are split by transcribe_long and `chunk_workers`
+    of their chunks transcribed at a time. `on_state(path, state, error)` is told when a file starts
+    ("running") and finishes ("done"/"failed"); it may be called from the
+    writer thread. Returns (transcribed, failed).
+    """
+    # The writer thread only touches "transcribed" and "write_failed".
+    counts = {"transcribed": 0, "failed": 0, "write_failed": 0}
+    # Bounded so a slow disk can't let decoded-but-unwritten text pile up.
+    jobs: queue.Queue = queue.Queue(maxsize=max(prefetch, 1))
+    writer = threading.Thread(target=_writer, args=(jobs, counts, on_state), daemon=True)
+    writer.start()
+
+    remaining = iter(targets)
+    inflight: collections.deque = collections.deque()
+
+    def submit_next() -> None:
+        path = next(remaining, None)
+        if path is not None:
+            on_state(path, "running", None)
+            inflight.append((path, pool.submit(decode, path)))
+
+    for _ in range(max(prefetch, 1)):
+        submit_next()
+
+    total = len(targets)
+    done = 0
+    while inflight:
+        path, future = inflight.popleft()
+        submit_next()
+        done += 1
+        out_path, date, date_source = targets[path]
+        try:
+            audio = future.result()
+            started = time.monotonic()
+            checkpoint = None
+            if len(audio) / SAMPLE_RATE > LONG_AUDIO_SECONDS:
+                checkpoint = _checkpoint_for(path)
+                segments = transcribe_long(
+                    audio, lambda clip: batched.transcribe(clip, batch_size=batch_size)[0],
+                    checkpoint, workers=chunk_workers,
+                )
+            else:
+                segments, _info = batched.transcribe(audio, batch_size=batch_size)
+            transcript = _format_segments(segments)  # segments are lazy; this runs the model
+            elapsed = time.monotonic() - started
+        except Exception as exc:
+            print(f"ERROR: {path.name}: {exc}", file=sys.stderr)
+            counts["failed"] += 1
+            on_state(path, "failed", str(exc))
+            continue
+        duration = len(audio) / SAMPLE_RATE
+        rtf = elapsed / duration if duration else 0.0
+        print(
+            f"[{done}/{total}] {path.name}: {_fmt_ts(duration)} audio in {elapsed:.1f}s "
+            f"(RTF {rtf:.3f})",
+            file=sys.stderr,
+        )
+        jobs.put((path, out_path, date, transcript, date_source, generated_at, checkpoint))
+
+    jobs.put(None)
+    writer.join()
+    return counts["transcribed"], counts["failed"] + counts["write_failed"]
+
+
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
@@ -149,8 +451,26 @@ def main() -> None:
     parser = argparse.ArgumentParser(
         description="Stage 0b: transcribe audio/video files into per-date transcript notes."
     )
-    parser.add_argument("--inputs", required=True, type=Path, help="Input directory")
+    parser.add_argument("--inputs", required=True, type=Path,
+                        help="Input directory (searched recursively)")
     parser.add_argument("--out", required=True, type=Path, help="Output directory")
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH,
+                        help=f"Backlog manifest (default {MANIFEST_PATH})")
+    parser.add_argument("--status", action="store_true",
+                        help="Scan, print how many files are in each state, and exit")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Only retry files that failed before")
+    parser.add_argument("--newest-first", action="store_true",
+                        help="Transcribe the most recent recordings first (default oldest first)")
+    parser.add_argument("--limit", type=int, help="Transcribe at most N files this run")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Probe and decode in a process pool ahead of batched GPU inference")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Parallel ffprobe calls, and decode processes for --pipeline (default 4)")
+    parser.add_argument("--batch-size", type=int, default=16,
+                        help="Segments per GPU batch for --pipeline (default 16)")
+    parser.add_argument("--chunk-workers", type=int, default=2,
+                        help="Chunks of a long recording transcribed concurrently (default 2)")
     args = parser.parse_args()
 
     if not args.inputs.exists():
@@ -159,27 +479,69 @@ def main() -> None:
     args.out.mkdir(parents=True, exist_ok=True)
     generated_at = datetime.datetime.now().isoformat(timespec="seconds")
 
-    media_files = sorted(
-        p for p in args.inputs.iterdir() if p.suffix.lower() in _MEDIA_EXTENSIONS
-    )
-    print(f"Found {len(media_files)} media file(s)", file=sys.stderr)
-
-    from faster_whisper import WhisperModel  # noqa: PLC0415 — imported late to allow mocking
-    model = WhisperModel("large-v3", device="cuda", compute_type="int8_float16")
-
-    transcribed = skipped = failed = 0
-    for path in media_files:
-        try:
-            did_transcribe = _transcribe_file(model, path, args.out, generated_at)
-            if did_transcribe:
-                transcribed += 1
-            else:
-                skipped += 1
-        except Exception as exc:
-            print(f"ERROR: {path.name}: {exc}", file=sys.stderr)
-            failed += 1
+    with Manifest(args.manifest) as manifest:
+        scanned = manifest.scan(args.inputs, args.out, _MEDIA_EXTENSIONS)
+        reset = manifest.reset_running()
+        print(
+            f"Manifest: {scanned['new']} new, {scanned['changed']} changed, "
+            f"{scanned['removed']} removed"
+            + (f", {reset} interrupted run(s) reset to pending" if reset else ""),
+            file=sys.stderr,
+        )
+        if args.status:
+            print(" ".join(f"{state} {n}" for state, n in manifest.counts().items()))
+            return
+
+        states = ("failed",) if args.retry_failed else ("pending",)
+        # Date and duration are needed to order the backlog; cached after the first probe.
+        probed = probe_media(manifest.paths(states), workers=args.workers)
+        for path, meta in probed.items():
+            manifest.set_metadata(path, meta["date"], meta["duration"])
+        targets = {
+            path: (out_path, probed[path]["date"], probed[path]["date_source"])
+            for path, out_path in manifest.select(states, args.newest_first, args.limit)
+            if path in probed
+        }
+        print(f"Transcribing {len(targets)} file(s)", file=sys.stderr)
+        if not targets:
+            return
+
+        from faster_whisper import WhisperModel  # noqa: PLC0415 — imported late to allow mocking
+        model = WhisperModel(
+            "large-v3", device="cuda", compute_type="int8_float16",
+            num_workers=max(args.chunk_workers, 1),
+        )
 
-    print(f"Done: {transcribed} transcribed, {skipped} skipped, {failed} failed", file=sys.stderr)
+        if args.pipeline:
+            from faster_whisper import BatchedInferencePipeline  # noqa: PLC0415
+            # spawn, not fork: the parent already holds a CUDA context.
+            with ProcessPoolExecutor(
+                args.workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                transcribed, failed = _run_pipeline(
+                    BatchedInferencePipeline(model=model), targets, generated_at, pool,
+                    prefetch=2 * args.workers, batch_size=args.batch_size,
+                    on_state=manifest.mark, chunk_workers=args.chunk_workers,
+                )
+        else:
+            transcribed = failed = 0
+            for path, (out_path, date, date_source) in targets.items():
+                manifest.mark(path, "running")
+                try:
+                    done = _transcribe_file(
+                        model, path, out_path, generated_at, (date, date_source),
+                        probed[path]["duration"], args.chunk_workers,
+                    )
+                except Exception as exc:
+                    print(f"ERROR: {path.name}: {exc}", file=sys.stderr)
+                    manifest.mark(path, "failed", str(exc))
+                    failed += 1
+                    continue
+                manifest.mark(path, "done")
+                transcribed += done
+
+        print(f"Done: {transcribed} transcribed, {failed} failed", file=sys.stderr)
+        print(" ".join(f"{state} {n}" for state, n in manifest.counts().items()), file=sys.stderr)
 
 
 if __name__ == "__main__":
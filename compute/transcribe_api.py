@@ -1,60 +1,230 @@
 """HTTP API wrapper around faster-whisper for on-demand transcription.
 
 Runs on Forge, bound to the Tailscale interface.
-Single endpoint: POST /transcribe  (multipart, field: file)
-Returns:         {"transcript": "<markdown text>", "filename": "<original name>"}
+
+Job endpoints (preferred — the work survives client disconnects):
+    POST /jobs                 multipart: file, task=transcribe|clean, music
+                               -> 202 {"job_id": ..., "state": "queued"}
+    GET  /jobs/{id}            state, progress (0-1), queue position, error
+    GET  /jobs/{id}/result     transcribe: {"transcript", "filename"}; clean: the MP3
+    POST /jobs also takes priority=interactive|batch (default batch).
+Jobs are kept in a persistent queue (job_queue.py) and run by
+WHISPER_JOB_WORKERS background workers; one that was running when the server
+stopped runs again at the next start.
+
+Short, non-music recordings (up to WHISPER_BATCH_MAX_SECONDS) that arrive
+within WHISPER_BATCH_WINDOW_MS of each other are coalesced (coalesce.py) into
+one BatchedInferencePipeline pass and the segments split back per request; a
+request that finds no company is transcribed on its own, as usual.
+
+All GPU work — synchronous requests (interactive) and jobs — goes through a
+GpuScheduler (gpu_scheduler.py): Whisper and DeepFilterNet runs are admitted
+only while their estimated VRAM fits in WHISPER_GPU_BUDGET_MB, so they don't
+pile onto the 3090 alongside Ollama. The Whisper weights hold a standing
+reservation for as long as they are on the GPU, idle or not; each run is
+charged only its working memory on top. Queue depth is reported on /health.
+
+Model residency is tiered. After WHISPER_IDLE_TIMEOUT idle seconds the weights
+leave the GPU but stay in host RAM (CTranslate2's unload_model(to_cpu=True)),
+so the next request pays a host-to-GPU copy instead of a large-v3 load from
+disk; after a further WHISPER_HOST_IDLE_TIMEOUT they are dropped entirely.
+/health reports the current tier and the last load and reload times.
+
+Synchronous endpoints, which hold the connection for the whole run:
+    POST /transcribe  (multipart, field: file)
+    Returns:          {"transcript": "<markdown text>", "filename": "<original name>"}
+    POST /clean       returns the denoised MP3
+
+    POST /warmup      bring the model onto the GPU now; the Slack bot calls it as
+                      soon as it sees an upload, so the load overlaps the download
 
 Usage:
     uvicorn compute.transcribe_api:app --host <tailscale-ip> --port 8765
 
 Environment:
-    WHISPER_IDLE_TIMEOUT  seconds of inactivity before unloading model (default 600)
+    WHISPER_IDLE_TIMEOUT   seconds of inactivity before moving the model off the GPU (default 600)
+    WHISPER_HOST_IDLE_TIMEOUT  further idle seconds before dropping it from host RAM
+                           (default 3600; 0 skips the host tier)
+    WHISPER_CHUNK_WORKERS  chunks of a long upload transcribed concurrently (default 2)
+    WHISPER_MAX_UPLOAD_MB  largest accepted upload, in MiB (default 4096)
+    WHISPER_GPU_BUDGET_MB  VRAM this service may use alongside Ollama (default 6000)
+    WHISPER_VRAM_MB        estimated VRAM of the loaded Whisper weights (default 3000)
+    WHISPER_RUN_VRAM_MB    estimated working VRAM per Whisper run, on top (default 500)
+    DENOISE_VRAM_MB        estimated VRAM per DeepFilterNet run (default 1500)
+    WHISPER_JOB_WORKERS    jobs taken off the queue concurrently (default 2)
+    WHISPER_BATCH_WINDOW_MS    how long a short request waits for company (default 100)
+    WHISPER_BATCH_MAX_FILES    most recordings coalesced into one pass (default 8)
+    WHISPER_BATCH_MAX_SECONDS  longest recording that is coalesced (default 120)
+    WHISPER_BATCH_SIZE         30 s windows per GPU batch in a coalesced pass (default 16)
+    WHISPER_TRANSCRIPT_CACHE_DIR  transcript cache location (scratch SSD)
+    WHISPER_TRANSCRIPT_CACHE_MB   transcript cache size before LRU eviction (default 512)
+
+Uploads are streamed to disk in 1 MiB pieces (never held in memory whole), then
+ffmpeg extracts a mono WAV of the first audio track — 16 kHz for Whisper, 48 kHz
+for DeepFilterNet — so neither model decodes video containers itself.
+
+Finished transcripts are cached by audio content, model and options
+(transcript_cache.py), so a recording sent again is answered without the GPU;
+the hit rate is on /health.
+
+Uploads longer than chunking.LONG_AUDIO_SECONDS are transcribed in
+checkpointed chunks (see chunking.py); the checkpoint is keyed by the upload's
+content, so retrying the same file after a crash resumes where it stopped.
 """
 
 import asyncio
 import datetime
 import gc
+import hashlib
 import logging
 import os
+import shutil
+import subprocess
 import tempfile
+import time
+import wave
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, Form, HTTPException, UploadFile
+from fastapi import FastAPI, Form, HTTPException, Request, UploadFile
 from fastapi.responses import FileResponse, JSONResponse
 from starlette.background import BackgroundTask
 
+from .chunking import (
+    BATCH_GAP_SECONDS,
+    LONG_AUDIO_SECONDS,
+    SAMPLE_RATE,
+    batch_layout,
+    checkpoint_path,
+    fmt_ts,
+    format_segments,
+    speech_regions,
+    split_batch,
+    transcribe_long,
+)
+from .coalesce import Coalescer
 from .denoise import denoise_audio
+from .gpu_scheduler import INTERACTIVE, PRIORITIES, GpuScheduler
+from .job_queue import KINDS, JobStore
+from .transcript_cache import TranscriptCache, cache_key
 
+WHISPER_MODEL = "large-v3"
 _MEDIA_EXTENSIONS = {".mp4", ".mov", ".mp3", ".m4a", ".wav", ".ogg", ".webm"}
 
 IDLE_TIMEOUT = int(os.environ.get("WHISPER_IDLE_TIMEOUT", "600"))
+HOST_IDLE_TIMEOUT = int(os.environ.get("WHISPER_HOST_IDLE_TIMEOUT", "3600"))
+CHUNK_WORKERS = int(os.environ.get("WHISPER_CHUNK_WORKERS", "2"))
+MAX_UPLOAD_BYTES = int(os.environ.get("WHISPER_MAX_UPLOAD_MB", "4096")) * 1024 * 1024
+_UPLOAD_CHUNK = 1 << 20
+DENOISE_SAMPLE_RATE = 48000  # DeepFilterNet's native rate
+GPU_BUDGET_MB = int(os.environ.get("WHISPER_GPU_BUDGET_MB", "6000"))
+WHISPER_VRAM_MB = int(os.environ.get("WHISPER_VRAM_MB", "3000"))
+WHISPER_RUN_VRAM_MB = int(os.environ.get("WHISPER_RUN_VRAM_MB", "500"))
+DENOISE_VRAM_MB = int(os.environ.get("DENOISE_VRAM_MB", "1500"))
+JOB_WORKERS = int(os.environ.get("WHISPER_JOB_WORKERS", "2"))
+BATCH_WINDOW = int(os.environ.get("WHISPER_BATCH_WINDOW_MS", "100")) / 1000
+BATCH_MAX_FILES = int(os.environ.get("WHISPER_BATCH_MAX_FILES", "8"))
+BATCH_MAX_SECONDS = float(os.environ.get("WHISPER_BATCH_MAX_SECONDS", "120"))
+BATCH_SIZE = int(os.environ.get("WHISPER_BATCH_SIZE", "16"))
 _CHECK_INTERVAL = 60
 
 log = logging.getLogger(__name__)
 
 _model = None
+_residency = {
+    "loads": 0,
+    "last_load_s": None,
+    "reloads": 0,
+    "last_reload_s": None,
+    "evictions": 0,
+}
+_weights_mb: int = 0  # budget reserved for the weights while they are on the GPU
 _last_used: float = 0.0
 _active_count: int = 0
 _model_lock: asyncio.Lock
+_jobs: JobStore
+_job_wakeup: asyncio.Event
+_gpu: GpuScheduler
+_coalescer: Coalescer
+_transcripts: TranscriptCache
+
+
+def _model_tier() -> str:
+    """Where the weights are: "gpu", "host" (evicted to RAM), or "disk" (not loaded)."""
+    if _model is None:
+        return "disk"
+    return "gpu" if _model.model.model_is_loaded else "host"
 
 
 def _load_model():
+    """Return the model on the GPU, loading it from disk or copying it back from host RAM.
+
+    Blocking; call with _model_lock held, from an executor thread.
+    """
     global _model
-    if _model is None:
+    tier = _model_tier()
+    if tier == "gpu":
+        return _model
+    started = time.monotonic()
+    if tier == "host":
+        log.info("Moving Whisper model back to the GPU...")
+        _model.model.load_model()
+        kind = "reload"
+    else:
         from faster_whisper import WhisperModel  # noqa: PLC0415
         log.info("Loading Whisper model...")
-        _model = WhisperModel("large-v3", device="cuda", compute_type="int8_float16")
-        log.info("Whisper model loaded.")
+        _model = WhisperModel(
+            WHISPER_MODEL, device="cuda", compute_type="int8_float16",
+            num_workers=max(CHUNK_WORKERS, 1),
+        )
+        kind = "load"
+    took = round(time.monotonic() - started, 2)
+    _residency[f"{kind}s"] += 1
+    _residency[f"last_{kind}_s"] = took
+    log.info("Whisper model on GPU (%s took %.2fs).", kind, took)
     return _model
 
 
+async def _model_on_gpu(priority: int):
+    """The model, loaded onto the GPU if need be; call with _model_lock held.
+
+    Loading first reserves WHISPER_VRAM_MB on the scheduler for the weights,
+    held until they leave the GPU (_release_weights).
+    """
+    global _weights_mb
+    if _model_tier() == "gpu":
+        return _model
+    reserved = await _gpu.reserve(WHISPER_VRAM_MB, priority)
+    try:
+        model = await asyncio.get_running_loop().run_in_executor(None, _load_model)
+    except BaseException:
+        _gpu.release(reserved)
+        raise
+    _weights_mb = reserved
+    return model
+
+
+def _release_weights():
+    global _weights_mb
+    if _weights_mb:
+        _gpu.release(_weights_mb)
+        _weights_mb = 0
+
+
+def _evict_to_host():
+    log.info("Moving Whisper model to host RAM (idle timeout).")
+    _model.model.unload_model(to_cpu=True)
+    _residency["evictions"] += 1
+    _release_weights()
+
+
 def _unload_model():
     global _model
     if _model is not None:
-        log.info("Unloading Whisper model (idle timeout).")
+        log.info("Unloading Whisper model.")
         _model = None
         gc.collect()
+        _release_weights()
 
 
 async def _idle_watcher():
@@ -62,35 +232,85 @@ async def _idle_watcher():
         await asyncio.sleep(_CHECK_INTERVAL)
         loop = asyncio.get_running_loop()
         async with _model_lock:
-            if _model is not None and _active_count == 0:
-                if loop.time() - _last_used >= IDLE_TIMEOUT:
+            if _model is None or _active_count:
+                continue
+            idle = loop.time() - _last_used
+            tier = _model_tier()
+            if tier == "gpu" and idle >= IDLE_TIMEOUT:
+                if HOST_IDLE_TIMEOUT > 0:
+                    _evict_to_host()
+                else:
                     _unload_model()
+            elif tier == "host" and idle >= IDLE_TIMEOUT + HOST_IDLE_TIMEOUT:
+                _unload_model()
 
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    global _model_lock
+    global _model_lock, _jobs, _job_wakeup, _gpu, _coalescer, _transcripts
     _model_lock = asyncio.Lock()
-    task = asyncio.create_task(_idle_watcher())
+    _gpu = GpuScheduler(GPU_BUDGET_MB)
+    _coalescer = Coalescer(_run_batch, BATCH_WINDOW, BATCH_MAX_FILES)
+    _jobs = JobStore()
+    _transcripts = TranscriptCache()
+    _job_wakeup = asyncio.Event()
+    requeued = _jobs.requeue_running()
+    if requeued:
+        log.info("Re-queued %d job(s) interrupted by the last shutdown.", requeued)
+    _jobs.prune()
+    tasks = [asyncio.create_task(_idle_watcher())]
+    tasks += [asyncio.create_task(_job_worker()) for _ in range(max(JOB_WORKERS, 1))]
     yield
-    task.cancel()
-    try:
-        await task
-    except asyncio.CancelledError:
-        pass
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
     async with _model_lock:
         _unload_model()
+    _jobs.close()
+    _transcripts.close()
 
 
 app = FastAPI(title="Harmony Transcription API", lifespan=lifespan)
 
 
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MiB limit"
+    )
+
+
+@app.middleware("http")
+async def _reject_oversized(request: Request, call_next):
+    """Refuse an over-size upload by its Content-Length, before Starlette spools it to disk.
+
+    One extra chunk of allowance covers the multipart framing and form fields;
+    a body sent without Content-Length is still cut off by _save_upload.
+    """
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > MAX_UPLOAD_BYTES + _UPLOAD_CHUNK:
+        exc = _too_large()
+        return JSONResponse({"detail": exc.detail}, status_code=exc.status_code)
+    return await call_next(request)
+
+
 def _fmt_ts(seconds: float) -> str:
-    mins, secs = divmod(seconds, 60)
-    return f"{int(mins):02d}:{secs:04.1f}"
+    return fmt_ts(seconds)
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            h.update(chunk)
+    return h.hexdigest()
 
 
-def _run_transcription(audio_path: Path, model, music: bool = False) -> str:
+def _run_transcription(audio_path: Path, model, music: bool = False, progress=None) -> str:
+    """Transcript lines for a 16 kHz WAV; `progress(fraction)` is called as it advances."""
     kwargs = {}
     if music:
         # Music vocals confuse Whisper's language-model conditioning: an early
@@ -100,12 +320,200 @@ def _run_transcription(audio_path: Path, model, music: bool = False) -> str:
         kwargs["condition_on_previous_text"] = False
         kwargs["temperature"] = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0]
         kwargs["vad_filter"] = True
-    segments, _info = model.transcribe(str(audio_path), **kwargs)
-    lines = [
-        f"[{_fmt_ts(seg.start)} -> {_fmt_ts(seg.end)}] {seg.text.strip()}"
-        for seg in segments
-    ]
-    return "\n".join(lines)
+    from faster_whisper import decode_audio  # noqa: PLC0415
+    audio = decode_audio(str(audio_path), sampling_rate=SAMPLE_RATE)
+    duration = len(audio) / SAMPLE_RATE
+    if duration <= LONG_AUDIO_SECONDS:
+        segments, _info = model.transcribe(audio, **kwargs)
+        if progress is not None:
+            segments = list(_reporting(segments, duration, progress))
+        return format_segments(segments)
+
+    checkpoint = checkpoint_path(_file_sha256(audio_path), "music" if music else "speech")
+    segments = transcribe_long(
+        audio, lambda clip: model.transcribe(clip, **kwargs)[0], checkpoint, workers=CHUNK_WORKERS,
+        progress=progress,
+    )
+    transcript = format_segments(segments)
+    checkpoint.unlink(missing_ok=True)
+    return transcript
+
+
+def _reporting(segments, duration: float, progress):
+    for seg in segments:
+        progress(seg.end / duration if duration else 0.0)
+        yield seg
+
+
+def _transcribe_batch(audio_paths: list[Path], model, progress: list | None = None) -> list[str]:
+    """Transcribe several short 16 kHz WAVs in one batched pass per detected language.
+
+    `progress`, if given, holds a callback (or None) per path; each is told
+    1.0 once its language group is done.
+    """
+    import numpy as np  # noqa: PLC0415
+    from faster_whisper import BatchedInferencePipeline, decode_audio  # noqa: PLC0415
+
+    audios = [decode_audio(str(p), sampling_rate=SAMPLE_RATE) for p in audio_paths]
+    # The batched pipeline detects one language per call, so group by language first.
+    by_language: dict[str, list[int]] = {}
+    for i, audio in enumerate(audios):
+        language, _probability, _all = model.detect_language(audio)
+        by_language.setdefault(language, []).append(i)
+
+    pipeline = BatchedInferencePipeline(model=model)
+    gap = np.zeros(int(BATCH_GAP_SECONDS * SAMPLE_RATE), dtype=np.float32)
+    transcripts = [""] * len(audios)
+    for language, members in by_language.items():
+        durations = [len(audios[i]) / SAMPLE_RATE for i in members]
+        offsets, clips = batch_layout([speech_regions(audios[i]) for i in members], durations)
+        if clips:  # otherwise the whole group is silent
+            combined = np.concatenate([part for i in members for part in (audios[i], gap)])
+            segments, _info = pipeline.transcribe(
+                combined, language=language, clip_timestamps=clips, batch_size=BATCH_SIZE
+            )
+            for i, file_segments in zip(members, split_batch(segments, offsets, durations)):
+                transcripts[i] = format_segments(file_segments)
+        for i in members:
+            if progress and progress[i] is not None:
+                progress[i](1.0)
+    return transcripts
+
+
+def _wav_duration(path: Path) -> float:
+    with wave.open(str(path), "rb") as w:
+        return w.getnframes() / w.getframerate()
+
+
+@asynccontextmanager
+async def _whisper(priority: int):
+    """The loaded Whisper model, once the GPU scheduler admits a run at `priority`."""
+    global _last_used, _active_count
+
+    # The weights are reserved before the run's own slot is requested: a run
+    # holding a slot while waiting for the weights could starve their reservation.
+    async with _model_lock:
+        model = await _model_on_gpu(priority)
+        _active_count += 1
+    try:
+        async with _gpu.slot(WHISPER_RUN_VRAM_MB, priority):
+            yield model
+    finally:
+        async with _model_lock:
+            _active_count -= 1
+            _last_used = asyncio.get_running_loop().time()
+
+
+async def _run_batch(items: list[tuple[Path, int, object]]) -> list[str]:
+    """Coalescer callback for (path, priority, progress) items.
+
+    A flush that caught a single request runs it as before, through
+    _run_transcription; only real bursts take the batched pass.
+    """
+    loop = asyncio.get_running_loop()
+    async with _whisper(min(priority for _, priority, _ in items)) as model:
+        if len(items) == 1:
+            path, _priority, progress = items[0]
+            return [await loop.run_in_executor(
+                None, _run_transcription, path, model, False, progress
+            )]
+        return await loop.run_in_executor(
+            None, _transcribe_batch,
+            [path for path, _, _ in items], model, [progress for _, _, progress in items],
+        )
+
+
+async def _transcribe_with_model(
+    audio_path: Path, music: bool, progress=None, priority: int = INTERACTIVE
+) -> str:
+    """Transcribe a 16 kHz WAV: a cached transcript of the same audio is returned
+    as is, short speech is coalesced with concurrent requests, anything else runs
+    _run_transcription on its own."""
+    loop = asyncio.get_running_loop()
+    digest = await loop.run_in_executor(None, _file_sha256, audio_path)
+    key = cache_key(digest, WHISPER_MODEL, music=music)
+    transcript = _transcripts.get(key)
+    if transcript is not None:
+        log.info("Transcript cache hit for %s", digest[:12])
+        return transcript
+
+    if not music and _wav_duration(audio_path) <= BATCH_MAX_SECONDS:
+        transcript = await _coalescer.submit((audio_path, priority, progress))
+    else:
+        async with _whisper(priority) as model:
+            transcript = await loop.run_in_executor(
+                None, _run_transcription, audio_path, model, music, progress
+            )
+    _transcripts.put(key, transcript)
+    return transcript
+
+
+async def _denoise(
+    audio_path: Path, output_path: Path | None = None, priority: int = INTERACTIVE
+) -> Path:
+    async with _gpu.slot(DENOISE_VRAM_MB, priority):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, denoise_audio, audio_path, output_path)
+
+
+def _check_suffix(filename: str | None) -> str:
+    suffix = Path(filename or "upload").suffix.lower()
+    if suffix not in _MEDIA_EXTENSIONS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported file type '{suffix}'. Accepted: {sorted(_MEDIA_EXTENSIONS)}",
+        )
+    return suffix
+
+
+async def _save_upload(file: UploadFile, suffix: str) -> Path:
+    """Stream the upload to a temp file, refusing anything over MAX_UPLOAD_BYTES."""
+    fd, name = tempfile.mkstemp(suffix=suffix)
+    path = Path(name)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(_UPLOAD_CHUNK):
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise _too_large()
+                out.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path
+
+
+def _extract_audio(src: Path, sample_rate: int, dest: Path | None = None) -> Path:
+    """Write the first audio stream of `src` as a mono 16-bit WAV at `sample_rate`."""
+    if dest is None:
+        fd, name = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+    else:
+        name = str(dest)
+    try:
+        subprocess.run(
+            ["ffmpeg", "-y", "-v", "error", "-i", str(src), "-map", "0:a:0", "-vn",
+             "-ac", "1", "-ar", str(sample_rate), "-c:a", "pcm_s16le", name],
+            check=True, capture_output=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        Path(name).unlink(missing_ok=True)
+        detail = exc.stderr.decode("utf-8", errors="replace").strip()[-300:]
+        raise ValueError(f"could not extract an audio track: {detail}") from exc
+    return Path(name)
+
+
+async def _upload_to_wav(file: UploadFile, sample_rate: int, dest: Path | None = None) -> Path:
+    """Save the upload and reduce it to a mono WAV; only the WAV is left on disk."""
+    upload_path = await _save_upload(file, _check_suffix(file.filename))
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _extract_audio, upload_path, sample_rate, dest)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    finally:
+        upload_path.unlink(missing_ok=True)
 
 
 def _wrap_markdown(transcript: str, filename: str, generated_at: str) -> str:
@@ -121,34 +529,14 @@ def _wrap_markdown(transcript: str, filename: str, generated_at: str) -> str:
 
 @app.post("/transcribe")
 async def transcribe(file: UploadFile, music: bool = Form(False)):
-    global _last_used, _active_count
-
-    suffix = Path(file.filename or "upload").suffix.lower()
-    if suffix not in _MEDIA_EXTENSIONS:
-        raise HTTPException(
-            status_code=415,
-            detail=f"Unsupported file type '{suffix}'. Accepted: {sorted(_MEDIA_EXTENSIONS)}",
-        )
-
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        tmp_path = Path(tmp.name)
-        tmp.write(await file.read())
-
-    async with _model_lock:
-        model = _load_model()
-        _active_count += 1
+    tmp_path = await _upload_to_wav(file, SAMPLE_RATE)
 
     try:
-        loop = asyncio.get_running_loop()
-        transcript = await loop.run_in_executor(None, _run_transcription, tmp_path, model, music)
+        transcript = await _transcribe_with_model(tmp_path, music)
     except Exception as exc:
-        tmp_path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Transcription failed: {exc}") from exc
     finally:
         tmp_path.unlink(missing_ok=True)
-        async with _model_lock:
-            _active_count -= 1
-            _last_used = asyncio.get_running_loop().time()
 
     generated_at = datetime.datetime.now().isoformat(timespec="seconds")
     markdown = _wrap_markdown(transcript, file.filename or "upload", generated_at)
@@ -158,20 +546,10 @@ async def transcribe(file: UploadFile, music: bool = Form(False)):
 
 @app.post("/clean")
 async def clean(file: UploadFile):
-    suffix = Path(file.filename or "upload").suffix.lower()
-    if suffix not in _MEDIA_EXTENSIONS:
-        raise HTTPException(
-            status_code=415,
-            detail=f"Unsupported file type '{suffix}'. Accepted: {sorted(_MEDIA_EXTENSIONS)}",
-        )
-
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-        tmp_path = Path(tmp.name)
-        tmp.write(await file.read())
+    tmp_path = await _upload_to_wav(file, DENOISE_SAMPLE_RATE)
 
     try:
-        loop = asyncio.get_running_loop()
-        cleaned_path = await loop.run_in_executor(None, denoise_audio, tmp_path)
+        cleaned_path = await _denoise(tmp_path)
     except Exception as exc:
         tmp_path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Denoising failed: {exc}") from exc
@@ -189,6 +567,141 @@ async def clean(file: UploadFile):
     )
 
 
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+async def _job_worker():
+    while True:
+        _job_wakeup.clear()
+        job = _jobs.claim_next()
+        if job is None:
+            await _job_wakeup.wait()
+            continue
+        log.info("Job %s: %s %s", job["id"], job["kind"], job["filename"])
+        try:
+            await _run_job(job)
+        except Exception as exc:
+            log.exception("Job %s failed", job["id"])
+            _jobs.fail(job["id"], str(exc))
+        _jobs.prune()
+
+
+async def _run_job(job: dict) -> None:
+    job_dir = _jobs.job_dir(job["id"])
+    audio_path = job_dir / "input.wav"
+    if job["kind"] == "clean":
+        result = job_dir / "result.mp3"
+        await _denoise(audio_path, result, job["priority"])
+    else:
+        transcript = await _transcribe_with_model(
+            audio_path, job["options"].get("music", False),
+            lambda fraction: _jobs.set_progress(job["id"], fraction),
+            job["priority"],
+        )
+        generated_at = datetime.datetime.now().isoformat(timespec="seconds")
+        result = job_dir / "result.md"
+        result.write_text(_wrap_markdown(transcript, job["filename"], generated_at), encoding="utf-8")
+    _jobs.finish(job["id"], result.name)
+    audio_path.unlink(missing_ok=True)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile,
+    task: str = Form("transcribe"),
+    music: bool = Form(False),
+    priority: str = Form("batch"),
+):
+    if task not in KINDS:
+        raise HTTPException(status_code=422, detail=f"Unknown task '{task}'. Accepted: {list(KINDS)}")
+    if priority not in PRIORITIES:
+        raise HTTPException(
+            status_code=422, detail=f"Unknown priority '{priority}'. Accepted: {list(PRIORITIES)}"
+        )
+    job_id = _jobs.new_id()
+    sample_rate = DENOISE_SAMPLE_RATE if task == "clean" else SAMPLE_RATE
+    try:
+        await _upload_to_wav(file, sample_rate, _jobs.job_dir(job_id) / "input.wav")
+    except BaseException:
+        shutil.rmtree(_jobs.job_dir(job_id), ignore_errors=True)
+        raise
+    _jobs.add(job_id, task, file.filename or "upload", {"music": music}, PRIORITIES[priority])
+    _job_wakeup.set()
+    return {"job_id": job_id, "state": "queued"}
+
+
+def _get_job(job_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No such job: {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = _get_job(job_id)
+    return {
+        "job_id": job["id"],
+        "task": job["kind"],
+        "priority": {v: k for k, v in PRIORITIES.items()}.get(job["priority"], job["priority"]),
+        "filename": job["filename"],
+        "state": job["state"],
+        "progress": job["progress"],
+        "queue_position": _jobs.position(job_id),
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = _get_job(job_id)
+    if job["state"] != "done":
+        detail = f"Job is {job['state']}" + (f": {job['error']}" if job["error"] else "")
+        raise HTTPException(status_code=409, detail=detail)
+    result = _jobs.job_dir(job_id) / job["result"]
+    if job["kind"] == "clean":
+        return FileResponse(
+            result,
+            media_type="audio/mpeg",
+            filename=f"{Path(job['filename']).stem}_denoised.mp3",
+        )
+    return JSONResponse({
+        "transcript": result.read_text(encoding="utf-8"),
+        "filename": job["filename"],
+    })
+
+
+@app.post("/warmup")
+async def warmup():
+    """Bring the model onto the GPU ahead of a request; cheap if it is already there."""
+    global _last_used
+    loop = asyncio.get_running_loop()
+    started = time.monotonic()
+    tier_before = _model_tier()
+    if tier_before != "gpu":
+        async with _model_lock:
+            await _model_on_gpu(INTERACTIVE)
+    _last_used = loop.time()
+    return {
+        "model_tier": _model_tier(),
+        "was": tier_before,
+        "took_s": round(time.monotonic() - started, 2),
+    }
+
+
 @app.get("/health")
 def health():
-    return {"status": "ok", "model_loaded": _model is not None}
+    return {
+        "status": "ok",
+        "model_loaded": _model_tier() == "gpu",
+        "model_tier": _model_tier(),
+        "residency": _residency,
+        "jobs": _jobs.counts(),
+        "gpu": _gpu.stats(),
+        "coalescing": _coalescer.stats(),
+        "transcript_cache": _transcripts.stats(),
+    }
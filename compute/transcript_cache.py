@@ -0,0 +1,114 @@
+"""Content-addressed cache of finished transcripts for the transcription API.
+
+The same recording is often sent more than once: re-uploaded to Slack, or
+transcribed and later sent again with /clean transcribe. A transcript depends
+only on the audio, the model and the transcription options, so the API keys
+results by the SHA-256 of the extracted 16 kHz WAV plus the model name and the
+options (`cache_key`), and a repeat submission is answered without touching
+the GPU. Denoised audio hashes differently from the original, so "cleaned or
+not" is part of the key through the content itself.
+
+Entries live in one SQLite file under TRANSCRIPT_CACHE_DIR (put it on Forge's
+scratch SSD). When the stored text exceeds TRANSCRIPT_CACHE_MB, the least
+recently used entries are evicted. Hit and miss counts are kept for /health.
+
+Stdlib only, like job_queue.py, so transcribe_api can import it on Forge.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+TRANSCRIPT_CACHE_DIR = Path(
+    os.environ.get("WHISPER_TRANSCRIPT_CACHE_DIR")
+    or Path(os.environ.get("HARMONY_CACHE_DIR", Path.home() / ".cache" / "harmony")) / "transcripts"
+)
+TRANSCRIPT_CACHE_MB = int(os.environ.get("WHISPER_TRANSCRIPT_CACHE_MB", "512"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    key       TEXT PRIMARY KEY,
+    text      TEXT NOT NULL,
+    size      INTEGER NOT NULL,
+    last_used INTEGER NOT NULL  -- use counter, higher is more recent
+);
+CREATE INDEX IF NOT EXISTS transcripts_lru ON transcripts (last_used);
+"""
+
+
+def cache_key(audio_sha256: str, model: str, **options) -> str:
+    """Key for the transcript of audio `audio_sha256` made by `model` with `options`."""
+    material = json.dumps([audio_sha256, model, options], sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class TranscriptCache:
+    """Thread-safe, like JobStore; the API uses it from the event loop."""
+
+    def __init__(self, root: Path = TRANSCRIPT_CACHE_DIR, max_bytes: int = TRANSCRIPT_CACHE_MB << 20):
+        root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(root / "transcripts.sqlite3", check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._clock = self.conn.execute(
+            "SELECT COALESCE(MAX(last_used), 0) FROM transcripts"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, key: str) -> str | None:
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT text FROM transcripts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._clock += 1
+            self.conn.execute("UPDATE transcripts SET last_used = ? WHERE key = ?", (self._clock, key))
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock, self.conn:
+            self._clock += 1
+            self.conn.execute(
+                "INSERT OR REPLACE INTO transcripts (key, text, size, last_used) VALUES (?, ?, ?, ?)",
+                (key, text, size, self._clock),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM transcripts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM transcripts ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM transcripts WHERE key = ?", victims)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM transcripts"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -1,51 +1,48 @@
 """Script 3 — Weekly review.
 
 Default mode: generate a review for the current/most recent week.
-Backfill mode: generate reviews for every ISO week since --start.
+Backfill mode: generate reviews for every ISO week since --start, up to
+--workers weeks at a time behind the shared API rate limiter.
 
 Usage:
     python compute/weekly_review.py                        # current week
     python compute/weekly_review.py --backfill --start 2025-07-09
+    python compute/weekly_review.py --backfill --start 2025-07-09 --workers 8
     python compute/weekly_review.py --dir /path --out /path
 """
 
 import argparse
 import json
-import time
 from collections import defaultdict
 from datetime import date
 from pathlib import Path
 
 import anthropic
 
+from atomic_io import atomic_write_text
+from extract_index import load_extracts
 from llm_common import (
     DAILY_INPUTS,
     MODEL,
-    extract_json_section,
+    create_message,
     get_client,
     load_recurring_tasks,
+    run_jobs,
 )
+from review_stats import stats_block
 
 WEEKLY_OUT = Path(
     "/home/aharon/Documents/vault-alpha/3_Nutrients/weekly_reviews"
 )
 MIN_DAYS = 3
-DELAY_SECONDS = 0.5
+BACKFILL_WORKERS = 4
 
 
 def load_all_extracts(
     daily_dir: Path,
     start: str | None = None,
 ) -> list[tuple[str, dict]]:
-    results = []
-    for path in sorted(daily_dir.glob("????-??-??.md")):
-        if start and path.stem < start:
-            continue
-        text = path.read_text(encoding="utf-8")
-        extract = extract_json_section(text)
-        if extract is not None:
-            results.append((path.stem, extract))
-    return results
+    return load_extracts(daily_dir, start=start)
 
 
 def group_by_iso_week(
@@ -63,6 +60,8 @@ def group_by_iso_week(
 def build_weekly_prompt(extracts: list[tuple[str, dict]], recurring_tasks: str | None = None) -> str:
     parts = []
     for date_str, data in extracts:
+        # The routine checklist is fully covered by the computed statistics.
+        data = {k: v for k, v in data.items() if k != "morning_routine_completed"}
         parts.append(
             "--- " + date_str + " ---\n"
             + json.dumps(data, indent=2, ensure_ascii=False)
@@ -101,6 +100,7 @@ def build_weekly_prompt(extracts: list[tuple[str, dict]], recurring_tasks: str |
         "The single most generative question to carry into next week.\n\n"
         "Be honest about both the generative and the hard. Do not smooth over struggle. "
         "Pull specific phrases from the data rather than writing generic summaries.\n\n"
+        + stats_block(extracts)
         + recurring_block
         + "DAILY EXTRACTS:\n\n"
         + extracts_block
@@ -113,9 +113,10 @@ def generate_weekly(
     out_dir: Path,
     client: anthropic.Anthropic,
     recurring_tasks: str | None = None,
+    force: bool = False,
 ) -> None:
     out_path = out_dir / f"{label}.md"
-    if out_path.exists():
+    if out_path.exists() and not force:
         print(f"  skip  {label} (already exists)")
         return
 
@@ -123,7 +124,8 @@ def generate_weekly(
     print(f"  gen   {label}  ({dates[0]} to {dates[-1]}, {len(extracts)} days)")
 
     prompt = build_weekly_prompt(extracts, recurring_tasks)
-    response = client.messages.create(
+    response = create_message(
+        client,
         model=MODEL,
         max_tokens=4096,
         messages=[{"role": "user", "content": prompt}],
@@ -136,7 +138,7 @@ def generate_weekly(
         f"Generated: {date.today().isoformat()}\n\n"
     )
     out_dir.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(header + review_text, encoding="utf-8")
+    atomic_write_text(out_path, header + review_text)
 
 
 def main() -> None:
@@ -151,6 +153,8 @@ def main() -> None:
                         help="Earliest date to include in backfill (YYYY-MM-DD)")
     parser.add_argument("--min-days", type=int, default=MIN_DAYS,
                         help="Minimum extracted days required to generate a review")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS,
+                        help=f"Weeks generated concurrently in backfill mode (default {BACKFILL_WORKERS})")
     args = parser.parse_args()
 
     client = get_client()
@@ -163,10 +167,14 @@ def main() -> None:
         eligible = {k: v for k, v in weeks.items() if len(v) >= args.min_days}
         print(f"Found {len(weeks)} weeks, {len(eligible)} with >= {args.min_days} days")
 
-        for i, (label, extracts) in enumerate(eligible.items()):
-            generate_weekly(label, sorted(extracts), args.out, client, recurring_tasks)
-            if i < len(eligible) - 1:
-                time.sleep(DELAY_SECONDS)
+        jobs = [
+            (label, lambda label=label, extracts=extracts: generate_weekly(
+                label, sorted(extracts), args.out, client, recurring_tasks))
+            for label, extracts in eligible.items()
+        ]
+        failed = run_jobs(jobs, args.workers)
+        if failed:
+            print(f"{failed} weekly reviews failed")
     else:
         # Default: most recent week
         all_extracts = load_all_extracts(args.dir)
@@ -24,6 +24,8 @@ import io
 import os
 import re
 import sys
+import threading
+import time
 from pathlib import Path
 
 import requests
@@ -41,6 +43,11 @@ _MEDIA_EXTENSIONS = {".mp4", ".mov", ".mp3", ".m4a", ".wav", ".ogg", ".webm"}
 
 _HELP_TEXT = "Available commands: /transcribe, /clean, /clean transcribe"
 
+# Forge runs work as queued jobs; the bot submits, then polls until done.
+_POLL_INTERVAL = 5
+_JOB_TIMEOUT = 6 * 60 * 60
+_REQUEST_TIMEOUT = 30
+
 app = App(token=_BOT_TOKEN)
 
 
@@ -54,24 +61,65 @@ def _download_slack_file(url: str) -> bytes:
     return resp.content
 
 
-def _transcribe_on_forge(data: bytes, filename: str) -> str:
+def _warm_forge() -> None:
+    """Ask Forge to load Whisper now, in the background, so it overlaps the download.
+
+    Best effort: if the warmup fails, the job loads the model itself.
+    """
+    def warm():
+        try:
+            requests.post(f"{_FORGE_URL}/warmup", timeout=_REQUEST_TIMEOUT)
+        except requests.RequestException:
+            pass
+
+    threading.Thread(target=warm, daemon=True).start()
+
+
+def _run_forge_job(data: bytes, filename: str, task: str) -> requests.Response:
+    """Submit a job to Forge, wait for it, and return the result response.
+
+    A network blip or server error while polling (e.g. a 502 while Forge
+    restarts and re-queues the job) only costs one poll: the job keeps
+    running on Forge and the next poll picks it up. Only a 404 (the job is
+    gone) is fatal.
+    """
     resp = requests.post(
-        f"{_FORGE_URL}/transcribe",
+        f"{_FORGE_URL}/jobs",
         files={"file": (filename, io.BytesIO(data))},
-        timeout=600,  # transcription can take a while
+        data={"task": task, "priority": "interactive"},
+        timeout=300,  # upload time only
     )
     resp.raise_for_status()
-    return resp.json()["transcript"]
+    job_id = resp.json()["job_id"]
+
+    deadline = time.monotonic() + _JOB_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(_POLL_INTERVAL)
+        try:
+            status = requests.get(f"{_FORGE_URL}/jobs/{job_id}", timeout=_REQUEST_TIMEOUT)
+            status.raise_for_status()
+        except requests.HTTPError:
+            if status.status_code == 404:
+                raise
+            continue
+        except requests.RequestException:
+            continue
+        job = status.json()
+        if job["state"] == "failed":
+            raise RuntimeError(job.get("error") or "job failed on Forge")
+        if job["state"] == "done":
+            result = requests.get(f"{_FORGE_URL}/jobs/{job_id}/result", timeout=300)
+            result.raise_for_status()
+            return result
+    raise TimeoutError(f"Forge job {job_id} did not finish within {_JOB_TIMEOUT // 3600} hours")
+
+
+def _transcribe_on_forge(data: bytes, filename: str) -> str:
+    return _run_forge_job(data, filename, "transcribe").json()["transcript"]
 
 
 def _clean_on_forge(data: bytes, filename: str) -> bytes:
-    resp = requests.post(
-        f"{_FORGE_URL}/clean",
-        files={"file": (filename, io.BytesIO(data))},
-        timeout=600,
-    )
-    resp.raise_for_status()
-    return resp.content
+    return _run_forge_job(data, filename, "clean").content
 
 
 def _parse_command(text: str) -> tuple[bool, bool] | None:
@@ -189,6 +237,8 @@ def handle_message(event, client, say):
         return
 
     do_clean, do_transcribe = command
+    if do_transcribe:
+        _warm_forge()
     for file_obj in media_files:
         _process_file(file_obj, do_clean, do_transcribe, channel_id, thread_ts, client, say)
 
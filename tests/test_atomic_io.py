@@ -0,0 +1,47 @@
+"""Tests for compute/atomic_io.py."""
+
+import os
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from atomic_io import atomic_write_text
+
+
+def test_write_creates_and_replaces(tmp_path):
+    path = tmp_path / "2026-05-28.md"
+    atomic_write_text(path, "first\n")
+    atomic_write_text(path, "second ✅\n")
+    assert path.read_text(encoding="utf-8") == "second ✅\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["2026-05-28.md"]
+
+
+def test_failed_write_leaves_original_intact(tmp_path):
+    path = tmp_path / "2026-05-28.md"
+    path.write_text("original\n", encoding="utf-8")
+    with patch("atomic_io.os.replace", side_effect=OSError("disk full")):
+        with pytest.raises(OSError, match="disk full"):
+            atomic_write_text(path, "half-written")
+    assert path.read_text(encoding="utf-8") == "original\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["2026-05-28.md"]
+
+
+def test_preserves_existing_permissions(tmp_path):
+    path = tmp_path / "note.md"
+    path.write_text("x", encoding="utf-8")
+    path.chmod(0o640)
+    atomic_write_text(path, "y")
+    assert path.stat().st_mode & 0o777 == 0o640
+
+
+def test_new_file_follows_umask_without_touching_it(tmp_path):
+    path = tmp_path / "new.md"
+    umask = os.umask(0)
+    os.umask(umask)
+    # Setting the umask per write would race file creation on other threads.
+    with patch("atomic_io.os.umask", side_effect=AssertionError("umask changed")):
+        atomic_write_text(path, "x")
+    assert path.stat().st_mode & 0o777 == 0o666 & ~umask
@@ -0,0 +1,91 @@
+"""Tests for compute/chunking.py — VAD is stubbed, no faster-whisper required."""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+import chunking
+from chunking import SAMPLE_RATE, fmt_ts, plan_chunks, transcribe_long
+
+
+def test_fmt_ts_under_an_hour_is_unchanged():
+    assert fmt_ts(0.0) == "00:00.0"
+    assert fmt_ts(83.4) == "01:23.4"
+    assert fmt_ts(3599.9) == "59:59.9"
+
+
+def test_fmt_ts_hours_and_rounding():
+    assert fmt_ts(3599.96) == "1:00:00.0"
+    assert fmt_ts(3723.0) == "1:02:03.0"
+    assert fmt_ts(36000.0) == "10:00:00.0"
+
+
+def test_plan_cuts_in_silence_and_covers_everything():
+    speech = [(0.0, 250.0), (260.0, 590.0), (600.0, 900.0), (950.0, 1400.0)]
+    chunks = plan_chunks(speech, 1500.0, chunk_seconds=600.0)
+    assert chunks[0] == (0.0, 595.0)          # midpoint of the 590-600 silence
+    assert chunks[1] == (595.0, 925.0)        # last silence within 600 s of 595
+    assert chunks[-1][1] == 1500.0
+    assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+    assert all(e - s <= 600.0 for s, e in chunks)
+
+
+def test_plan_hard_cuts_unbroken_speech():
+    assert plan_chunks([(0.0, 1300.0)], 1300.0, chunk_seconds=600.0) == [
+        (0.0, 600.0), (600.0, 1200.0), (1200.0, 1300.0),
+    ]
+
+
+def _fake_transcribe(calls):
+    def transcribe(clip):
+        calls.append(len(clip))
+        seconds = len(clip) / SAMPLE_RATE
+        return iter([SimpleNamespace(start=1.0, end=seconds - 1.0, text=f" {len(calls)} ")])
+    return transcribe
+
+
+def test_transcribe_long_offsets_timestamps_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(chunking, "speech_regions", lambda audio: [(0.0, 90.0), (110.0, 250.0)])
+    audio = [0.0] * (250 * SAMPLE_RATE)
+    checkpoint = tmp_path / "ck.jsonl"
+
+    calls = []
+    segments = transcribe_long(audio, _fake_transcribe(calls), checkpoint, chunk_seconds=120.0)
+    assert [(s.start, s.end) for s in segments] == [(1.0, 99.0), (101.0, 219.0), (221.0, 249.0)]
+    assert len(calls) == 3
+
+    # Simulate a crash after the first chunk: keep the plan and one result.
+    lines = checkpoint.read_text().splitlines()
+    first_done = next(line for line in lines[1:] if json.loads(line)["index"] == 0)
+    checkpoint.write_text(lines[0] + "\n" + first_done + "\n" + '{"index": 1, "segm')
+
+    monkeypatch.setattr(chunking, "speech_regions", lambda audio: pytest.fail("VAD rerun"))
+    resumed_calls = []
+    resumed = transcribe_long(audio, _fake_transcribe(resumed_calls), checkpoint, chunk_seconds=120.0)
+    assert len(resumed_calls) == 2
+    assert [(s.start, s.end) for s in resumed] == [(s.start, s.end) for s in segments]
+    assert len(checkpoint.read_text().splitlines()) == 4  # plan + three clean chunk lines
+
+
+def test_batch_layout_and_split_keep_recordings_apart():
+    from chunking import batch_layout, split_batch
+
+    durations = [10.0, 45.0]
+    offsets, clips = batch_layout([[(1.0, 9.0)], [(0.0, 20.0), (25.0, 44.0)]], durations, gap=1.0)
+    assert offsets == [0.0, 11.0]
+    assert all(c["end"] - c["start"] <= 30.0 for c in clips)
+    # No clip crosses from the first recording into the second.
+    assert all(c["end"] <= 10.0 or c["start"] >= 11.0 for c in clips)
+
+    combined = [
+        SimpleNamespace(start=1.0, end=9.0, text="first"),
+        SimpleNamespace(start=11.5, end=30.0, text="second a"),
+        SimpleNamespace(start=36.0, end=55.0, text="second b"),
+    ]
+    first, second = split_batch(combined, offsets, durations)
+    assert [(s.start, s.end, s.text) for s in first] == [(1.0, 9.0, "first")]
+    assert [(s.start, s.end) for s in second] == [(0.5, 19.0), (25.0, 44.0)]
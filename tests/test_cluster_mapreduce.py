@@ -0,0 +1,61 @@
+"""Tests for compute/cluster_mapreduce.py — the API is mocked, no key required."""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+import cluster_mapreduce
+from cluster_mapreduce import cluster_by_month
+from recurring_tasks import _CLUSTER_TOOL, build_prompt
+
+
+def _days(months: list[str]) -> list[tuple[str, list[str]]]:
+    return [(f"{m}-{d:02d}", [f"call mom ({m})"]) for m in months for d in (3, 17)]
+
+
+def _fake_create(client, **kwargs):
+    """Map calls return one cluster per month; merge calls return one cluster in total."""
+    prompt = kwargs["messages"][0]["content"]
+    if prompt.startswith("Below are clusters"):
+        periods = [json.loads(p) for p in prompt.split("CLUSTERS BY PERIOD:\n\n")[1].split("\n\n")]
+        merged = [{"canonical_name": "Call mom",
+                   "occurrences": sum(c["occurrences"] for p in periods for c in p)}]
+    else:
+        merged = [{"canonical_name": "Call mom", "occurrences": prompt.count(": call mom")}]
+    return SimpleNamespace(content=[SimpleNamespace(
+        type="tool_use", input={"recurring_tasks": merged})])
+
+
+def _run(items, tmp_path, **kwargs):
+    with patch.object(cluster_mapreduce, "create_message", side_effect=_fake_create) as mock:
+        clusters = cluster_by_month(
+            items, None, _CLUSTER_TOOL, "recurring_tasks",
+            lambda days: build_prompt(days, keep_single=True),
+            noun="tasks/intentions", note_field="status_note",
+            cache_dir=tmp_path, **kwargs,
+        )
+    return clusters, mock
+
+
+def test_months_are_mapped_then_merged(tmp_path):
+    clusters, mock = _run(_days(["2025-07", "2025-08", "2025-09"]), tmp_path)
+    assert mock.call_count == 4  # three months + one merge
+    assert clusters == [{"canonical_name": "Call mom", "occurrences": 6}]
+
+
+def test_new_month_costs_one_map_and_one_merge(tmp_path):
+    _run(_days(["2025-07", "2025-08"]), tmp_path)
+    clusters, mock = _run(_days(["2025-07", "2025-08", "2025-09"]), tmp_path)
+    assert mock.call_count == 2
+    assert clusters[0]["occurrences"] == 6
+
+
+def test_large_inputs_merge_hierarchically(tmp_path):
+    months = [f"2025-{m:02d}" for m in range(1, 9)]
+    clusters, mock = _run(_days(months), tmp_path, merge_input_tokens=1)
+    # 8 maps, then 4 pair merges, 2 merges of those, and the final merge.
+    assert mock.call_count == 8 + 4 + 2 + 1
+    assert clusters[0]["occurrences"] == 16
@@ -0,0 +1,58 @@
+"""Tests for compute/coalesce.py."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from coalesce import Coalescer
+
+
+def test_concurrent_submissions_share_one_batch():
+    async def scenario():
+        calls = []
+
+        async def run_batch(items):
+            calls.append(list(items))
+            return [item.upper() for item in items]
+
+        c = Coalescer(run_batch, window=0.01, max_items=8)
+        results = await asyncio.gather(*(c.submit(x) for x in ["a", "b", "c"]))
+        assert results == ["A", "B", "C"]
+        assert calls == [["a", "b", "c"]]
+
+        assert await c.submit("d") == "D"  # a lone request still completes
+        assert calls[-1] == ["d"]
+        assert c.stats()["batches"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_full_batch_flushes_without_waiting():
+    async def scenario():
+        calls = []
+
+        async def run_batch(items):
+            calls.append(len(items))
+            return items
+
+        c = Coalescer(run_batch, window=60, max_items=2)
+        assert await asyncio.wait_for(asyncio.gather(c.submit(1), c.submit(2)), 1) == [1, 2]
+        assert calls == [2]
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_is_retried_item_by_item():
+    async def scenario():
+        async def run_batch(items):
+            if "bad" in items:
+                raise ValueError("cannot decode")
+            return [f"ok {item}" for item in items]
+
+        c = Coalescer(run_batch, window=0.01)
+        good, bad = await asyncio.gather(c.submit("good"), c.submit("bad"), return_exceptions=True)
+        assert good == "ok good"
+        assert isinstance(bad, ValueError)
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+"""Tests for compute/embed_cluster.py — a fake embedder stands in for the model."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from embed_cluster import agglomerate, build_clusters, cluster_locally, embed_phrases
+
+# Phrases about the same thing get the same direction, plus a little noise.
+_TOPICS = {"adhd": [1, 0, 0], "mom": [0, 1, 0], "album": [0, 0, 1]}
+
+
+def _fake_embedder(calls: list):
+    def embed(phrases: list[str]) -> np.ndarray:
+        calls.append(list(phrases))
+        rows = []
+        for p in phrases:
+            topic = next(k for k in _TOPICS if k in p)
+            rows.append(np.array(_TOPICS[topic], dtype=float) + 0.05 * (len(p) % 3))
+        return np.array(rows)
+    return embed
+
+
+ITEMS = [
+    ("2025-07-01", ["Get ADHD meds sorted", "call mom"]),
+    ("2025-07-09", ["follow up on adhd prescription"]),
+    ("2025-08-02", ["ADHD psychiatrist appointment", "finish album mix"]),
+    ("2025-08-02", ["Call Mom"]),
+]
+
+
+def test_agglomerate_groups_by_threshold():
+    v = np.array([[1, 0], [0.99, 0.14], [0, 1]], dtype=np.float32)
+    v /= np.linalg.norm(v, axis=1, keepdims=True)
+    assert sorted(agglomerate(v, 0.9)) == [[0, 1], [2]]
+    assert agglomerate(v, -1.0) == [[0, 1, 2]]
+
+
+def test_vectors_are_cached_by_phrase(tmp_path):
+    calls: list = []
+    db = tmp_path / "emb.sqlite3"
+    first = embed_phrases(["call mom", "adhd"], _fake_embedder(calls), db)
+    again = embed_phrases(["adhd", "call mom", "mom again"], _fake_embedder(calls), db)
+    assert calls == [["adhd", "call mom"], ["mom again"]]
+    np.testing.assert_allclose(again[0], first[1])
+    assert np.allclose(np.linalg.norm(again, axis=1), 1.0)
+
+
+def test_counts_and_dates_are_exact(tmp_path):
+    clusters = build_clusters(ITEMS, 0.8, _fake_embedder([]), tmp_path / "emb.sqlite3")
+    by_size = {c["occurrences"]: c for c in clusters}
+    adhd = by_size[3]
+    assert (adhd["first_seen"], adhd["last_seen"]) == ("2025-07-01", "2025-08-02")
+    assert len(adhd["sample_phrasings"]) == 3
+    mom = next(c for c in clusters if "mom" in c["canonical_name"].lower())
+    assert mom["occurrences"] == 2  # "call mom" and "Call Mom" are one phrase, two days
+
+
+def test_cluster_locally_without_client_matches_render_shape(tmp_path):
+    from recurring_tasks import _CLUSTER_TOOL, render_markdown
+
+    clusters = cluster_locally(
+        ITEMS, None, _CLUSTER_TOOL, "recurring_tasks", "tasks/intentions", "status_note",
+        threshold=0.8, embedder=_fake_embedder([]), db_path=tmp_path / "emb.sqlite3",
+    )
+    assert [c["occurrences"] for c in clusters] == [3, 2]
+    md = render_markdown("2025-07-01 to 2025-08-02", clusters, 2)
+    assert "**Occurrences:** 3" in md
+
+
+@pytest.fixture(autouse=True)
+def _no_real_model(monkeypatch):
+    monkeypatch.setattr("embed_cluster._default_embedder", None)
@@ -0,0 +1,76 @@
+"""Tests for compute/export_extracts.py."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+import extract_index
+from export_extracts import energy_by_practice, export, flatten, load_table
+from llm_common import EXTRACT_MARKER
+
+
+def _write_day(daily_dir: Path, date_str: str, **extract) -> None:
+    (daily_dir / f"{date_str}.md").write_text(
+        f"# {date_str}\n\n{EXTRACT_MARKER}\n\n```json\n{json.dumps(extract)}\n```\n",
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture
+def daily(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract_index, "index_path", lambda d: tmp_path / "index.sqlite3")
+    path = tmp_path / "daily"
+    path.mkdir()
+    return path
+
+
+def test_flatten_parses_scalars_and_explodes_lists():
+    day, items = flatten("2025-07-01", {
+        "energy_level": "High",
+        "weed_use_context": "no — stayed clear after the walk",
+        "financial_anxiety": "7/10, rent is due",
+        "morning_routine_completed": ["meditation", "examen"],
+        "connection_quality": [{"person": "Marcus", "rating": 8}],
+    })
+    assert day["energy_score"] == 3.0
+    assert day["weed_used"] is False
+    assert day["financial_anxiety_rating"] == 7
+    assert day["n_morning_routine_completed"] == 2
+    assert day["n_tasks_and_intentions"] == 0
+    assert {"date": "2025-07-01", "field": "connection_quality", "position": 0,
+            "value": "Marcus", "rating": 8} in items
+
+
+def test_export_is_incremental_by_month(daily, tmp_path):
+    out = tmp_path / "parquet"
+    _write_day(daily, "2025-07-01", energy_level="high", morning_routine_completed=["meditation"])
+    _write_day(daily, "2025-07-02", energy_level="low", morning_routine_completed=[])
+    _write_day(daily, "2025-08-01", energy_level="high", morning_routine_completed=["Meditation "])
+    assert export(daily, out) == (2, 0)
+    assert export(daily, out) == (0, 0)
+
+    _write_day(daily, "2025-08-02", energy_level="medium")
+    assert export(daily, out) == (1, 0)
+    days = load_table("days", out)
+    assert days.num_rows == 4
+    assert load_table("days", out, month="2025-08").num_rows == 2
+
+    (daily / "2025-07-01.md").unlink()
+    (daily / "2025-07-02.md").unlink()
+    assert export(daily, out) == (0, 1)
+    assert sorted(load_table("days", out)["date"].to_pylist()) == ["2025-08-01", "2025-08-02"]
+
+
+def test_energy_by_practice(daily, tmp_path):
+    out = tmp_path / "parquet"
+    _write_day(daily, "2025-07-01", energy_level="high", morning_routine_completed=["meditation"])
+    _write_day(daily, "2025-07-02", energy_level="low", morning_routine_completed=[])
+    _write_day(daily, "2025-07-03", energy_level="medium", morning_routine_completed=["Meditation"])
+    export(daily, out)
+    [(practice, n, with_, without)] = energy_by_practice(out)
+    assert (practice, n) == ("meditation", 2)
+    assert with_ == pytest.approx(2.5)
+    assert without == pytest.approx(1.0)
@@ -0,0 +1,155 @@
+"""Tests for compute/extract_daily.py — the API is mocked, no key required."""
+
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+import extract_daily
+from extract_daily import already_extracted, extract_one, split_note
+from llm_common import EXTRACT_MARKER, extract_json_section
+
+
+def _response(extract: dict) -> SimpleNamespace:
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="tool_use", input=extract)],
+        usage=SimpleNamespace(
+            input_tokens=10, output_tokens=5,
+            cache_read_input_tokens=0, cache_creation_input_tokens=0,
+        ),
+    )
+
+
+@pytest.fixture
+def note(tmp_path):
+    path = tmp_path / "2026-05-28.md"
+    path.write_text("#dailynote\n# 2026-05-28\n\nWrote the bridge section.\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return tmp_path / ".extract_cache"
+
+
+def _extract(path, cache_dir, result, **kwargs):
+    with patch.object(extract_daily, "create_message", return_value=_response(result)) as mock:
+        extract_one(path, client=None, cache_dir=cache_dir, **kwargs)
+    return mock
+
+
+def test_extract_writes_section_and_cache(note, cache_dir):
+    mock = _extract(note, cache_dir, {"summary": "first"})
+    mock.assert_called_once()
+    text = note.read_text(encoding="utf-8")
+    assert extract_json_section(text) == {"summary": "first"}
+    assert already_extracted(note)
+    assert len(list(cache_dir.glob("*.json"))) == 1
+
+
+def test_unchanged_note_is_skipped(note, cache_dir):
+    _extract(note, cache_dir, {"summary": "first"})
+    mock = _extract(note, cache_dir, {"summary": "second"})
+    mock.assert_not_called()
+    assert extract_json_section(note.read_text(encoding="utf-8")) == {"summary": "first"}
+
+
+def test_edited_note_is_reextracted_in_place(note, cache_dir):
+    _extract(note, cache_dir, {"summary": "first"})
+    body, section = split_note(note.read_text(encoding="utf-8"))
+    note.write_text(body + "\n\nAdded an evening paragraph.\n" + section, encoding="utf-8")
+    assert not already_extracted(note)
+
+    mock = _extract(note, cache_dir, {"summary": "second"})
+    mock.assert_called_once()
+    text = note.read_text(encoding="utf-8")
+    assert text.count(EXTRACT_MARKER) == 1
+    assert "Added an evening paragraph." in text
+    assert extract_json_section(text) == {"summary": "second"}
+    # The stale extract must not be sent back to the model
+    sent = extract_daily.build_request(note)["messages"][0]["content"]
+    assert EXTRACT_MARKER not in sent
+
+
+def test_reverted_edit_is_filled_from_cache(note, cache_dir):
+    original = note.read_text(encoding="utf-8")
+    _extract(note, cache_dir, {"summary": "first"})
+    note.write_text(original + "\nTemporary edit.\n", encoding="utf-8")
+    _extract(note, cache_dir, {"summary": "second"})
+
+    note.write_text(original, encoding="utf-8")
+    mock = _extract(note, cache_dir, {"summary": "third"})
+    mock.assert_not_called()
+    assert extract_json_section(note.read_text(encoding="utf-8")) == {"summary": "first"}
+
+
+def test_legacy_unkeyed_extract_is_adopted(note, cache_dir):
+    note.write_text(
+        note.read_text(encoding="utf-8")
+        + "\n\n" + EXTRACT_MARKER + "\n\n```json\n{\"summary\": \"legacy\"}\n```\n",
+        encoding="utf-8",
+    )
+    mock = _extract(note, cache_dir, {"summary": "new"})
+    mock.assert_not_called()
+    assert already_extracted(note)
+    assert extract_json_section(note.read_text(encoding="utf-8")) == {"summary": "legacy"}
+
+
+def test_force_reextracts(note, cache_dir):
+    _extract(note, cache_dir, {"summary": "first"})
+    mock = _extract(note, cache_dir, {"summary": "second"}, force=True)
+    mock.assert_called_once()
+    assert extract_json_section(note.read_text(encoding="utf-8")) == {"summary": "second"}
+
+
+class _FakeBatches:
+    """messages.batches with every submitted batch already ended."""
+
+    def __init__(self):
+        self.submitted = {}
+
+    def create(self, requests):
+        batch_id = f"batch-{len(self.submitted)}"
+        self.submitted[batch_id] = [r["custom_id"] for r in requests]
+        return SimpleNamespace(id=batch_id)
+
+    def retrieve(self, batch_id):
+        counts = SimpleNamespace(processing=0, succeeded=1, errored=0, expired=0)
+        return SimpleNamespace(processing_status="ended", request_counts=counts)
+
+    def results(self, batch_id):
+        return [
+            SimpleNamespace(
+                custom_id=cid,
+                result=SimpleNamespace(type="succeeded", message=_response({"summary": batch_id})),
+            )
+            for cid in self.submitted[batch_id]
+        ]
+
+
+def test_resumed_batch_does_not_skip_this_runs_notes(tmp_path, cache_dir):
+    old, new = tmp_path / "2026-05-27.md", tmp_path / "2026-05-28.md"
+    for path in (old, new):
+        path.write_text(f"#dailynote\n# {path.stem}\n\nSomething.\n", encoding="utf-8")
+    batches = _FakeBatches()
+    batches.submitted["batch-old"] = ["note-00000"]
+    client = SimpleNamespace(messages=SimpleNamespace(batches=batches))
+    state_path = tmp_path / "state.json"
+    state_path.write_text(json.dumps({
+        "batch_id": "batch-old",
+        "notes": {"note-00000": [str(old.resolve()), extract_daily.extract_key("x")]},
+    }), encoding="utf-8")
+
+    assert extract_daily.run_batch([old, new], client, state_path, cache_dir) == 0
+    assert extract_json_section(old.read_text(encoding="utf-8")) == {"summary": "batch-old"}
+    assert extract_json_section(new.read_text(encoding="utf-8")) == {"summary": "batch-1"}
+    assert list(batches.submitted) == ["batch-old", "batch-1"]
+    assert not state_path.exists()
+
+
+def test_batch_state_is_per_selection(tmp_path):
+    assert extract_daily.batch_state_path(tmp_path / "a") != extract_daily.batch_state_path(tmp_path / "b")
@@ -0,0 +1,87 @@
+"""Tests for compute/extract_index.py — no API access required."""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+import extract_index
+from extract_index import load_extracts
+from llm_common import EXTRACT_MARKER
+
+
+def _write_note(daily_dir: Path, date_str: str, extract: dict | None) -> Path:
+    text = f"#dailynote\n# {date_str}\n\nSome journal text.\n"
+    if extract is not None:
+        text += (
+            "\n\n" + EXTRACT_MARKER + "\n\n```json\n"
+            + json.dumps(extract, indent=2) + "\n```\n"
+        )
+    path = daily_dir / f"{date_str}.md"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def daily_dir(tmp_path):
+    d = tmp_path / "daily_inputs"
+    d.mkdir()
+    return d
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "index.sqlite3"
+
+
+def test_load_skips_unextracted_notes(daily_dir, db_path):
+    _write_note(daily_dir, "2026-05-01", {"summary": "one"})
+    _write_note(daily_dir, "2026-05-02", None)
+    _write_note(daily_dir, "2026-05-03", {"summary": "three"})
+    result = load_extracts(daily_dir, db_path=db_path)
+    assert [d for d, _ in result] == ["2026-05-01", "2026-05-03"]
+    assert result[1][1] == {"summary": "three"}
+
+
+def test_date_range_accepts_full_dates_and_prefixes(daily_dir, db_path):
+    for date_str in ("2026-04-30", "2026-05-01", "2026-05-31", "2026-06-01"):
+        _write_note(daily_dir, date_str, {"summary": date_str})
+    assert [d for d, _ in load_extracts(daily_dir, start="2026-05", end="2026-05", db_path=db_path)] == [
+        "2026-05-01", "2026-05-31",
+    ]
+    assert [d for d, _ in load_extracts(daily_dir, start="2026-05-31", db_path=db_path)] == [
+        "2026-05-31", "2026-06-01",
+    ]
+    assert [d for d, _ in load_extracts(daily_dir, end="2026-05-01", db_path=db_path)] == [
+        "2026-04-30", "2026-05-01",
+    ]
+
+
+def test_refresh_reparses_only_changed_files(daily_dir, db_path):
+    _write_note(daily_dir, "2026-05-01", {"summary": "one"})
+    path = _write_note(daily_dir, "2026-05-02", None)
+
+    conn = extract_index._connect(db_path)
+    try:
+        assert extract_index.refresh(conn, daily_dir) == 2
+        assert extract_index.refresh(conn, daily_dir) == 0
+
+        _write_note(daily_dir, "2026-05-02", {"summary": "two"})
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert extract_index.refresh(conn, daily_dir) == 1
+    finally:
+        conn.close()
+
+    assert load_extracts(daily_dir, db_path=db_path)[-1] == ("2026-05-02", {"summary": "two"})
+
+
+def test_deleted_notes_drop_out_of_index(daily_dir, db_path):
+    _write_note(daily_dir, "2026-05-01", {"summary": "one"})
+    path = _write_note(daily_dir, "2026-05-02", {"summary": "two"})
+    assert len(load_extracts(daily_dir, db_path=db_path)) == 2
+    path.unlink()
+    assert [d for d, _ in load_extracts(daily_dir, db_path=db_path)] == ["2026-05-01"]
@@ -0,0 +1,120 @@
+"""Tests for compute/gpu_scheduler.py."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from gpu_scheduler import BATCH, INTERACTIVE, GpuScheduler
+
+
+def test_admits_within_budget_and_queues_by_priority():
+    async def scenario():
+        gpu = GpuScheduler(budget_mb=5000)
+        order = []
+        release = asyncio.Event()
+
+        async def job(name, cost, priority):
+            async with gpu.slot(cost, priority):
+                order.append(name)
+                await release.wait()
+
+        running = asyncio.create_task(job("whisper", 3500, BATCH))
+        await asyncio.sleep(0)
+        small = asyncio.create_task(job("denoise", 1500, BATCH))
+        await asyncio.sleep(0)
+        assert order == ["whisper", "denoise"]  # both fit
+        assert gpu.stats()["in_use_mb"] == 5000
+
+        batch = asyncio.create_task(job("batch", 3500, BATCH))
+        interactive = asyncio.create_task(job("slack", 3500, INTERACTIVE))
+        await asyncio.sleep(0)
+        assert gpu.stats()["queued"] == {"interactive": 1, "batch": 1}
+
+        release.set()
+        await asyncio.gather(running, small, batch, interactive)
+        assert order == ["whisper", "denoise", "slack", "batch"]
+        assert gpu.stats() == {"budget_mb": 5000, "in_use_mb": 0, "reserved_mb": 0, "running": 0,
+                               "queued": {"interactive": 0, "batch": 0}}
+
+    asyncio.run(scenario())
+
+
+def test_oversized_job_runs_alone_and_cancelled_waiter_is_skipped():
+    async def scenario():
+        gpu = GpuScheduler(budget_mb=4000)
+        hold = asyncio.Event()
+
+        async def job(cost):
+            async with gpu.slot(cost):
+                await hold.wait()
+
+        big = asyncio.create_task(job(10_000))
+        await asyncio.sleep(0)
+        assert gpu.stats()["in_use_mb"] == 4000
+
+        waiter = asyncio.create_task(job(1000))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        assert gpu.stats()["queued"]["batch"] == 0
+
+        hold.set()
+        await big
+        assert gpu.stats()["in_use_mb"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_interactive_job_that_fits_skips_ahead_of_a_blocked_batch_job():
+    async def scenario():
+        gpu = GpuScheduler(budget_mb=10)
+        order = []
+        release = {name: asyncio.Event() for name in ("a", "b", "c")}
+
+        async def job(name, cost, priority):
+            async with gpu.slot(cost, priority):
+                order.append(name)
+                await release[name].wait()
+
+        a = asyncio.create_task(job("a", 4, BATCH))
+        await asyncio.sleep(0)
+        b = asyncio.create_task(job("b", 8, BATCH))  # doesn't fit next to a
+        await asyncio.sleep(0)
+        c = asyncio.create_task(job("c", 2, INTERACTIVE))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert order == ["a", "c"]  # 4 + 2 fits, without waiting for a to finish
+        assert gpu.stats()["queued"] == {"interactive": 0, "batch": 1}
+
+        for event in release.values():
+            event.set()
+        await asyncio.gather(a, b, c)
+        assert order == ["a", "c", "b"]
+
+    asyncio.run(scenario())
+
+
+def test_reservation_counts_against_the_budget_until_released():
+    async def scenario():
+        gpu = GpuScheduler(budget_mb=10)
+        weights = await gpu.reserve(6)
+        assert gpu.stats()["in_use_mb"] == 6 and gpu.stats()["running"] == 0
+
+        admitted = []
+
+        async def job(name, cost):
+            async with gpu.slot(cost):
+                admitted.append(name)
+
+        small = asyncio.create_task(job("small", 4))
+        big = asyncio.create_task(job("big", 5))
+        await asyncio.sleep(0)
+        assert admitted == ["small"]  # 6 + 5 would exceed the budget
+
+        gpu.release(weights)
+        await asyncio.gather(small, big)
+        assert admitted == ["small", "big"]
+        assert gpu.stats()["in_use_mb"] == gpu.stats()["reserved_mb"] == 0
+
+    asyncio.run(scenario())
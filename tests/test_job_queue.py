@@ -0,0 +1,78 @@
+"""Tests for compute/job_queue.py."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from job_queue import JobStore
+
+
+def _submit(store, kind="transcribe", name="memo.m4a"):
+    job_id = store.new_id()
+    (store.job_dir(job_id) / "input.wav").write_bytes(b"RIFF")
+    store.add(job_id, kind, name, {"music": False})
+    return job_id
+
+
+def test_jobs_run_in_submission_order(tmp_path):
+    store = JobStore(tmp_path)
+    first, second = _submit(store), _submit(store, "clean")
+    assert store.position(first) == 0
+    assert store.position(second) == 1
+
+    job = store.claim_next()
+    assert job["id"] == first and job["state"] == "running"
+    assert job["options"] == {"music": False}
+    assert store.position(first) is None
+    assert store.position(second) == 0
+
+    store.set_progress(first, 0.5)
+    assert store.get(first)["progress"] == 0.5
+    store.finish(first, "result.md")
+    done = store.get(first)
+    assert (done["state"], done["progress"], done["result"]) == ("done", 1.0, "result.md")
+
+    assert store.claim_next()["id"] == second
+    store.fail(second, "no audio")
+    assert store.claim_next() is None
+    assert store.counts() == {"done": 1, "failed": 1}
+
+
+def test_running_jobs_survive_a_restart(tmp_path):
+    store = JobStore(tmp_path)
+    job_id = _submit(store)
+    store.claim_next()
+    store.close()
+
+    reopened = JobStore(tmp_path)
+    assert reopened.requeue_running() == 1
+    assert reopened.claim_next()["id"] == job_id
+
+
+def test_prune_removes_old_finished_jobs_and_files(tmp_path):
+    store = JobStore(tmp_path)
+    job_id = _submit(store)
+    store.claim_next()
+    store.finish(job_id, "result.md")
+    assert store.prune(days=1) == 0
+    assert store.prune(days=-1) == 1
+    assert store.get(job_id) is None
+    assert not store.job_dir(job_id).exists()
+
+
+def test_unknown_kind_is_rejected(tmp_path):
+    store = JobStore(tmp_path)
+    with pytest.raises(ValueError):
+        store.add(store.new_id(), "translate", "x.wav")
+
+
+def test_interactive_jobs_jump_the_queue(tmp_path):
+    store = JobStore(tmp_path)
+    batch = _submit(store)
+    job_id = store.new_id()
+    store.add(job_id, "transcribe", "slack.m4a", priority=0)
+    assert store.position(job_id) == 0
+    assert store.position(batch) == 1
+    assert store.claim_next()["id"] == job_id
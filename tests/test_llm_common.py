@@ -0,0 +1,178 @@
+"""Tests for compute/llm_common.py — no API access required."""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import anthropic
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from llm_common import (
+    MODEL,
+    OllamaClient,
+    OllamaError,
+    RateLimiter,
+    create_message,
+    get_client,
+    model_for,
+)
+
+
+def _status_error(status: int, headers: dict) -> anthropic.APIStatusError:
+    exc = anthropic.APIStatusError.__new__(anthropic.APIStatusError)
+    exc.status_code = status
+    exc.response = SimpleNamespace(headers=headers)
+    return exc
+
+
+def _fake_client(side_effect) -> MagicMock:
+    client = MagicMock()
+    client.with_options.return_value = client
+    client.messages.with_raw_response.create.side_effect = side_effect
+    return client
+
+
+def _raw(message, headers=None) -> MagicMock:
+    raw = MagicMock()
+    raw.headers = headers or {}
+    raw.parse.return_value = message
+    return raw
+
+
+# ---------------------------------------------------------------------------
+# RateLimiter
+# ---------------------------------------------------------------------------
+
+def test_rate_limiter_follows_request_limit_header():
+    limiter = RateLimiter(requests_per_minute=10)
+    limiter.update_from_headers({
+        "anthropic-ratelimit-requests-limit": "4000",
+        "anthropic-ratelimit-requests-remaining": "3999",
+    })
+    assert limiter._capacity == 4000
+    assert limiter._rate == pytest.approx(4000 / 60)
+
+
+def test_rate_limiter_pauses_when_a_limit_is_exhausted():
+    limiter = RateLimiter()
+    limiter.update_from_headers({
+        "anthropic-ratelimit-input-tokens-remaining": "0",
+        "anthropic-ratelimit-input-tokens-reset": "2999-01-01T00:00:00Z",
+    })
+    assert limiter._paused_until > 1e9
+
+
+# ---------------------------------------------------------------------------
+# create_message
+# ---------------------------------------------------------------------------
+
+def test_create_message_retries_429_then_succeeds():
+    message = object()
+    client = _fake_client([
+        _status_error(429, {"retry-after": "0"}),
+        _status_error(529, {"retry-after": "0"}),
+        _raw(message),
+    ])
+    assert create_message(client, RateLimiter(6000), model="m", max_tokens=1, messages=[]) is message
+    assert client.messages.with_raw_response.create.call_count == 3
+
+
+def test_create_message_does_not_retry_client_errors():
+    client = _fake_client([_status_error(400, {})])
+    with pytest.raises(anthropic.APIStatusError):
+        create_message(client, RateLimiter(6000), model="m", max_tokens=1, messages=[])
+    assert client.messages.with_raw_response.create.call_count == 1
+
+
+# ---------------------------------------------------------------------------
+# Ollama backend (against a local stub server)
+# ---------------------------------------------------------------------------
+
+class _StubOllama(BaseHTTPRequestHandler):
+    replies: list[dict] = []
+    requests: list[dict] = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append({"path": self.path, **body})
+        data = json.dumps(type(self).replies.pop(0)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ollama():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOllama)
+    _StubOllama.replies, _StubOllama.requests = [], []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield OllamaClient(f"http://127.0.0.1:{server.server_port}/", "qwen3:14b"), _StubOllama
+    server.shutdown()
+
+
+def _chat_reply(content: str, **extra) -> dict:
+    return {"message": {"role": "assistant", "content": content}, "done": True,
+            "prompt_eval_count": 120, "eval_count": 30, **extra}
+
+
+def test_ollama_forced_tool_uses_json_schema_format(ollama):
+    client, stub = ollama
+    stub.replies.append(_chat_reply('{"summary": "A quiet day."}'))
+    tool = {"name": "extract_daily_data", "description": "Extract.",
+            "input_schema": {"type": "object", "properties": {"summary": {"type": "string"}}},
+            "cache_control": {"type": "ephemeral"}}
+    message = create_message(
+        client, model="claude-sonnet-4-5", max_tokens=100,
+        system=[{"type": "text", "text": "Be honest.", "cache_control": {"type": "ephemeral"}}],
+        tools=[tool], tool_choice={"type": "tool", "name": "extract_daily_data"},
+        messages=[{"role": "user", "content": "Today I rested."}],
+    )
+    sent = stub.requests[0]
+    assert sent["path"] == "/api/chat"
+    assert sent["model"] == "qwen3:14b"
+    assert sent["format"] == tool["input_schema"]
+    assert sent["options"]["num_predict"] == 100
+    assert sent["messages"][0] == {"role": "system", "content": "Be honest."}
+    assert sent["messages"][-1] == {"role": "user", "content": "Today I rested."}
+    assert message.content[0].type == "tool_use"
+    assert message.content[0].input == {"summary": "A quiet day."}
+    assert message.usage.input_tokens == 120
+
+
+def test_ollama_text_reply_strips_thinking(ollama):
+    client, stub = ollama
+    stub.replies.append(_chat_reply("<think>hmm</think>\n# Review\nGood week.", done_reason="length"))
+    message = client.messages.create(model="m", max_tokens=10,
+                                     messages=[{"role": "user", "content": "Review."}])
+    assert "format" not in stub.requests[0]
+    assert message.content[0].text == "# Review\nGood week."
+    assert message.stop_reason == "max_tokens"
+
+
+def test_ollama_invalid_json_raises(ollama):
+    client, stub = ollama
+    stub.replies.append(_chat_reply("not json"))
+    tool = {"name": "t", "input_schema": {"type": "object"}}
+    with pytest.raises(OllamaError):
+        client.messages.create(model="m", max_tokens=10, tools=[tool],
+                               tool_choice={"type": "tool", "name": "t"},
+                               messages=[{"role": "user", "content": "x"}])
+
+
+def test_backend_selects_model_per_task(monkeypatch):
+    monkeypatch.setenv("HARMONY_LLM_BACKEND", "ollama")
+    monkeypatch.setenv("OLLAMA_URL", "http://forge:11434")
+    assert get_client("extract").model == "qwen3:14b"
+    assert get_client("review").model == "qwen3:32b"
+    monkeypatch.delenv("HARMONY_LLM_BACKEND")
+    assert model_for("extract") == MODEL
@@ -0,0 +1,77 @@
+"""Tests for compute/media_manifest.py."""
+
+import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from media_manifest import Manifest
+
+EXT = {".wav", ".mp4"}
+
+
+def _media(root, rel, data):
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_bytes(data)
+    return p.resolve()
+
+
+def test_scan_is_recursive_and_separates_same_stem_outputs(tmp_path):
+    media, out = tmp_path / "media", tmp_path / "out"
+    a = _media(media, "phone/20260530_note.wav", b"first")
+    b = _media(media, "recorder/20260530_note.wav", b"second")
+    _media(media, "notes.txt", b"ignored")
+
+    with Manifest(tmp_path / "m.sqlite3") as m:
+        assert m.scan(media, out, EXT) == {"new": 2, "changed": 0, "removed": 0}
+        outputs = dict(m.select(("pending",)))
+        assert set(outputs) == {a, b}
+        assert len(set(outputs.values())) == 2
+        assert {o.parent for o in outputs.values()} == {out.resolve()}
+
+        # Unchanged tree: nothing to do on a rescan.
+        assert m.scan(media, out, EXT) == {"new": 0, "changed": 0, "removed": 0}
+
+
+def test_states_resume_and_retry(tmp_path):
+    media, out = tmp_path / "media", tmp_path / "out"
+    old = _media(media, "2026-01-01.wav", b"old")
+    new = _media(media, "2026-05-01.wav", b"new")
+    dup = _media(media, "copy/2026-05-01.wav", b"new")
+
+    with Manifest(tmp_path / "m.sqlite3") as m:
+        m.scan(media, out, EXT)
+        assert m.counts()["duplicate"] == 1
+        m.set_metadata(old, datetime.date(2026, 1, 1), 10.0)
+        m.set_metadata(new, datetime.date(2026, 5, 1), 10.0)
+        assert [p for p, _ in m.select(("pending",), newest_first=True)] == [new, old]
+        assert [p for p, _ in m.select(("pending",), limit=1)] == [old]
+
+        m.mark(old, "running")
+        m.mark(new, "running")
+        m.mark(new, "failed", "decode error")
+        # A killed run leaves `old` running; the next run picks it up again.
+        assert m.reset_running() == 1
+        assert m.paths(("pending",)) == [old]
+        assert m.paths(("failed",)) == [new]
+        assert dup not in m.paths(("pending", "failed"))
+
+
+def test_existing_transcript_is_adopted_and_edits_requeue(tmp_path):
+    media, out = tmp_path / "media", tmp_path / "out"
+    out.mkdir()
+    rec = _media(media, "20260530_a.wav", b"audio")
+    (out / "20260530_a.md").write_text("---\n---\n")
+
+    with Manifest(tmp_path / "m.sqlite3") as m:
+        m.scan(media, out, EXT)
+        assert m.counts()["done"] == 1
+
+        rec.write_bytes(b"re-recorded")
+        assert m.scan(media, out, EXT)["changed"] == 1
+        assert m.paths(("pending",)) == [rec]
+
+        rec.unlink()
+        assert m.scan(media, out, EXT)["removed"] == 1
+        assert sum(m.counts().values()) == 0
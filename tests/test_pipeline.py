@@ -0,0 +1,104 @@
+"""Tests for compute/pipeline.py — graph construction and execution, no API calls."""
+
+import itertools
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+import monthly_review
+from pipeline import Node, build_graph, run_graph
+
+_builds = itertools.count()
+
+
+def _graph(tmp_path, calls, fail=()):
+    """extract:a, extract:b -> weekly:w -> quarterly:q; extract:c -> weekly:v."""
+    def builder(nid, out):
+        def build():
+            calls.append(nid)
+            if nid in fail:
+                raise RuntimeError("boom")
+            out.write_text(f"{nid} build {next(_builds)}", encoding="utf-8")
+        return build
+
+    specs = {
+        "weekly:w": ["extract:a", "extract:b"],
+        "weekly:v": ["extract:c"],
+        "quarterly:q": ["weekly:w"],
+    }
+    return {
+        nid: Node(nid, tmp_path / f"{nid.replace(':', '_')}.md", deps,
+                  builder(nid, tmp_path / f"{nid.replace(':', '_')}.md"))
+        for nid, deps in specs.items()
+    }
+
+
+SOURCES = {"extract:a": "1", "extract:b": "2", "extract:c": "3"}
+
+
+def test_first_run_builds_everything_then_nothing(tmp_path):
+    state = tmp_path / "state.json"
+    calls: list[str] = []
+    result = run_graph(_graph(tmp_path, calls), SOURCES, state, workers=2)
+    assert sorted(result.built) == ["quarterly:q", "weekly:v", "weekly:w"]
+    assert calls.index("weekly:w") < calls.index("quarterly:q")
+
+    calls.clear()
+    result = run_graph(_graph(tmp_path, calls), SOURCES, state, workers=2)
+    assert calls == []
+    assert len(result.fresh) == 3
+
+
+def test_changed_extract_rebuilds_only_downstream(tmp_path):
+    state = tmp_path / "state.json"
+    calls: list[str] = []
+    run_graph(_graph(tmp_path, calls), SOURCES, state, workers=2)
+
+    calls.clear()
+    run_graph(_graph(tmp_path, calls), {**SOURCES, "extract:a": "changed"}, state, workers=2)
+    assert calls == ["weekly:w", "quarterly:q"]
+
+
+def test_existing_outputs_are_adopted(tmp_path):
+    calls: list[str] = []
+    nodes = _graph(tmp_path, calls)
+    for node in nodes.values():
+        node.output.write_text("from the old cron job", encoding="utf-8")
+    result = run_graph(nodes, SOURCES, tmp_path / "state.json", workers=2)
+    assert calls == []
+    assert len(result.fresh) == 3
+
+
+def test_failure_blocks_dependents_only(tmp_path):
+    calls: list[str] = []
+    result = run_graph(_graph(tmp_path, calls, fail={"weekly:w"}),
+                       SOURCES, tmp_path / "state.json", workers=1)
+    assert result.failed == ["weekly:w"]
+    assert result.blocked == ["quarterly:q"]
+    assert result.built == ["weekly:v"]
+
+
+def test_dry_run_marks_downstream_stale_without_building(tmp_path):
+    state = tmp_path / "state.json"
+    calls: list[str] = []
+    run_graph(_graph(tmp_path, calls), SOURCES, state, workers=2)
+
+    calls.clear()
+    result = run_graph(_graph(tmp_path, calls), {**SOURCES, "extract:a": "changed"},
+                       state, workers=2, dry_run=True)
+    assert calls == []
+    assert sorted(result.built) == ["quarterly:q", "weekly:w"]
+    # Nothing was recorded, so a real run still rebuilds both.
+    run_graph(_graph(tmp_path, calls), {**SOURCES, "extract:a": "changed"}, state, workers=2)
+    assert calls == ["weekly:w", "quarterly:q"]
+
+
+def test_thin_month_gets_no_monthly_or_recurring_node(tmp_path):
+    thin = [(f"2026-01-{d:02d}", {}) for d in range(1, monthly_review.MIN_DAYS)]
+    full = [(f"2026-02-{d:02d}", {}) for d in range(1, monthly_review.MIN_DAYS + 1)]
+    nodes = build_graph(thin + full, tmp_path, tmp_path, tmp_path, tmp_path,
+                        client=None, today=date(2026, 10, 18))
+    assert "monthly:2026-01" not in nodes
+    assert "recurring:2026-01" not in nodes
+    assert "recurring:2026-02" in nodes["monthly:2026-02"].deps
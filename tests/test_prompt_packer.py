@@ -0,0 +1,61 @@
+"""Tests for compute/prompt_packer.py."""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from prompt_packer import estimate_tokens, pack_extracts
+
+
+def _days(n: int, **fields) -> list[tuple[str, dict]]:
+    return [(f"2025-07-{i + 1:02d}", dict(fields)) for i in range(n)]
+
+
+def _parsed(text: str) -> list[dict]:
+    return [json.loads(block.split("\n", 1)[1]) for block in text.split("\n\n")]
+
+
+def test_everything_fits_under_a_generous_budget():
+    extracts = [
+        ("2025-07-01", {"summary": "Rested.", "struggles_and_fears": ["money", "time"]}),
+        ("2025-07-02", {"summary": "Wrote.", "struggles_and_fears": []}),
+    ]
+    packed = pack_extracts(extracts, ["summary", "struggles_and_fears"], budget=10_000)
+    assert _parsed(packed.text) == [
+        {"date": "2025-07-01", "summary": "Rested.", "struggles_and_fears": ["money", "time"]},
+        {"date": "2025-07-02", "summary": "Wrote."},
+    ]
+    assert packed.tokens == estimate_tokens(packed.text)
+    assert sum(packed.dropped.values()) == 0
+
+
+def test_priority_order_and_budget_are_respected():
+    extracts = [(d, {**data, "verse_and_lyrical_lines": [f"line {d} " * 20]})
+                for d, data in _days(10, summary="x" * 200)]
+    packed = pack_extracts(extracts, ["summary", "verse_and_lyrical_lines"], budget=800)
+    days = _parsed(packed.text)
+    assert packed.tokens <= 800
+    assert all("summary" in d for d in days)
+    assert packed.dropped["verse_and_lyrical_lines"] > 0
+    assert "verse_and_lyrical_lines" in packed.report()
+
+
+def test_list_items_fill_breadth_first_across_days():
+    extracts = [(f"2025-07-0{i}", {"tasks": [f"day {i} task {j} " + "x" * 40 for j in range(5)]})
+                for i in range(1, 5)]
+    packed = pack_extracts(extracts, ["tasks"], budget=200)
+    counts = [len(d.get("tasks", [])) for d in _parsed(packed.text)]
+    assert max(counts) - min(counts) <= 1
+    assert sum(counts) < 20
+
+
+def test_repeated_phrasings_are_deduplicated():
+    extracts = [
+        ("2025-07-01", {"tasks_and_intentions": ["Ask Marcus for a referral."]}),
+        ("2025-07-02", {"tasks_and_intentions": ["ask marcus for a referral", "Call mom"]}),
+    ]
+    packed = pack_extracts(extracts, ["tasks_and_intentions"], budget=10_000)
+    days = _parsed(packed.text)
+    assert days[1]["tasks_and_intentions"] == ["Call mom"]
+    assert packed.duplicates == 1
@@ -0,0 +1,54 @@
+"""Tests for compute/review_stats.py."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from review_stats import format_stats, period_stats, rating, stats_block, yes_no
+from weekly_review import build_weekly_prompt
+
+EXTRACTS = [
+    ("2025-07-01", {"energy_level": "high", "morning_routine_completed": ["meditation", "examen"],
+                    "weed_use_context": "no", "spiritual_movement": "consolation, good spirit"}),
+    ("2025-07-02", {"energy_level": "low", "morning_routine_completed": ["Meditation"],
+                    "weed_use_context": "yes — after a long call", "financial_anxiety": "8/10"}),
+    ("2025-07-03", {"energy_level": "low", "morning_routine_completed": ["meditation"],
+                    "weed_use_context": "yes", "work_paralysis": "yes, froze on the invoice"}),
+    # 07-04 missing: breaks the streak
+    ("2025-07-05", {"energy_level": "medium", "morning_routine_completed": ["examen"],
+                    "spiritual_movement": "desolation"}),
+]
+
+
+def test_field_parsers():
+    assert yes_no("Yes + anxious morning") is True
+    assert yes_no("no") is False
+    assert yes_no("") is None
+    assert rating("about 6/10, bills") == 6
+    assert rating("10 — rent") == 10
+    assert rating("n/a") is None
+
+
+def test_period_stats_are_exact():
+    stats = period_stats(EXTRACTS)
+    assert stats["days"] == 4
+    assert stats["energy"] == {"high": 1, "medium": 1, "low": 2, "mixed": 0}
+    assert stats["energy_mean"] == 1.75
+    assert stats["movement"]["consolation"] == 1 and stats["movement"]["desolation"] == 1
+    assert stats["routine_days"] == 4
+    assert stats["routine_longest_streak"] == 3
+    assert stats["practices"] == {"meditation": 3, "examen": 2}
+    assert (stats["weed_days"], stats["weed_low_energy_days"]) == (2, 2)
+    assert stats["work_paralysis_days"] == 1
+    assert stats["financial_anxiety_mean"] == 8.0
+    assert stats["input_completion_mean"] is None
+
+
+def test_stats_block_reaches_the_prompt():
+    text = format_stats(period_stats(EXTRACTS))
+    assert "low 2" in text
+    assert "2/2 (100%)" in text
+    assert stats_block([]) == ""
+    prompt = build_weekly_prompt(EXTRACTS)
+    assert "COMPUTED STATISTICS" in prompt
+    assert "morning_routine_completed" not in prompt
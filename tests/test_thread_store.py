@@ -0,0 +1,86 @@
+"""Tests for compute/thread_store.py — a fake embedder stands in for the model."""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from llm_common import EXTRACT_MARKER
+from thread_store import ThreadStore
+
+_TOPICS = {"adhd": [1, 0, 0], "mom": [0, 1, 0], "album": [0, 0, 1]}
+
+
+def _embedder(calls: list):
+    def embed(phrases: list[str]) -> np.ndarray:
+        calls.extend(phrases)
+        return np.array([_TOPICS[next(k for k in _TOPICS if k in p)] for p in phrases], dtype=float)
+    return embed
+
+
+def _write_day(daily_dir: Path, date_str: str, tasks: list[str]) -> None:
+    extract = json.dumps({"summary": date_str, "tasks_and_intentions": tasks})
+    (daily_dir / f"{date_str}.md").write_text(
+        f"# {date_str}\n\n{EXTRACT_MARKER}\n\n```json\n{extract}\n```\n", encoding="utf-8"
+    )
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv("HARMONY_CACHE_DIR", str(tmp_path / "cache"))
+    import extract_index
+    monkeypatch.setattr(extract_index, "index_path", lambda d: tmp_path / "index.sqlite3")
+    daily = tmp_path / "daily"
+    daily.mkdir()
+    calls: list[str] = []
+
+    def store():
+        return ThreadStore(tmp_path / "threads.sqlite3", threshold=0.8,
+                           embedder=_embedder(calls), embed_db=tmp_path / "emb.sqlite3")
+    return daily, store, calls
+
+
+def test_new_days_join_existing_threads(env):
+    daily, store, calls = env
+    _write_day(daily, "2025-07-01", ["get adhd meds", "call mom"])
+    _write_day(daily, "2025-07-02", ["adhd refill"])
+    with store() as s:
+        assert s.update(daily) == (2, 0)
+        assert s.update(daily) == (0, 0)
+        assert [c["occurrences"] for c in s.query()] == [2]
+
+    calls.clear()
+    _write_day(daily, "2025-07-03", ["call Mom back", "adhd refill"])
+    with store() as s:
+        assert s.update(daily) == (1, 0)
+        assert calls == ["call mom back"]  # only the new phrasing is embedded
+        clusters = s.query()
+    assert sorted(c["occurrences"] for c in clusters) == [2, 3]
+
+
+def test_windowed_query_and_removed_days(env):
+    daily, store, _ = env
+    for d in ("2025-07-01", "2025-07-20", "2025-08-05", "2025-08-06"):
+        _write_day(daily, d, ["adhd refill"])
+    with store() as s:
+        s.update(daily)
+        assert s.query("2025-08", "2025-08")[0]["first_seen"] == "2025-08-05"
+        assert s.query("2025-07", "2025-07")[0]["occurrences"] == 2
+
+        (daily / "2025-07-20.md").unlink()
+        assert s.update(daily) == (0, 1)
+        assert s.query("2025-07", "2025-07") == []
+
+
+def test_recluster_keeps_membership(env):
+    daily, store, _ = env
+    _write_day(daily, "2025-07-01", ["adhd meds", "album mix"])
+    _write_day(daily, "2025-07-02", ["adhd refill", "finish album"])
+    with store() as s:
+        s.update(daily)
+        before = sorted(c["occurrences"] for c in s.query())
+        assert s.recluster(daily) == 2
+        assert sorted(c["occurrences"] for c in s.query()) == before
@@ -0,0 +1,240 @@
+"""Tests for compute/transcribe_api.py — no GPU, model or ffmpeg; skipped without fastapi."""
+
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from compute import transcribe_api
+
+
+@pytest.fixture
+def client():
+    # Not entered as a context manager, so the lifespan (job store, workers) never starts.
+    return TestClient(transcribe_api.app)
+
+
+def test_oversized_upload_is_refused_by_content_length(client):
+    with patch.object(transcribe_api, "MAX_UPLOAD_BYTES", 100), \
+            patch.object(transcribe_api, "_UPLOAD_CHUNK", 16), \
+            patch.object(transcribe_api, "_upload_to_wav") as upload_to_wav:
+        resp = client.post("/transcribe", files={"file": ("memo.m4a", b"x" * 2000)})
+    assert resp.status_code == 413
+    upload_to_wav.assert_not_called()
+
+
+def test_oversized_upload_is_cut_off_while_streaming(client):
+    # Within the Content-Length allowance, but over the limit once saved.
+    with patch.object(transcribe_api, "MAX_UPLOAD_BYTES", 100):
+        resp = client.post("/transcribe", files={"file": ("memo.m4a", b"x" * 2000)})
+    assert resp.status_code == 413
+    assert "limit" in resp.json()["detail"]
+
+
+def test_upload_without_audio_track_is_422(client):
+    failure = subprocess.CalledProcessError(
+        1, "ffmpeg", stderr=b"Stream map '0:a:0' matches no streams.\n"
+    )
+    with patch.object(transcribe_api.subprocess, "run", side_effect=failure) as run:
+        resp = client.post("/transcribe", files={"file": ("screen.mp4", b"\x00" * 64)})
+    run.assert_called_once()
+    assert resp.status_code == 422
+    assert "matches no streams" in resp.json()["detail"]
+
+
+@pytest.fixture
+def gpu(monkeypatch):
+    """Scheduler, lock and a stub model already on the GPU, in place of what the lifespan sets up."""
+    model = SimpleNamespace(model=SimpleNamespace(model_is_loaded=True))
+    monkeypatch.setattr(transcribe_api, "_gpu", transcribe_api.GpuScheduler(10_000), raising=False)
+    monkeypatch.setattr(transcribe_api, "_model_lock", asyncio.Lock(), raising=False)
+    monkeypatch.setattr(transcribe_api, "_model", model)
+    return model
+
+
+def test_lone_request_skips_the_batched_pass(gpu, monkeypatch):
+    single, batched = [], []
+    monkeypatch.setattr(transcribe_api, "_run_transcription",
+                        lambda path, model, music, progress: single.append(path) or "alone")
+    monkeypatch.setattr(transcribe_api, "_transcribe_batch",
+                        lambda paths, model, progress: batched.append(paths) or ["a", "b"])
+
+    async def run():
+        one = await transcribe_api._run_batch([(Path("a.wav"), 0, None)])
+        two = await transcribe_api._run_batch([(Path("a.wav"), 0, None), (Path("b.wav"), 1, None)])
+        return one, two
+
+    assert asyncio.run(run()) == (["alone"], ["a", "b"])
+    assert single == [Path("a.wav")]
+    assert batched == [[Path("a.wav"), Path("b.wav")]]
+
+
+
+def test_coalesced_items_report_progress(monkeypatch):
+    np = pytest.importorskip("numpy")
+
+    class FakePipeline:
+        def __init__(self, model):
+            pass
+
+        def transcribe(self, audio, language, clip_timestamps, batch_size):
+            return [SimpleNamespace(start=c["start"], end=c["end"], text=language)
+                    for c in clip_timestamps], None
+
+    fake_fw = SimpleNamespace(
+        decode_audio=lambda path, sampling_rate: np.zeros(2 * sampling_rate, dtype=np.float32),
+        BatchedInferencePipeline=FakePipeline,
+    )
+    monkeypatch.setitem(sys.modules, "faster_whisper", fake_fw)
+    monkeypatch.setattr(transcribe_api, "speech_regions", lambda audio: [(0.5, 1.5)])
+    languages = iter(["en", "de", "en"])
+    model = SimpleNamespace(detect_language=lambda audio: (next(languages), 1.0, []))
+
+    reported = {}
+    progress = [lambda f, name=name: reported.setdefault(name, []).append(f) for name in "abc"]
+    progress[1] = None  # a synchronous request has no progress callback
+    transcripts = transcribe_api._transcribe_batch(
+        [Path("a.wav"), Path("b.wav"), Path("c.wav")], model, progress
+    )
+    assert [t.split("] ")[-1] for t in transcripts] == ["en", "de", "en"]
+    assert reported == {"a": [1.0], "c": [1.0]}
+
+class _StubCt2Whisper:
+    """The ctranslate2.models.Whisper residency API that _load_model and _idle_watcher use."""
+
+    def __init__(self):
+        self.model_is_loaded = True
+
+    def load_model(self):
+        self.model_is_loaded = True
+
+    def unload_model(self, to_cpu=False):
+        assert to_cpu
+        self.model_is_loaded = False
+
+
+@pytest.fixture
+def residency(monkeypatch):
+    """No model loaded; loading "from disk" creates a stub WhisperModel."""
+    monkeypatch.setattr(transcribe_api, "_model", None)
+    monkeypatch.setattr(transcribe_api, "_residency", dict.fromkeys(transcribe_api._residency, 0))
+    monkeypatch.setattr(transcribe_api, "_active_count", 0)
+    monkeypatch.setattr(transcribe_api, "_weights_mb", 0)
+    monkeypatch.setattr(transcribe_api, "_model_lock", asyncio.Lock(), raising=False)
+    fake_fw = SimpleNamespace(WhisperModel=lambda *a, **k: SimpleNamespace(model=_StubCt2Whisper()))
+    monkeypatch.setitem(sys.modules, "faster_whisper", fake_fw)
+    return transcribe_api._residency
+
+
+def test_load_model_loads_then_reloads_from_host(residency):
+    assert transcribe_api._model_tier() == "disk"
+    model = transcribe_api._load_model()
+    assert transcribe_api._model_tier() == "gpu"
+    assert transcribe_api._load_model() is model
+    assert (residency["loads"], residency["reloads"]) == (1, 0)
+
+    transcribe_api._evict_to_host()
+    assert transcribe_api._model_tier() == "host"
+    assert transcribe_api._load_model() is model
+    assert transcribe_api._model_tier() == "gpu"
+    assert (residency["loads"], residency["reloads"], residency["evictions"]) == (1, 1, 1)
+
+
+async def _watch(idle: float, ticks: int = 3) -> str:
+    """Run _idle_watcher for a few checks with the model idle for `idle` seconds."""
+    transcribe_api._last_used = asyncio.get_running_loop().time() - idle
+    watcher = asyncio.create_task(transcribe_api._idle_watcher())
+    for _ in range(ticks):
+        await asyncio.sleep(0)
+    watcher.cancel()
+    return transcribe_api._model_tier()
+
+
+def test_idle_watcher_steps_down_gpu_host_disk(residency, monkeypatch):
+    monkeypatch.setattr(transcribe_api, "_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(transcribe_api, "IDLE_TIMEOUT", 600)
+    monkeypatch.setattr(transcribe_api, "HOST_IDLE_TIMEOUT", 3600)
+    monkeypatch.setattr(transcribe_api, "_last_used", 0.0)
+    transcribe_api._load_model()
+
+    async def run():
+        tiers = [await _watch(idle=10), await _watch(idle=700)]
+        transcribe_api._active_count = 1  # a run in progress is never unloaded
+        tiers.append(await _watch(idle=10_000))
+        transcribe_api._active_count = 0
+        tiers.append(await _watch(idle=10_000))
+        return tiers
+
+    assert asyncio.run(run()) == ["gpu", "host", "host", "disk"]
+    assert residency["evictions"] == 1
+
+
+def test_idle_watcher_without_host_tier_unloads_directly(residency, monkeypatch):
+    monkeypatch.setattr(transcribe_api, "_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(transcribe_api, "HOST_IDLE_TIMEOUT", 0)
+    monkeypatch.setattr(transcribe_api, "_last_used", 0.0)
+    transcribe_api._load_model()
+    assert asyncio.run(_watch(idle=transcribe_api.IDLE_TIMEOUT + 1)) == "disk"
+    assert residency["evictions"] == 0
+
+
+def test_warmup_waits_for_gpu_budget(residency, monkeypatch):
+    monkeypatch.setattr(transcribe_api, "_gpu", transcribe_api.GpuScheduler(
+        transcribe_api.WHISPER_VRAM_MB), raising=False)
+    monkeypatch.setattr(transcribe_api, "_last_used", 0.0)
+
+    async def run():
+        async with transcribe_api._gpu.slot(transcribe_api.DENOISE_VRAM_MB):
+            warmup = asyncio.create_task(transcribe_api.warmup())
+            await asyncio.sleep(0.05)
+            assert transcribe_api._model_tier() == "disk"  # still waiting for the budget
+        return await warmup
+
+    result = asyncio.run(run())
+    assert (result["was"], result["model_tier"]) == ("disk", "gpu")
+    # Already on the GPU: no scheduler slot needed.
+    assert asyncio.run(transcribe_api.warmup())["was"] == "gpu"
+
+
+def test_idle_loaded_model_keeps_its_weights_in_the_budget(residency, monkeypatch):
+    api = transcribe_api
+    gpu = api.GpuScheduler(api.WHISPER_VRAM_MB + api.DENOISE_VRAM_MB)
+    monkeypatch.setattr(api, "_gpu", gpu, raising=False)
+    monkeypatch.setattr(api, "_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(api, "_last_used", 0.0)
+
+    async def run():
+        async with api._whisper(api.INTERACTIVE):
+            assert gpu.stats()["in_use_mb"] == api.WHISPER_VRAM_MB + api.WHISPER_RUN_VRAM_MB
+        # No run in progress, but the weights are still on the GPU and still counted.
+        assert api._model_tier() == "gpu"
+        assert gpu.stats()["in_use_mb"] == gpu.stats()["reserved_mb"] == api.WHISPER_VRAM_MB
+
+        admitted, hold = [], asyncio.Event()
+
+        async def denoise(name):
+            async with gpu.slot(api.DENOISE_VRAM_MB):
+                admitted.append(name)
+                await hold.wait()
+
+        jobs = [asyncio.create_task(denoise(name)) for name in ("a", "b")]
+        await asyncio.sleep(0)
+        assert admitted == ["a"]  # only one fits beside the idle weights
+
+        assert await _watch(idle=api.IDLE_TIMEOUT + 1) == "host"
+        await asyncio.sleep(0)
+        assert admitted == ["a", "b"]  # eviction gave the weights' share back
+        hold.set()
+        await asyncio.gather(*jobs)
+        assert gpu.stats()["in_use_mb"] == 0
+
+    asyncio.run(run())
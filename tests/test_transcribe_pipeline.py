@@ -0,0 +1,158 @@
+"""Tests for transcribe.py: --pipeline, long files and the probe cache, all faked."""
+
+import datetime
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+import transcribe
+from transcribe import LONG_AUDIO_SECONDS, SAMPLE_RATE, _run_pipeline, _transcribe_file, probe_media
+
+
+DAY = (datetime.date(2026, 5, 30), "filename")
+
+
+def _fake_decode(path):
+    if path.stem == "broken":
+        raise RuntimeError("cannot decode")
+    return [0.0] * (SAMPLE_RATE * 3)
+
+
+class FakeBatched:
+    def __init__(self):
+        self.calls = []
+
+    def transcribe(self, audio, batch_size):
+        self.calls.append((len(audio), batch_size))
+        segments = iter([
+            SimpleNamespace(start=0.0, end=1.5, text=" hello "),
+            SimpleNamespace(start=1.5, end=3.0, text="world"),
+        ])
+        return segments, None
+
+
+def test_pipeline_writes_each_transcript(tmp_path):
+    paths = [tmp_path / f"2026053{i}_a.wav" for i in range(5)]
+    batched = FakeBatched()
+    targets = {p: (tmp_path / f"{p.stem}.md", *DAY) for p in paths}
+    with ThreadPoolExecutor(2) as pool:
+        transcribed, failed = _run_pipeline(
+            batched, targets, "2026-06-01T00:00:00", pool, prefetch=3, batch_size=8,
+            decode=_fake_decode,
+        )
+    assert (transcribed, failed) == (5, 0)
+    assert batched.calls == [(SAMPLE_RATE * 3, 8)] * 5
+    text = (tmp_path / "20260530_a.md").read_text()
+    assert "date: 2026-05-30" in text
+    assert "date_source: filename" in text
+    assert "[00:00.0 -> 00:01.5] hello\n[00:01.5 -> 00:03.0] world" in text
+
+
+def test_pipeline_failure_does_not_stop_the_rest(tmp_path):
+    paths = [tmp_path / "broken.wav", tmp_path / "20260530_ok.wav"]
+    targets = {p: (tmp_path / f"{p.stem}.md", *DAY) for p in paths}
+    states = []
+    with ThreadPoolExecutor(2) as pool:
+        transcribed, failed = _run_pipeline(
+            FakeBatched(), targets, "2026-06-01T00:00:00", pool, prefetch=2,
+            decode=_fake_decode, on_state=lambda p, s, e: states.append((p.name, s, e)),
+        )
+    assert (transcribed, failed) == (1, 1)
+    assert ("broken.wav", "failed", "cannot decode") in states
+    assert [s for name, s, _ in states if name == "20260530_ok.wav"] == ["running", "done"]
+    assert not (tmp_path / "broken.md").exists()
+    assert (tmp_path / "20260530_ok.md").exists()
+
+
+
+class _LongAudio:
+    """Stands in for a decoded recording longer than LONG_AUDIO_SECONDS."""
+
+    def __len__(self):
+        return int((LONG_AUDIO_SECONDS + 60) * SAMPLE_RATE)
+
+
+def _fake_transcribe_long(calls):
+    def run(audio, transcribe, checkpoint, workers=1):
+        calls.append(workers)
+        return [SimpleNamespace(start=0.0, end=1.0, text="long")]
+    return run
+
+
+def test_pipeline_transcribes_long_chunks_in_parallel(tmp_path):
+    path = tmp_path / "20260530_talk.wav"
+    path.touch()
+    calls = []
+    with ThreadPoolExecutor(1) as pool, \
+            patch.object(transcribe, "transcribe_long", _fake_transcribe_long(calls)):
+        transcribed, failed = _run_pipeline(
+            FakeBatched(), {path: (tmp_path / "out.md", *DAY)}, "2026-06-01T00:00:00", pool,
+            prefetch=1, decode=lambda p: _LongAudio(), chunk_workers=3,
+        )
+    assert (transcribed, failed) == (1, 0)
+    assert calls == [3]
+
+
+def test_transcribe_file_sends_long_recordings_through_chunking(tmp_path):
+    path = tmp_path / "20260530_talk.wav"
+    path.touch()
+    out_path = tmp_path / "20260530_talk-1234abcd.md"
+    calls = []
+    model = SimpleNamespace()  # only reached through the (faked) chunked path
+    fake_fw = SimpleNamespace(decode_audio=lambda *a, **k: _LongAudio())
+    with patch.dict(sys.modules, {"faster_whisper": fake_fw}), \
+            patch.object(transcribe, "transcribe_long", _fake_transcribe_long(calls)):
+        assert _transcribe_file(
+            model, path, out_path, "2026-06-01T00:00:00", DAY,
+            duration=LONG_AUDIO_SECONDS + 60, chunk_workers=2,
+        )
+    assert calls == [2]
+    assert "[00:00.0 -> 00:01.0] long" in out_path.read_text()
+    assert not _transcribe_file(model, path, out_path, "2026-06-01T00:00:00", DAY)
+
+
+def _ffprobe_output(creation_time):
+    return SimpleNamespace(stdout=json.dumps({
+        "format": {"duration": "61.5", "tags": {"creation_time": creation_time}},
+        "streams": [{"codec_type": "video", "codec_name": "h264"},
+                    {"codec_type": "audio", "codec_name": "aac"}],
+    }))
+
+
+def test_probe_cache_reuses_results_until_file_changes(tmp_path):
+    media = tmp_path / "PXL_20260101_120000.mp4"
+    media.write_bytes(b"x")
+    db = tmp_path / "probe.sqlite3"
+
+    with patch("transcribe.subprocess.run",
+               return_value=_ffprobe_output("2026-05-28T12:00:00.000000Z")) as run:
+        first = probe_media([media], db)
+        assert run.call_count == 1
+        second = probe_media([media], db)
+        assert run.call_count == 1  # cache hit: no subprocess
+        assert second == first
+        assert first[media]["date_source"] == "ffprobe"
+        assert first[media]["duration"] == 61.5
+        assert first[media]["codec"] == "aac"
+
+        os.utime(media, ns=(0, 10**18))
+        probe_media([media], db)
+        assert run.call_count == 2
+
+
+def test_probe_failure_falls_back_and_is_not_cached(tmp_path):
+    media = tmp_path / "PXL_20260101_120000.mp4"
+    media.write_bytes(b"x")
+    db = tmp_path / "probe.sqlite3"
+
+    with patch("transcribe.subprocess.run", side_effect=FileNotFoundError("ffprobe")) as run:
+        result = probe_media([media], db)
+        probe_media([media], db)
+    assert result[media]["date"] == datetime.date(2026, 1, 1)
+    assert result[media]["date_source"] == "filename"
+    assert run.call_count == 2
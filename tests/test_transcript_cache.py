@@ -0,0 +1,44 @@
+"""Tests for compute/transcript_cache.py."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "compute"))
+from transcript_cache import TranscriptCache, cache_key
+
+
+def test_key_covers_audio_model_and_options():
+    base = cache_key("abc", "large-v3", music=False)
+    assert base == cache_key("abc", "large-v3", music=False)
+    assert base != cache_key("abd", "large-v3", music=False)
+    assert base != cache_key("abc", "medium", music=False)
+    assert base != cache_key("abc", "large-v3", music=True)
+
+
+def test_hits_misses_and_persistence(tmp_path):
+    cache = TranscriptCache(tmp_path)
+    assert cache.get("k") is None
+    cache.put("k", "[00:00.0 -> 00:01.0] hello")
+    assert cache.get("k") == "[00:00.0 -> 00:01.0] hello"
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 1, 0.5)
+    cache.close()
+
+    reopened = TranscriptCache(tmp_path)
+    assert reopened.get("k") == "[00:00.0 -> 00:01.0] hello"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = TranscriptCache(tmp_path, max_bytes=25)
+    cache.put("a", "a" * 10)
+    cache.put("b", "b" * 10)
+    cache.get("a")  # now b is the least recently used
+    cache.put("c", "c" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 10
+    assert cache.get("c") == "c" * 10
+    assert cache.stats()["bytes"] == 20
+
+    cache.put("huge", "x" * 100)  # larger than the whole cache: not stored
+    assert cache.get("huge") is None
+    assert cache.stats()["entries"] == 2